@@ -0,0 +1,49 @@
+# =========================================================
+# Общая настройка Django для бенчмарков
+# =========================================================
+# Бенчмарки никогда не трогают рабочую db.sqlite3: каждый запуск
+# мигрирует отдельный временный файл БД.
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def setup(db_name=None, **db_options):
+    if str(BASE_DIR) not in sys.path:
+        sys.path.insert(0, str(BASE_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'server.settings')
+
+    from django.conf import settings
+
+    database = settings.DATABASES['default']
+    if db_name is None:
+        if database['ENGINE'] != 'django.db.backends.sqlite3':
+            raise SystemExit('Для PostgreSQL укажите отдельную БД для бенчмарка (--db)')
+        db_name = os.path.join(tempfile.mkdtemp(prefix='bench-'), 'bench.sqlite3')
+
+    database['NAME'] = db_name
+    database.update(db_options)
+    settings.DEBUG = False
+    settings.ALLOWED_HOSTS = ['*']
+
+    import django
+    django.setup()
+
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+    return db_name
+
+
+def print_table(headers, rows):
+    widths = [
+        max(len(str(h)), *(len(str(r[i])) for r in rows)) if rows else len(str(h))
+        for i, h in enumerate(headers)
+    ]
+    line = '  '.join(str(h).ljust(w) for h, w in zip(headers, widths))
+    print(line)
+    print('-' * len(line))
+    for row in rows:
+        print('  '.join(str(c).ljust(w) for c, w in zip(row, widths)))
@@ -0,0 +1,129 @@
+# =========================================================
+# WSGI (синхронные DRF-вьюхи) против ASGI (cars.async_views)
+# =========================================================
+# Запуск:
+#   python -m benchmarks.asgi_vs_wsgi --workers 8 --requests 2000
+#
+# Оба стека гоняются в процессе, с одинаковым числом «воркеров»:
+# WSGI — N потоков с django.test.Client, ASGI — N корутин с
+# AsyncClient. Кэш каталога отключён, чтобы мерить запросы к БД.
+import argparse
+import asyncio
+import random
+import threading
+import time
+from datetime import timedelta
+
+from benchmarks import _django
+
+SCENARIOS = (
+    ('car list', '/cars/cars/?page_size=50', '/cars/async/cars/?limit=50'),
+    ('car detail', '/cars/cars/{car}/', '/cars/async/cars/{car}/'),
+    ('booking list', '/cars/bookings/?page_size=50', '/cars/async/bookings/?limit=50'),
+)
+
+
+def summary(latencies, elapsed):
+    latencies = sorted(latencies)
+    p99 = latencies[min(int(0.99 * len(latencies)), len(latencies) - 1)]
+    return round(len(latencies) / elapsed), round(p99 * 1000, 1)
+
+
+def run_wsgi(path, car_ids, token, workers, requests):
+    from django.db import connection
+    from django.test import Client
+
+    latencies, lock = [], threading.Lock()
+
+    def worker():
+        client = Client(headers={'Authorization': f'Bearer {token}'})
+        local = []
+        for _ in range(requests // workers):
+            url = path.format(car=random.choice(car_ids))
+            t0 = time.perf_counter()
+            response = client.get(url)
+            local.append(time.perf_counter() - t0)
+            assert response.status_code == 200, (url, response.status_code)
+        connection.close()
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return summary(latencies, time.perf_counter() - t0)
+
+
+def run_asgi(path, car_ids, token, workers, requests):
+    from django.test import AsyncClient
+
+    async def worker(latencies):
+        client = AsyncClient()
+        headers = {'Authorization': f'Bearer {token}'}
+        for _ in range(requests // workers):
+            url = path.format(car=random.choice(car_ids))
+            t0 = time.perf_counter()
+            response = await client.get(url, headers=headers)
+            latencies.append(time.perf_counter() - t0)
+            assert response.status_code == 200, (url, response.status_code)
+
+    async def main():
+        latencies = []
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker(latencies) for _ in range(workers)))
+        return summary(latencies, time.perf_counter() - t0)
+
+    return asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--cars', type=int, default=500)
+    parser.add_argument('--bookings', type=int, default=5000)
+    parser.add_argument('--db', default=None)
+    args = parser.parse_args()
+
+    from django.conf import settings as lazy_settings
+    _django.setup(args.db)
+    lazy_settings.CACHES['bench-dummy'] = {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+    lazy_settings.CAR_CATALOGUE_CACHE = 'bench-dummy'
+
+    from django.utils import timezone
+    from rest_framework_simplejwt.tokens import AccessToken
+    from cars.models import Booking, Car
+    from users.models import User
+
+    random.seed(1)
+    user = User.objects.create(username='bench', is_staff=True)
+    cars = Car.objects.bulk_create([
+        Car(name=f'Car {i}', photo='cars/bench.png', year=2020,
+            car_type='suv', price_per_day=100)
+        for i in range(args.cars)
+    ])
+    now = timezone.now()
+    Booking.objects.bulk_create([
+        Booking(user=user, car=random.choice(cars),
+                start_time=now + timedelta(hours=i), end_time=now + timedelta(hours=i + 5),
+                total_price=500)
+        for i in range(args.bookings)
+    ])
+    token = str(AccessToken.for_user(user))
+    car_ids = [car.pk for car in cars]
+
+    rows = []
+    for name, wsgi_path, asgi_path in SCENARIOS:
+        wsgi_rps, wsgi_p99 = run_wsgi(wsgi_path, car_ids, token, args.workers, args.requests)
+        asgi_rps, asgi_p99 = run_asgi(asgi_path, car_ids, token, args.workers, args.requests)
+        rows.append((name, wsgi_rps, wsgi_p99, asgi_rps, asgi_p99))
+
+    print(f'workers: {args.workers}, requests per scenario: {args.requests}')
+    _django.print_table(['endpoint', 'WSGI req/s', 'WSGI p99 ms', 'ASGI req/s', 'ASGI p99 ms'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+# =========================================================
+# Нагрузочный тест создания броней: профили БД
+# =========================================================
+# Запуск (все профили, каждый в отдельном процессе):
+#   python -m benchmarks.booking_create_load
+#   DB_ENGINE=postgres python -m benchmarks.booking_create_load --pg-db bench
+#
+# Профили:
+#   sqlite-default — SQLite без настроек (как было раньше)
+#   sqlite-tuned   — WAL, synchronous=NORMAL, busy_timeout, IMMEDIATE
+#   postgres       — настройки из окружения (DB_*), отдельная БД --pg-db
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from datetime import timedelta
+
+from benchmarks import _django
+
+PROFILES = ('sqlite-default', 'sqlite-tuned', 'postgres')
+
+
+def worker(user_id, car_ids, bookings, latencies, codes, lock):
+    from django.db import connection
+    from django.utils import timezone
+    from rest_framework.test import APIClient
+    from users.models import User
+
+    client = APIClient()
+    client.force_authenticate(User.objects.get(pk=user_id))
+    start = timezone.now() + timedelta(days=1)
+    local_latencies = []
+    local_codes = {}
+
+    for i in range(bookings):
+        begin = start + timedelta(days=i)
+        payload = {
+            'car_id': car_ids[i % len(car_ids)],
+            'start_time': begin.isoformat(),
+            'end_time': (begin + timedelta(hours=20)).isoformat(),
+        }
+        t0 = time.perf_counter()
+        response = client.post('/cars/bookings/', payload, format='json')
+        local_latencies.append(time.perf_counter() - t0)
+        local_codes[response.status_code] = local_codes.get(response.status_code, 0) + 1
+    connection.close()
+
+    with lock:
+        latencies.extend(local_latencies)
+        for code, count in local_codes.items():
+            codes[code] = codes.get(code, 0) + count
+
+
+def run_profile(profile, args):
+    options = {}
+    if profile == 'sqlite-default':
+        options['OPTIONS'] = {}
+    db_name = args.pg_db if profile == 'postgres' else None
+    _django.setup(db_name, **options)
+
+    from django.db import connection
+    from cars.models import Car
+    from users.models import User
+
+    users = User.objects.bulk_create(
+        [User(username=f'load{i}') for i in range(args.threads)]
+    )
+    # у каждого потока свои машины: меряем запись, а не отказы
+    cars = Car.objects.bulk_create([
+        Car(name=f'Car {i}', photo='cars/bench.png', year=2020,
+            car_type='suv', price_per_day=100)
+        for i in range(args.threads * 4)
+    ])
+    connection.close()
+
+    latencies, codes, lock = [], {}, threading.Lock()
+    threads = [
+        threading.Thread(target=worker, args=(
+            user.pk, [c.pk for c in cars[i * 4:(i + 1) * 4]],
+            args.bookings, latencies, codes, lock
+        ))
+        for i, user in enumerate(users)
+    ]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    latencies.sort()
+    quantile = lambda q: latencies[min(int(q * len(latencies)), len(latencies) - 1)] * 1000
+    return {
+        'profile': profile,
+        'requests': len(latencies),
+        'rps': round(len(latencies) / elapsed),
+        'p50_ms': round(statistics.median(latencies) * 1000, 1),
+        'p95_ms': round(quantile(0.95), 1),
+        'p99_ms': round(quantile(0.99), 1),
+        'codes': codes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--profile', choices=PROFILES)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--bookings', type=int, default=100, help='на поток')
+    parser.add_argument('--pg-db', default=None, help='отдельная БД PostgreSQL для прогона')
+    args = parser.parse_args()
+
+    if args.profile:
+        if args.profile == 'postgres':
+            os.environ['DB_ENGINE'] = 'postgres'
+        print(json.dumps(run_profile(args.profile, args)))
+        return
+
+    profiles = ['sqlite-default', 'sqlite-tuned']
+    if os.environ.get('DB_ENGINE') == 'postgres' and args.pg_db:
+        profiles.append('postgres')
+
+    rows = []
+    for profile in profiles:
+        env = dict(os.environ)
+        if profile != 'postgres':
+            env.pop('DB_ENGINE', None)
+        command = [
+            sys.executable, '-m', 'benchmarks.booking_create_load',
+            '--profile', profile,
+            '--threads', str(args.threads),
+            '--bookings', str(args.bookings),
+        ]
+        if args.pg_db:
+            command += ['--pg-db', args.pg_db]
+        output = subprocess.run(command, env=env, capture_output=True, text=True, check=True)
+        result = json.loads(output.stdout.strip().splitlines()[-1])
+        rows.append((
+            result['profile'], result['requests'], result['rps'],
+            result['p50_ms'], result['p95_ms'], result['p99_ms'], result['codes'],
+        ))
+
+    _django.print_table(['profile', 'requests', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms', 'status codes'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+# =========================================================
+# Бенчмарк проверки пересечений броней
+# =========================================================
+# Запуск:
+#   python -m benchmarks.booking_overlap --sizes 10000 100000 1000000
+#
+# Для каждого размера таблицы замеряется запрос из
+# BookingSerializer.validate с индексом booking_overlap_idx и без него.
+import argparse
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from benchmarks import _django
+
+
+CARS = 200
+# доля «живых» броней (pending/confirmed/active) в истории
+LIVE_SHARE = 0.02
+
+
+def seed(start_count, target_count, cars, users, now):
+    from cars.models import Booking
+
+    batch = []
+    for i in range(start_count, target_count):
+        live = random.random() < LIVE_SHARE
+        if live:
+            start = now + timedelta(hours=random.randint(1, 24 * 90))
+            status = random.choice(['pending', 'confirmed'])
+        else:
+            start = now - timedelta(hours=random.randint(24, 24 * 365 * 3))
+            status = random.choice(['completed', 'completed', 'canceled'])
+        batch.append(Booking(
+            user=random.choice(users),
+            car=random.choice(cars),
+            start_time=start,
+            end_time=start + timedelta(hours=random.randint(4, 24 * 7)),
+            status=status,
+            is_active=status != 'canceled',
+            total_price=100,
+        ))
+        if len(batch) == 5000:
+            Booking.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        Booking.objects.bulk_create(batch)
+
+
+def measure(cars, now, queries):
+    from cars.models import Booking
+
+    timings = []
+    for _ in range(queries):
+        car = random.choice(cars)
+        start = now + timedelta(hours=random.randint(1, 24 * 90))
+        end = start + timedelta(hours=random.randint(4, 24 * 7))
+        t0 = time.perf_counter()
+        Booking.objects.overlapping(car, start, end).exists()
+        timings.append(time.perf_counter() - t0)
+    return statistics.median(timings) * 1000, max(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--db', default=None)
+    args = parser.parse_args()
+
+    _django.setup(args.db)
+
+    from django.db import connection
+    from django.utils import timezone
+    from cars.models import Booking, Car
+    from users.models import User
+
+    random.seed(42)
+    now = timezone.now()
+    users = User.objects.bulk_create(
+        [User(username=f'bench{i}') for i in range(50)]
+    )
+    cars = Car.objects.bulk_create([
+        Car(name=f'Car {i}', photo='cars/bench.png', year=2020,
+            car_type='premium', price_per_day=100)
+        for i in range(CARS)
+    ])
+
+    index = next(
+        i for i in Booking._meta.indexes if i.name == 'booking_overlap_idx'
+    )
+
+    rows = []
+    seeded = 0
+    for size in sorted(args.sizes):
+        seed(seeded, size, cars, users, now)
+        seeded = size
+        connection.cursor().execute('ANALYZE')
+
+        with_median, with_max = measure(cars, now, args.queries)
+
+        with connection.schema_editor() as editor:
+            editor.remove_index(Booking, index)
+        without_median, without_max = measure(cars, now, args.queries)
+        with connection.schema_editor() as editor:
+            editor.add_index(Booking, index)
+
+        rows.append((
+            f'{size:,}',
+            f'{with_median:.3f}', f'{with_max:.3f}',
+            f'{without_median:.3f}', f'{without_max:.3f}',
+        ))
+
+    _django.print_table(
+        ['bookings', 'idx p50 ms', 'idx max ms', 'no-idx p50 ms', 'no-idx max ms'],
+        rows
+    )
+
+
+if __name__ == '__main__':
+    main()
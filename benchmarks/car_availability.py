@@ -0,0 +1,75 @@
+# =========================================================
+# Бенчмарк поиска свободных машин в окне (?start=&end=)
+# =========================================================
+# Запуск:
+#   python -m benchmarks.car_availability --cars 10000 --bookings 1000000
+import argparse
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from benchmarks import _django
+from benchmarks.booking_overlap import seed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--cars', type=int, default=10_000)
+    parser.add_argument('--bookings', type=int, default=1_000_000)
+    parser.add_argument('--queries', type=int, default=20)
+    parser.add_argument('--db', default=None)
+    args = parser.parse_args()
+
+    _django.setup(args.db)
+
+    from django.db import connection
+    from django.utils import timezone
+    from cars.filters import CarAvailabilityFilter
+    from cars.models import Car
+    from users.models import User
+
+    random.seed(42)
+    now = timezone.now()
+    users = User.objects.bulk_create(
+        [User(username=f'bench{i}') for i in range(50)]
+    )
+    cars = Car.objects.bulk_create([
+        Car(name=f'Car {i}', photo='cars/bench.png', year=2020,
+            car_type=random.choice(['electric', 'premium', 'suv', 'cargo']),
+            price_per_day=random.randint(50, 500))
+        for i in range(args.cars)
+    ], batch_size=5000)
+    seed(0, args.bookings, cars, users, now)
+    connection.cursor().execute('ANALYZE')
+
+    rows = []
+    for label, extra in (
+        ('window', {}),
+        ('window + car_type', {'car_type': 'suv'}),
+        ('window + max_price', {'max_price': '200'}),
+    ):
+        timings = []
+        found = 0
+        for _ in range(args.queries):
+            start = now + timedelta(hours=random.randint(1, 24 * 60))
+            end = start + timedelta(days=random.randint(1, 7))
+            params = {'start': start.isoformat(), 'end': end.isoformat(), **extra}
+
+            t0 = time.perf_counter()
+            qs = CarAvailabilityFilter(params, queryset=Car.objects.all()).qs
+            found = len(list(qs.values_list('pk', flat=True)))
+            timings.append(time.perf_counter() - t0)
+
+        rows.append((
+            label, found,
+            f'{statistics.median(timings) * 1000:.1f}',
+            f'{max(timings) * 1000:.1f}',
+        ))
+
+    print(f'{args.cars:,} cars x {args.bookings:,} bookings')
+    _django.print_table(['query', 'free cars', 'p50 ms', 'max ms'], rows)
+
+
+if __name__ == '__main__':
+    main()
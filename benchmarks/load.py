@@ -0,0 +1,321 @@
+# =========================================================
+# Нагрузочный сценарий по всему API
+# =========================================================
+# Запуск:
+#   python -m benchmarks.load                       # в процессе, без сети
+#   python -m benchmarks.load --vus 16 --iterations 50 --bookings 200000
+#   python -m benchmarks.load --url http://127.0.0.1:8000   # живой сервер
+#   python -m benchmarks.load --save base.json
+#   python -m benchmarks.load --baseline base.json --max-regression 20
+#
+# Каждый виртуальный пользователь (поток) повторяет сценарий клиента:
+# каталог -> поиск -> котировка -> бронь -> история -> машины рядом ->
+# аренда машины другого пользователя. По умолчанию запросы идут через
+# django.test.Client (весь стек middleware и DRF, без сокета) в свежую
+# засеянную БД; для каждого запроса считаются SQL-запросы.
+# С --url запросы идут по HTTP к серверу над БД из benchmarks.seed;
+# число SQL-запросов берётся из заголовка Server-Timing
+# (server.instrumentation).
+#
+# --baseline сравнивает p95 с сохранённым прогоном и завершается с
+# кодом 1, если какой-то эндпоинт стал медленнее больше чем на
+# --max-regression процентов — удобно перед выкладкой.
+import argparse
+import http.client
+import json
+import random
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlencode, urlsplit
+
+from benchmarks import _django, seed
+
+SEARCH_WORDS = ['toy', 'tesla', 'camry', 'suv', 'kia', 'merc', 'leaf', 'transit']
+PAGE_SIZE = 20
+# брони сценария: далеко в будущем и каждая в своём окне,
+# поэтому параллельные потоки не мешают друг другу
+BOOKING_OFFSET = timedelta(days=400)
+BOOKING_SLOT = timedelta(hours=6)
+SERVER_TIMING_QUERIES = re.compile(r'db;[^,]*desc="(\d+) queries"')
+
+
+# =========================================================
+# Транспорт: в процессе или по HTTP
+# =========================================================
+class InProcessClient:
+    def __init__(self):
+        from django.test import Client
+        self.client = Client(raise_request_exception=False)
+        self.headers = {}
+
+    def login(self, username):
+        from rest_framework_simplejwt.tokens import RefreshToken
+        from users.models import User
+
+        user = User.objects.get(username=username)
+        self.headers = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(user).access_token}'}
+
+    def request(self, method, path, params=None, body=None):
+        from django.db import connection
+
+        queries = [0]
+
+        def count(execute, sql, params, many, context):
+            queries[0] += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count):
+            if method == 'GET':
+                response = self.client.get(path, params or {}, **self.headers)
+            else:
+                response = self.client.post(
+                    path, json.dumps(body or {}), content_type='application/json', **self.headers
+                )
+        content = b''.join(response.streaming_content) if response.streaming else response.content
+        return response.status_code, content, queries[0]
+
+
+class HttpClient:
+    def __init__(self, url):
+        parts = urlsplit(url)
+        connection_class = (
+            http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        )
+        # одно keep-alive соединение на виртуального пользователя
+        self.connection = connection_class(parts.netloc, timeout=30)
+        self.prefix = parts.path.rstrip('/')
+        self.headers = {}
+
+    def login(self, username):
+        status, content, _ = self.request(
+            'POST', '/users/login/', body={'username': username, 'password': seed.PASSWORD}
+        )
+        if status != 200:
+            raise SystemExit(f'{username}: вход не удался ({status}), БД засеяна benchmarks.seed?')
+        self.headers = {'Authorization': f'Bearer {json.loads(content)["access"]}'}
+
+    def request(self, method, path, params=None, body=None):
+        url = self.prefix + path
+        if params:
+            url += '?' + urlencode(params)
+        headers = dict(self.headers)
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+        try:
+            self.connection.request(method, url, body=payload, headers=headers)
+            response = self.connection.getresponse()
+            content = response.read()
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            return 0, b'', None
+        match = SERVER_TIMING_QUERIES.search(response.getheader('Server-Timing') or '')
+        return response.status, content, int(match.group(1)) if match else None
+
+
+# =========================================================
+# Сценарий
+# =========================================================
+class Recorder:
+    def __init__(self):
+        self.results = {}
+        self.lock = threading.Lock()
+
+    def add(self, endpoint, seconds, status, queries):
+        with self.lock:
+            result = self.results.setdefault(
+                endpoint, {'latencies': [], 'queries': [], 'errors': 0, 'codes': {}}
+            )
+            result['latencies'].append(seconds)
+            if queries is not None:
+                result['queries'].append(queries)
+            if not 200 <= status < 300:
+                result['errors'] += 1
+                result['codes'][status] = result['codes'].get(status, 0) + 1
+
+
+def call(client, recorder, endpoint, method, path, params=None, body=None):
+    t0 = time.perf_counter()
+    status, content, queries = client.request(method, path, params, body)
+    recorder.add(endpoint, time.perf_counter() - t0, status, queries)
+    if 200 <= status < 300 and content:
+        return json.loads(content)
+    return None
+
+
+def results_of(data):
+    if isinstance(data, dict):
+        return data.get('results', [])
+    return data or []
+
+
+def scenario(client, recorder, vu, iteration, iterations, car_ids, rng):
+    page = call(client, recorder, 'car-list', 'GET', '/cars/cars/', {'page_size': PAGE_SIZE})
+    car_ids = [car['id'] for car in results_of(page) if car.get('is_available')] or car_ids
+
+    call(client, recorder, 'search', 'GET', '/cars/search/', {'q': rng.choice(SEARCH_WORDS)})
+    call(client, recorder, 'car-list?search', 'GET', '/cars/cars/',
+         {'search': rng.choice(SEARCH_WORDS), 'page_size': PAGE_SIZE})
+
+    car_id = rng.choice(car_ids)
+    start = (
+        datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+        + BOOKING_OFFSET + BOOKING_SLOT * (vu * iterations + iteration)
+    )
+    window = {
+        'start_time': start.isoformat(),
+        'end_time': (start + timedelta(hours=rng.randint(2, 5))).isoformat(),
+    }
+    call(client, recorder, 'car-quote', 'GET', f'/cars/cars/{car_id}/quote/', window)
+    call(client, recorder, 'booking-create', 'POST', '/cars/bookings/',
+         body={'car_id': car_id, 'with_driver': rng.random() < 0.2, **window})
+    call(client, recorder, 'booking-history', 'GET', '/cars/bookings/history/',
+         {'page_size': PAGE_SIZE})
+
+    _, lat, lon = rng.choice(seed.CITIES)
+    nearby = call(client, recorder, 'available-cars?near', 'GET', '/user_cars/cars/available/',
+                  {'near': f'{lat},{lon}', 'limit': PAGE_SIZE})
+    peers = [car['id'] for car in results_of(nearby)]
+    if peers:
+        call(client, recorder, 'rent-car', 'POST', f'/user_cars/cars/{rng.choice(peers)}/rent/')
+
+
+def run(make_client, vus, iterations):
+    recorder = Recorder()
+    catalogue = make_client()
+    page = call(catalogue, Recorder(), 'car-list', 'GET', '/cars/cars/', {'page_size': 500})
+    car_ids = [car['id'] for car in results_of(page) if car.get('is_available')]
+    if not car_ids:
+        raise SystemExit('Каталог пуст: БД не засеяна?')
+
+    clients = []
+    for vu in range(vus):
+        client = make_client()
+        client.login(seed.USERNAME.format(vu))
+        clients.append(client)
+
+    def worker(vu):
+        rng = random.Random(vu)
+        for iteration in range(iterations):
+            scenario(clients[vu], recorder, vu, iteration, iterations, car_ids, rng)
+
+    threads = [threading.Thread(target=worker, args=(vu,)) for vu in range(vus)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return recorder.results, time.perf_counter() - t0
+
+
+# =========================================================
+# Отчёт
+# =========================================================
+def quantile(values, q):
+    return values[min(int(q * len(values)), len(values) - 1)] * 1000
+
+
+def summarize(results, elapsed):
+    summary = {}
+    for endpoint, result in sorted(results.items()):
+        latencies = sorted(result['latencies'])
+        queries = result['queries']
+        summary[endpoint] = {
+            'requests': len(latencies),
+            'rps': round(len(latencies) / elapsed, 1),
+            'p50_ms': round(quantile(latencies, 0.5), 1),
+            'p95_ms': round(quantile(latencies, 0.95), 1),
+            'p99_ms': round(quantile(latencies, 0.99), 1),
+            'queries': round(sum(queries) / len(queries), 1) if queries else None,
+            'max_queries': max(queries) if queries else None,
+            'errors': result['errors'],
+            'codes': result['codes'],
+        }
+    return summary
+
+
+def regressions(summary, baseline, max_regression):
+    found = []
+    for endpoint, before in baseline.get('endpoints', {}).items():
+        after = summary.get(endpoint)
+        if after is None or not before['p95_ms']:
+            continue
+        change = (after['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100
+        if change > max_regression:
+            found.append((endpoint, before['p95_ms'], after['p95_ms'], f'+{change:.0f}%'))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', default=None, help='живой сервер вместо прогона в процессе')
+    parser.add_argument('--vus', type=int, default=8, help='виртуальных пользователей (потоков)')
+    parser.add_argument('--iterations', type=int, default=20, help='сценариев на пользователя')
+    parser.add_argument('--db', default=None, help='засеянная БД для прогона в процессе')
+    parser.add_argument('--save', default=None, help='сохранить результат в JSON')
+    parser.add_argument('--baseline', default=None, help='JSON прошлого прогона для сравнения')
+    parser.add_argument('--max-regression', type=float, default=20, help='допустимый рост p95, %%')
+    seed.add_arguments(parser)
+    args = parser.parse_args()
+
+    if args.url:
+        make_client = lambda: HttpClient(args.url)
+    else:
+        _django.setup(args.db)
+        if not seed.seeded():
+            t0 = time.perf_counter()
+            seed.seed_from_args(args)
+            print(f'seed: {time.perf_counter() - t0:.1f} с', file=sys.stderr)
+        if args.vus > args.users:
+            raise SystemExit('--vus не может быть больше --users')
+
+        from django.db import connection
+        connection.close()
+        make_client = InProcessClient
+
+    results, elapsed = run(make_client, args.vus, args.iterations)
+    summary = summarize(results, elapsed)
+    total = sum(row['requests'] for row in summary.values())
+
+    _django.print_table(
+        ['endpoint', 'requests', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms', 'queries', 'max q', 'errors'],
+        [
+            (endpoint, row['requests'], row['rps'], row['p50_ms'], row['p95_ms'], row['p99_ms'],
+             '-' if row['queries'] is None else row['queries'],
+             '-' if row['max_queries'] is None else row['max_queries'],
+             f"{row['errors']} {row['codes']}" if row['errors'] else 0)
+            for endpoint, row in summary.items()
+        ]
+    )
+    print(f'\n{total} запросов за {elapsed:.1f} с: {total / elapsed:.0f} req/s, '
+          f'{args.vus} пользователей x {args.iterations} сценариев')
+
+    report = {
+        'target': args.url or 'in-process',
+        'vus': args.vus,
+        'iterations': args.iterations,
+        'elapsed_s': round(elapsed, 2),
+        'rps': round(total / elapsed, 1),
+        'endpoints': summary,
+    }
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        found = regressions(summary, baseline, args.max_regression)
+        if found:
+            print(f'\nРегрессии p95 больше {args.max_regression:g}%:')
+            _django.print_table(['endpoint', 'было ms', 'стало ms', 'рост'], found)
+            raise SystemExit(1)
+        print(f'\nРегрессий p95 больше {args.max_regression:g}% нет')
+
+
+if __name__ == '__main__':
+    main()
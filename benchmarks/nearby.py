@@ -0,0 +1,99 @@
+# =========================================================
+# Бенчмарк поиска машин рядом (user_cars.geo)
+# =========================================================
+# Запуск:
+#   python -m benchmarks.nearby --sizes 10000 100000 500000
+#
+# Машины случайно разбросаны по прямоугольнику ~550 x 700 км.
+# Для каждого размера сравнивается geo.nearby с полным перебором
+# (расстояние до каждой машины) — и по времени, и по результату.
+import argparse
+import random
+import statistics
+import time
+
+from benchmarks import _django
+
+RADII = [1, 5, 20, 100]
+LIMIT = 50
+
+
+def seed(start_count, target_count, owner):
+    from user_cars import geo
+    from user_cars.models import Car
+
+    batch = []
+    for i in range(start_count, target_count):
+        lat, lon = random.uniform(36, 41), random.uniform(67, 75)
+        # bulk_create обходит save() — geohash считаем сами
+        batch.append(Car(
+            user=owner, car_name=f'Car {i}', year=2020, car_type='suv',
+            price_per_day=50, location='bench',
+            latitude=lat, longitude=lon, geohash=geo.encode(lat, lon),
+        ))
+        if len(batch) == 5000:
+            Car.objects.bulk_create(batch)
+            batch = []
+    Car.objects.bulk_create(batch)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 500_000])
+    parser.add_argument('--queries', type=int, default=20)
+    parser.add_argument('--db', default=None)
+    args = parser.parse_args()
+
+    _django.setup(args.db)
+
+    from django.db import connection
+    from user_cars import geo
+    from user_cars.models import Car
+    from user_cars.views import NEAR_MAX_CANDIDATES
+    from users.models import User
+
+    random.seed(42)
+    owner = User.objects.create(username='bench-owner')
+    queryset = Car.objects.filter(amount__gt=0)
+
+    rows = []
+    seeded = 0
+    for size in sorted(args.sizes):
+        seed(seeded, size, owner)
+        seeded = size
+        connection.cursor().execute('ANALYZE')
+        points = list(queryset.values_list('pk', 'latitude', 'longitude'))
+
+        for radius in RADII:
+            indexed, brute, exact = [], [], True
+            for _ in range(args.queries):
+                lat, lon = random.uniform(36.5, 40.5), random.uniform(67.5, 74.5)
+
+                t0 = time.perf_counter()
+                found = [car.pk for car in geo.nearby(queryset, lat, lon, radius, LIMIT, NEAR_MAX_CANDIDATES)]
+                indexed.append(time.perf_counter() - t0)
+
+                t0 = time.perf_counter()
+                expected = sorted(
+                    (geo.distance_km(lat, lon, car_lat, car_lon), pk)
+                    for pk, car_lat, car_lon in points
+                )
+                expected = [pk for distance, pk in expected if distance <= radius][:LIMIT]
+                brute.append(time.perf_counter() - t0)
+                exact = exact and found == expected
+
+            rows.append((
+                f'{size:,}', radius,
+                f'{statistics.median(indexed) * 1000:.2f}',
+                f'{statistics.median(brute) * 1000:.1f}',
+                'yes' if exact else 'NO',
+            ))
+
+    _django.print_table(
+        ['cars', 'radius km', 'nearby p50 ms', 'full scan p50 ms', 'same result'],
+        rows
+    )
+
+
+if __name__ == '__main__':
+    main()
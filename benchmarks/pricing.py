@@ -0,0 +1,84 @@
+# =========================================================
+# Бенчмарк пакетного расчёта цен
+# =========================================================
+# Запуск:
+#   python -m benchmarks.pricing --sizes 1000 10000 100000
+#
+# Сравнивает цену по одной брони с циклом по дням (как раньше
+# считал Booking.calculate_price, но с теми же правилами) и
+# cars.pricing.price_many на одном пакете. Цены обязаны совпасть.
+import argparse
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from benchmarks import _django
+
+RULES = {
+    'driver_multiplier': '1.2',
+    'weekend_multiplier': '1.25',
+    'seasons': [
+        {'start': '06-01', 'end': '08-31', 'multiplier': '1.15'},
+        {'start': '12-20', 'end': '01-10', 'multiplier': '1.3'},
+    ],
+    'long_rental_discounts': [[7, '0.05'], [30, '0.15']],
+}
+
+
+def make_items(count, cars, now):
+    items = []
+    for _ in range(count):
+        start = now + timedelta(hours=random.randint(1, 24 * 365))
+        items.append((
+            random.choice(cars),
+            start,
+            start + timedelta(hours=random.randint(4, 24 * 45)),
+            random.random() < 0.3,
+        ))
+    return items
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    args = parser.parse_args()
+
+    _django.setup()
+
+    from django.utils import timezone
+    from cars.models import Car
+    from cars.pricing import PricingEngine
+
+    random.seed(42)
+    engine = PricingEngine(RULES)
+    cars = [Car(name=f'Car {i}', price_per_day=Decimal(random.randint(30, 300))) for i in range(200)]
+    now = timezone.now()
+
+    rows = []
+    for size in args.sizes:
+        items = make_items(size, cars, now)
+
+        t0 = time.perf_counter()
+        one_by_one = [engine.price_one(*item) for item in items]
+        single = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        batch = engine.price_many(items)
+        batched = time.perf_counter() - t0
+
+        assert batch == one_by_one, 'price_many расходится с эталоном'
+        rows.append((
+            f'{size:,}',
+            f'{single * 1000:.1f}', f'{batched * 1000:.1f}',
+            f'{size / batched:,.0f}', f'{single / batched:.1f}x',
+        ))
+
+    _django.print_table(
+        ['bookings', 'per-booking ms', 'price_many ms', 'price_many/s', 'speedup'],
+        rows
+    )
+
+
+if __name__ == '__main__':
+    main()
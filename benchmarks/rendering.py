@@ -0,0 +1,95 @@
+# =========================================================
+# Микробенчмарк рендеринга JSON и сжатия ответов
+# =========================================================
+# Запуск:
+#   python -m benchmarks.rendering --rows 5000
+#
+# Для больших списков машин и броней (данные уже сериализованы, как
+# response.data во вьюхе) замеряется время рендеринга:
+# DRF JSONRenderer против server.renderers (orjson и stdlib json),
+# и размер тела без сжатия / gzip / brotli (если установлен) с
+# временем сжатия. Заодно проверяется, что JSON совпадает байт в байт.
+import argparse
+import statistics
+import time
+
+from benchmarks import _django
+
+
+def measure(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - t0)
+    return statistics.median(timings) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--db', default=None)
+    args = parser.parse_args()
+
+    _django.setup(args.db)
+
+    import random
+
+    from rest_framework.renderers import JSONRenderer
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+
+    from benchmarks.serializers import seed
+    from cars.fast_serializers import FastBookingSerializer, FastCarSerializer
+    from cars.models import Booking, Car
+    from server import compression, renderers
+
+    random.seed(3)
+    user = seed(args.rows)
+    request = Request(APIRequestFactory().get('/'))
+    request.user = user
+    context = {'request': request}
+
+    payloads = [
+        ('cars', FastCarSerializer, Car.objects.all()),
+        ('bookings', FastBookingSerializer, Booking.objects.all()),
+    ]
+
+    drf = JSONRenderer()
+    backends = [('json', renderers.dumps_json)]
+    if renderers.orjson is not None:
+        backends.insert(0, ('orjson', renderers.dumps_orjson))
+
+    codings = ['gzip'] + (['br'] if compression.brotli is not None else [])
+
+    render_rows, size_rows = [], []
+    for name, serializer_class, queryset in payloads:
+        objects = list(serializer_class.setup_eager_loading(queryset))
+        data = serializer_class(objects, many=True, context=context).data
+
+        drf_ms, expected = measure(lambda: drf.render(data), args.repeat)
+        render_rows.append((name, len(objects), 'DRF JSONRenderer', f'{drf_ms:.1f}', '1.0x', 'yes'))
+        for backend, dumps in backends:
+            ms, body = measure(lambda: dumps(data), args.repeat)
+            render_rows.append((
+                name, len(objects), backend, f'{ms:.1f}', f'{drf_ms / ms:.1f}x',
+                'yes' if body == expected else 'NO',
+            ))
+
+        size_rows.append((name, 'identity', len(expected), '100%', '-'))
+        for coding in codings:
+            ms, body = measure(lambda: compression.compress(coding, expected), args.repeat)
+            size_rows.append((
+                name, coding, len(body), f'{len(body) / len(expected):.0%}', f'{ms:.1f}',
+            ))
+
+    _django.print_table(['payload', 'rows', 'renderer', 'ms', 'speedup', 'same JSON'], render_rows)
+    print()
+    _django.print_table(['payload', 'encoding', 'bytes', 'of raw', 'ms'], size_rows)
+    if compression.brotli is None:
+        print('\nbrotli не установлен — только gzip')
+
+
+if __name__ == '__main__':
+    main()
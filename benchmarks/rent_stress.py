@@ -0,0 +1,157 @@
+# =========================================================
+# Стресс-тест аренды (user_cars.rentals.rent_car)
+# =========================================================
+# Запуск:
+#   python -m benchmarks.rent_stress --threads 8 --rentals 2000
+#
+# Несколько потоков одновременно арендуют машины друг у друга.
+# После прогона проверяется, что деньги сошлись: сумма балансов не
+# изменилась, отрицательных балансов и «лишних» аренд нет.
+# Балансы читаются как снимок + журнал (user_cars.ledger); с --compact
+# параллельно аренде крутится сворачивание журнала в снимки.
+import argparse
+import random
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from benchmarks import _django
+
+
+def worker(rentals, user_ids, car_ids, counters, lock):
+    from django.db import OperationalError, connection
+    from user_cars.rentals import RentalError, rent_car
+    from users.models import User
+
+    users = list(User.objects.filter(pk__in=user_ids))
+    ok = rejected = failed = 0
+    for _ in range(rentals):
+        try:
+            rent_car(random.choice(car_ids), random.choice(users))
+            ok += 1
+        except RentalError:
+            rejected += 1
+        except OperationalError:
+            failed += 1
+    connection.close()
+
+    with lock:
+        counters['ok'] += ok
+        counters['rejected'] += rejected
+        counters['failed'] += failed
+
+
+def compactor(stop):
+    from django.db import OperationalError, connection
+    from user_cars.ledger import compact
+
+    while not stop.is_set():
+        try:
+            compact(lag=timedelta(0))
+        except OperationalError:
+            pass
+        stop.wait(0.05)
+    connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--rentals', type=int, default=2000)
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--cars', type=int, default=10)
+    parser.add_argument('--db', default=None)
+    parser.add_argument('--compact', action='store_true', help='сворачивать журнал во время прогона')
+    args = parser.parse_args()
+
+    # настройки SQLite (WAL, IMMEDIATE, busy_timeout) берутся из settings
+    _django.setup(args.db)
+
+    from django.db import connection
+    from django.db.models import Sum
+    from user_cars import ledger
+    from user_cars.models import Balance, BalanceEntry, Car, Rental
+    from users.models import User
+
+    random.seed(7)
+    users = User.objects.bulk_create(
+        [User(username=f'renter{i}') for i in range(args.users)]
+    )
+    Balance.objects.bulk_create(
+        [Balance(user=u, amount=Decimal(random.randint(100, 2000))) for u in users]
+    )
+    cars = Car.objects.bulk_create([
+        Car(user=random.choice(users), car_name=f'Car {i}', year=2020,
+            car_type='suv', price_per_day=Decimal(random.randint(10, 150)),
+            location='Dushanbe', amount=random.randint(20, 200))
+        for i in range(args.cars)
+    ])
+
+    initial = dict(Balance.objects.values_list('user_id', 'amount'))
+    money_before = sum(initial.values())
+    stock_before = Car.objects.aggregate(s=Sum('amount'))['s']
+    connection.close()
+
+    counters = {'ok': 0, 'rejected': 0, 'failed': 0}
+    lock = threading.Lock()
+    per_thread = args.rentals // args.threads
+    threads = [
+        threading.Thread(
+            target=worker,
+            args=(per_thread, [u.pk for u in users], [c.pk for c in cars], counters, lock)
+        )
+        for _ in range(args.threads)
+    ]
+
+    stop = threading.Event()
+    if args.compact:
+        threads.append(threading.Thread(target=compactor, args=(stop,)))
+
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads[:args.threads]:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    for t in threads:
+        t.join()
+
+    current = ledger.balances(initial)
+    money_after = sum(current.values())
+    stock_after = Car.objects.aggregate(s=Sum('amount'))['s']
+    rentals = Rental.objects.count()
+
+    # баланс каждого = начальный - потрачено + заработано
+    expected = dict(initial)
+    for rental in Rental.objects.select_related('car'):
+        expected[rental.renter_id] -= rental.car.price_per_day
+        expected[rental.car.user_id] += rental.car.price_per_day
+    reconciled = expected == current
+    negative = sum(1 for amount in current.values() if amount < 0)
+
+    attempts = per_thread * args.threads
+    _django.print_table(['metric', 'value'], [
+        ('threads', args.threads),
+        ('attempts', attempts),
+        ('rented', counters['ok']),
+        ('rejected (funds/stock/own)', counters['rejected']),
+        ('failed after retries', counters['failed']),
+        ('attempts/s', f'{attempts / elapsed:.0f}'),
+        ('money before/after', f'{money_before} / {money_after}'),
+        ('negative balances', negative),
+        ('rentals == stock used', rentals == stock_before - stock_after == counters['ok']),
+        ('ledger entries', BalanceEntry.objects.count()),
+        ('compacted snapshots', Balance.objects.filter(entry_id__gt=0).count()),
+        ('balances reconcile', reconciled),
+    ])
+
+    assert money_before == money_after, 'сумма балансов изменилась'
+    assert rentals == stock_before - stock_after == counters['ok']
+    assert not negative
+    assert reconciled, 'балансы не сходятся с историей аренд'
+
+
+if __name__ == '__main__':
+    main()
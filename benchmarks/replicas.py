@@ -0,0 +1,153 @@
+# =========================================================
+# Чтение с реплик и read-your-writes на нескольких файлах SQLite
+# =========================================================
+# Запуск:
+#   python -m benchmarks.replicas --replicas 2 --requests 200
+#
+# Primary и реплики — отдельные файлы SQLite во временной папке
+# (DB_REPLICAS, server.db_router). «Репликация» — копия файла primary
+# через backup API, между копиями реплика отстаёт сколько угодно.
+# Скрипт показывает, с какой БД обслужены GET списков и деталей, и что
+# только что созданная бронь видна её автору сразу (окно
+# REPLICA_STICKY_SECONDS), хотя реплики её ещё не получили.
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from collections import Counter
+from contextlib import ExitStack
+from datetime import timedelta
+
+from benchmarks import _django, seed
+
+
+def replicate():
+    from django.conf import settings
+    from django.db import connections
+
+    primary = settings.DATABASES['default']['NAME']
+    for alias in settings.DATABASE_REPLICAS:
+        connections[alias].close()
+        source = sqlite3.connect(primary)
+        target = sqlite3.connect(settings.DATABASES[alias]['NAME'])
+        with target:
+            source.backup(target)
+        source.close()
+        target.close()
+
+
+def served_by(func):
+    # {alias: число SQL-запросов} по всем БД за время func()
+    from django.db import connections
+
+    counts = Counter()
+
+    def wrapper(alias):
+        def count(execute, sql, params, many, context):
+            counts[alias] += 1
+            return execute(sql, params, many, context)
+        return count
+
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(wrapper(alias)))
+        result = func()
+    return result, counts
+
+
+def describe(counts):
+    return ', '.join(f'{alias}={n}' for alias, n in sorted(counts.items())) or '-'
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--replicas', type=int, default=2)
+    parser.add_argument('--requests', type=int, default=200, help='GET на эндпоинт для распределения')
+    parser.add_argument('--sticky', type=int, default=5, help='REPLICA_STICKY_SECONDS')
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp(prefix='bench-replicas-')
+    os.environ['DB_REPLICAS'] = ','.join(
+        os.path.join(folder, f'replica{i}.sqlite3') for i in range(1, args.replicas + 1)
+    )
+    os.environ['REPLICA_STICKY_SECONDS'] = str(args.sticky)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'server.settings')
+
+    from django.conf import settings
+
+    # с репликами метки read-your-writes — только в общем кэше
+    # (server.db_router.check_sticky_cache)
+    settings.CACHES['sticky'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(folder, 'sticky-cache'),
+    }
+    settings.REPLICA_STICKY_CACHE = 'sticky'
+    _django.setup(os.path.join(folder, 'primary.sqlite3'))
+
+    from django.utils import timezone
+    from rest_framework.test import APIClient
+
+    from cars.models import Car
+    from server import db_router
+    from users.models import User
+
+    seed.seed(users=20, cars=40, user_cars=200, bookings=2000, rentals=50)
+    replicate()
+
+    author = User.objects.get(username=seed.USERNAME.format(0))
+    other = User.objects.get(username=seed.USERNAME.format(1))
+    clients = {}
+    for user in (author, other):
+        clients[user.username] = APIClient()
+        clients[user.username].force_authenticate(user)
+    car = Car.objects.order_by('id').first()
+
+    # --- распределение чтений ---
+    endpoints = [
+        ('booking-history', '/cars/bookings/history/'),
+        ('booking-list', '/cars/bookings/'),
+        ('available-cars', '/user_cars/cars/available/'),
+    ]
+    rows = []
+    for name, path in endpoints:
+        total = Counter()
+        t0 = time.perf_counter()
+        for _ in range(args.requests):
+            _, counts = served_by(lambda: clients[other.username].get(path))
+            total.update(counts)
+        ms = (time.perf_counter() - t0) / args.requests * 1000
+        rows.append((name, args.requests, describe(total), f'{ms:.2f}'))
+    _django.print_table(['endpoint', 'requests', 'SQL по БД', 'ms/req'], rows)
+
+    # --- read-your-writes ---
+    def history(username):
+        response = clients[username].get('/cars/bookings/history/', {'page_size': 100})
+        return {row['id'] for row in response.data['results']}
+
+    start = timezone.now().replace(microsecond=0) + timedelta(days=500)
+    response, counts = served_by(lambda: clients[author.username].post('/cars/bookings/', {
+        'car_id': car.pk, 'start_time': start.isoformat(),
+        'end_time': (start + timedelta(hours=3)).isoformat(),
+    }, format='json'))
+    booking_id = response.data['id']
+    steps = [('POST бронь', response.status_code, describe(counts), '-')]
+
+    seen, counts = served_by(lambda: history(author.username))
+    steps.append(('автор: история сразу', 200, describe(counts), 'да' if booking_id in seen else 'НЕТ'))
+
+    # окно истекло, реплики ещё не догнали — бронь не видна
+    db_router.get_cache().clear()
+    seen, counts = served_by(lambda: history(author.username))
+    steps.append(('автор: после окна, реплика отстаёт', 200, describe(counts), 'да' if booking_id in seen else 'нет'))
+
+    replicate()
+    seen, counts = served_by(lambda: history(author.username))
+    steps.append(('автор: после репликации', 200, describe(counts), 'да' if booking_id in seen else 'НЕТ'))
+
+    print()
+    _django.print_table(['шаг', 'код', 'SQL по БД', 'бронь видна'], steps)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+# =========================================================
+# Бенчмарк поиска машин
+# =========================================================
+# Запуск:
+#   python -m benchmarks.search --sizes 10000 100000 500000
+#
+# Сравнивает прежний SearchFilter (name icontains) с фильтром и
+# ранжированным поиском через индекс cars.search. Фильтр списка точный:
+# его время растёт с числом совпадений (matches), а не с размером таблицы.
+import argparse
+import random
+import statistics
+import time
+
+from benchmarks import _django
+
+BRANDS = ['Toyota', 'Tesla', 'Hyundai', 'Kia', 'Lexus', 'Chevrolet', 'Nissan', 'Mercedes', 'BMW', 'Audi']
+MODELS = ['Camry', 'Model', 'Sonata', 'Rio', 'Prado', 'Malibu', 'Leaf', 'Sprinter', 'X5', 'Q7']
+# '9999' — подстрока номера, совпадений единицы на любом размере;
+# остальные запросы совпадают с десятой долей каталога и больше
+QUERIES = ['toyota cam', 'tesla', 'spr', 'lexus 7', 'rio', '9999']
+
+
+def seed(start_count, target_count):
+    from cars.models import Car
+
+    batch = []
+    for i in range(start_count, target_count):
+        batch.append(Car(
+            name=f'{random.choice(BRANDS)} {random.choice(MODELS)} {i}',
+            photo='cars/bench.png', year=random.randint(2005, 2024),
+            car_type=random.choice(['electric', 'premium', 'suv', 'cargo']),
+            price_per_day=random.randint(30, 300),
+        ))
+        if len(batch) == 5000:
+            Car.objects.bulk_create(batch)
+            batch = []
+    Car.objects.bulk_create(batch)
+
+
+def timed(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - t0)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 500_000])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--db', default=None)
+    args = parser.parse_args()
+
+    _django.setup(args.db)
+
+    from django.db import connection
+    from cars import search
+    from cars.models import Car
+
+    random.seed(42)
+    rows = []
+    seeded = 0
+    for size in sorted(args.sizes):
+        seed(seeded, size)
+        seeded = size
+        # bulk_create обходит сигналы — индекс пересобираем целиком
+        search.rebuild()
+        connection.cursor().execute('ANALYZE')
+
+        # первая страница списка, как отдаёт CarListAPIView
+        page = Car.objects.order_by('name', 'id')
+        for query in QUERIES:
+            first_word = query.split()[0]
+            icontains = timed(lambda: list(page.filter(name__icontains=first_word)[:50]), args.repeat)
+            indexed = timed(lambda: list(search.filter_queryset(page, 'car', query)[:50]), args.repeat)
+            ranked = timed(lambda: search.search(query, kind='car', limit=20), args.repeat)
+            matches = search.filter_queryset(page, 'car', query).count()
+            rows.append((f'{size:,}', query, f'{matches:,}', f'{icontains:.2f}', f'{indexed:.2f}', f'{ranked:.2f}'))
+
+    _django.print_table(
+        ['cars', 'query', 'matches', 'icontains p50 ms', 'fts filter p50 ms', 'ranked p50 ms'],
+        rows
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,209 @@
+# =========================================================
+# Генератор данных для нагрузочных прогонов
+# =========================================================
+# Запуск (отдельная БД, которую потом раздаёт живой сервер):
+#   python -m benchmarks.seed --db /tmp/bench.sqlite3 --bookings 200000
+#   DB_NAME=/tmp/bench.sqlite3 python manage.py runserver --noreload
+#   python -m benchmarks.load --url http://127.0.0.1:8000
+#
+# Пользователи bench0..benchN (пароль PASSWORD), каталог машин компании,
+# машины пользователей с координатами, история броней и аренд.
+# Всё пишется через bulk_create, производные таблицы (статистика,
+# календарь, поисковый индекс) пересобираются в конце.
+import argparse
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from benchmarks import _django
+
+USERNAME = 'bench{}'
+PASSWORD = 'bench-pass'
+BATCH = 5000
+
+CAR_MODELS = [
+    ('Toyota Camry', 'premium'), ('Toyota RAV4', 'suv'), ('Tesla Model 3', 'electric'),
+    ('Hyundai Sonata', 'premium'), ('Kia Sportage', 'suv'), ('Chevrolet Malibu', 'premium'),
+    ('Nissan Leaf', 'electric'), ('Lexus RX', 'suv'), ('Mercedes Sprinter', 'cargo'),
+    ('Ford Transit', 'cargo'), ('BYD Han', 'electric'), ('Mercedes E-Class', 'premium'),
+]
+# города и их центры: машины пользователей кучкуются вокруг них
+CITIES = [
+    ('Dushanbe', 38.56, 68.78), ('Khujand', 40.28, 69.62),
+    ('Kulob', 37.91, 69.78), ('Bokhtar', 37.84, 68.78),
+]
+# доля отменённых и мягко удалённых броней в истории
+CANCELED_SHARE = 0.1
+DELETED_SHARE = 0.03
+# история броней: три года назад и два месяца вперёд
+HISTORY = timedelta(days=365 * 3)
+HORIZON = timedelta(days=60)
+
+
+def in_batches(model, objects):
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) == BATCH:
+            model.objects.bulk_create(batch)
+            batch = []
+    model.objects.bulk_create(batch)
+
+
+def booking_rows(cars, users, count, now):
+    # У каждой машины своя шкала времени: брони идут друг за другом без
+    # пересечений, поэтому «живые» брони не нарушают правил сервиса.
+    per_car = max(count // len(cars), 1)
+    slot = (HISTORY + HORIZON) / per_car
+    first = now - HISTORY
+    made = 0
+    for car in cars:
+        for k in range(per_car):
+            if made == count:
+                return
+            made += 1
+            start = first + slot * k + slot * random.uniform(0, 0.2)
+            duration = max(slot * random.uniform(0.1, 0.7), timedelta(hours=1))
+            end = start + duration
+            if end <= now:
+                status = 'canceled' if random.random() < CANCELED_SHARE else 'completed'
+            elif start <= now:
+                status = 'active'
+            else:
+                status = random.choice(['pending', 'confirmed'])
+            yield car, random.choice(users), start, end, status
+
+
+def seed(users=1000, cars=300, user_cars=3000, bookings=100_000, rentals=20_000, now=None):
+    from django.contrib.auth.hashers import make_password
+    from django.utils import timezone
+
+    from cars import calendar, search, stats
+    from cars.models import Booking, Car
+    from cars.pricing import price_many
+    from user_cars import geo
+    from user_cars.models import Balance, Car as UserCar, Rental
+    from users.models import User
+
+    now = now or timezone.now()
+    # хэш пароля считаем один раз: PBKDF2 на каждого — минуты
+    password = make_password(PASSWORD)
+
+    in_batches(User, (
+        User(username=USERNAME.format(i), password=password, email=f'bench{i}@example.com')
+        for i in range(users)
+    ))
+    user_list = list(User.objects.filter(username__startswith='bench').order_by('pk'))
+    in_batches(Balance, (
+        Balance(user=user, amount=Decimal(random.randint(5_000, 50_000)))
+        for user in user_list
+    ))
+
+    in_batches(Car, (
+        Car(
+            name=f'{model} {i}', photo='cars/bench.png', year=random.randint(2015, 2025),
+            car_type=car_type, price_per_day=Decimal(random.randint(30, 300)),
+            seats=random.choice([2, 5, 5, 7]), is_available=random.random() > 0.05,
+        )
+        for i, (model, car_type) in ((i, random.choice(CAR_MODELS)) for i in range(cars))
+    ))
+    car_list = list(Car.objects.order_by('pk'))
+
+    def user_car_rows():
+        for i in range(user_cars):
+            model, car_type = random.choice(CAR_MODELS)
+            city, lat, lon = random.choice(CITIES)
+            lat, lon = lat + random.gauss(0, 0.05), lon + random.gauss(0, 0.05)
+            # bulk_create обходит save() — geohash считаем сами
+            yield UserCar(
+                user=random.choice(user_list), car_name=f'{model} #{i}',
+                year=random.randint(2010, 2025), car_type=car_type,
+                price_per_day=Decimal(random.randint(20, 150)), location=city,
+                amount=random.randint(1, 20),
+                latitude=lat, longitude=lon, geohash=geo.encode(lat, lon),
+            )
+
+    in_batches(UserCar, user_car_rows())
+    user_car_ids = list(UserCar.objects.values_list('pk', flat=True))
+
+    # цены — одним пакетом на BATCH броней, как в cars.bulk
+    rows = list(booking_rows(car_list, user_list, bookings, now))
+    for offset in range(0, len(rows), BATCH):
+        chunk = rows[offset:offset + BATCH]
+        prices = price_many(
+            (car, start, end, random.random() < 0.2) for car, _, start, end, _ in chunk
+        )
+        Booking.objects.bulk_create([
+            Booking(
+                car=car, user=user, start_time=start, end_time=end, status=status,
+                total_price=price, is_active=random.random() > DELETED_SHARE,
+            )
+            for (car, user, start, end, status), price in zip(chunk, prices)
+        ])
+
+    in_batches(Rental, (
+        Rental(
+            car_id=random.choice(user_car_ids), renter=random.choice(user_list),
+            end_date=(now - timedelta(days=random.randint(0, 365))).date()
+            if random.random() < 0.8 else None,
+        )
+        for _ in range(rentals)
+    ))
+
+    # производные таблицы: bulk_create сигналов не шлёт
+    stats.rebuild()
+    calendar.rebuild()
+    search.rebuild()
+
+    return {
+        'users': len(user_list),
+        'cars': len(car_list),
+        'user_cars': len(user_car_ids),
+        'bookings': Booking.objects.count(),
+        'rentals': rentals,
+    }
+
+
+def seeded():
+    from users.models import User
+    return User.objects.filter(username=USERNAME.format(0)).exists()
+
+
+def add_arguments(parser):
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--cars', type=int, default=300)
+    parser.add_argument('--user-cars', type=int, default=3000)
+    parser.add_argument('--bookings', type=int, default=100_000)
+    parser.add_argument('--rentals', type=int, default=20_000)
+    parser.add_argument('--seed', type=int, default=42, help='seed генератора случайных чисел')
+
+
+def seed_from_args(args):
+    random.seed(args.seed)
+    return seed(
+        users=args.users, cars=args.cars, user_cars=args.user_cars,
+        bookings=args.bookings, rentals=args.rentals,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--db', default=None, help='файл SQLite или отдельная БД PostgreSQL')
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    db_name = _django.setup(args.db)
+    if seeded():
+        raise SystemExit(f'{db_name}: данные бенчмарка уже есть')
+
+    t0 = time.perf_counter()
+    counts = seed_from_args(args)
+    elapsed = time.perf_counter() - t0
+
+    _django.print_table(['table', 'rows'], list(counts.items()))
+    print(f'\n{db_name}: {elapsed:.1f} с')
+
+
+if __name__ == '__main__':
+    main()
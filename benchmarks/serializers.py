@@ -0,0 +1,128 @@
+# =========================================================
+# Микробенчмарк быстрых сериализаторов (cars.fast_serializers)
+# =========================================================
+# Запуск:
+#   python -m benchmarks.serializers --rows 5000
+#
+# Для каждой пары «обычный DRF / быстрый» строки загружаются из БД
+# один раз (тем же планом запросов, что во вьюхе), затем замеряется
+# только .data — стоимость строки в микросекундах. Заодно проверяется,
+# что JSON-ответ совпадает байт в байт.
+import argparse
+import random
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from benchmarks import _django
+
+
+def seed(rows):
+    from django.utils import timezone
+
+    from cars.models import Booking, Car
+    from user_cars import geo
+    from user_cars.models import Balance, Car as UserCar
+    from users.models import User
+
+    users = User.objects.bulk_create([User(username=f'ser{i}') for i in range(50)])
+    Balance.objects.bulk_create([Balance(user=u, amount=Decimal(1000)) for u in users])
+    cars = Car.objects.bulk_create([
+        Car(
+            name=f'Car {i}', photo='cars/bench.png', year=2020,
+            car_type=random.choice(['electric', 'premium', 'suv', 'cargo']),
+            price_per_day=Decimal(random.randint(30, 300)),
+            # у части машин есть производные фото — photo_srcset не пустой
+            photo_variants={'source': 'cars/bench.png', 'sizes': {
+                'thumb': {'webp': f'cars/variants/{i}-thumb.webp', 'avif': f'cars/variants/{i}-thumb.avif'},
+            }} if i % 2 else {},
+        )
+        for i in range(rows)
+    ])
+    now = timezone.now()
+    Booking.objects.bulk_create([
+        Booking(
+            user=random.choice(users), car=random.choice(cars),
+            start_time=now + timedelta(hours=i * 7), end_time=now + timedelta(hours=i * 7 + 30),
+            total_price=Decimal('123.40'), status='pending',
+        )
+        for i in range(rows)
+    ])
+    UserCar.objects.bulk_create([
+        UserCar(
+            user=random.choice(users), car_name=f'Car {i}', year=2020, car_type='suv',
+            price_per_day=Decimal('49.90'), location='Dushanbe',
+            latitude=38.5, longitude=68.7, geohash=geo.encode(38.5, 68.7),
+        )
+        for i in range(rows)
+    ])
+    return users[0]
+
+
+def measure(serializer_class, objects, context, repeat):
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        data = serializer_class(objects, many=True, context=context).data
+        timings.append(time.perf_counter() - t0)
+    return statistics.median(timings) / len(objects) * 1e6, data
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--db', default=None)
+    args = parser.parse_args()
+
+    _django.setup(args.db)
+
+    from rest_framework.renderers import JSONRenderer
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+
+    from cars.fast_serializers import FastBookingSerializer, FastCarSerializer
+    from cars.models import Booking, Car
+    from cars.serilaizer import BookingSerializer, CarSerializer
+    from user_cars.models import Balance, Car as UserCar
+    from user_cars.serializer import (
+        CarRentalSerializer, CarSerializer as UserCarSerializer,
+        FastCarRentalSerializer, FastCarSerializer as FastUserCarSerializer,
+    )
+
+    random.seed(3)
+    user = seed(args.rows)
+    request = Request(APIRequestFactory().get('/', HTTP_HOST='api.example.com'))
+    request.user = user
+    user.balance = Balance.objects.with_pending().get(user=user)
+    context = {'request': request}
+
+    pairs = [
+        ('cars.CarSerializer', CarSerializer, FastCarSerializer, Car.objects.all()),
+        ('cars.BookingSerializer', BookingSerializer, FastBookingSerializer, Booking.objects.all()),
+        ('user_cars.CarSerializer', UserCarSerializer, FastUserCarSerializer, UserCar.objects.all()),
+        ('user_cars.CarRentalSerializer', CarRentalSerializer, FastCarRentalSerializer, UserCar.objects.all()),
+    ]
+
+    renderer = JSONRenderer()
+    rows = []
+    for name, slow_class, fast_class, queryset in pairs:
+        setup = getattr(slow_class, 'setup_eager_loading', None)
+        objects = list(setup(queryset) if setup else queryset)
+
+        slow_us, slow_data = measure(slow_class, objects, context, args.repeat)
+        fast_us, fast_data = measure(fast_class, objects, context, args.repeat)
+        same = renderer.render(slow_data) == renderer.render(fast_data)
+        rows.append((
+            name, len(objects), f'{slow_us:.1f}', f'{fast_us:.1f}',
+            f'{slow_us / fast_us:.1f}x', 'yes' if same else 'NO',
+        ))
+
+    _django.print_table(
+        ['serializer', 'rows', 'DRF us/row', 'fast us/row', 'speedup', 'same JSON'], rows
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.views.decorators.http import require_safe
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.utils.encoders import JSONEncoder
+
+from server import renderers
+from users.authentication import CachedJWTAuthentication
+from .events import feed
+from .fast_serializers import FastBookingSerializer, FastCarSerializer
+from .filters import CarAvailabilityFilter
+from .models import Booking, Car
+from .serilaizer import BookingEventSerializer, BookingSerializer
+
+# =========================================================
+# Асинхронные (ASGI) версии read-heavy эндпоинтов
+# =========================================================
+# Работают на async ORM Django и не занимают поток воркера, пока
+# ждут БД. Запускать под ASGI-сервером (server.asgi).
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+CAR_ORDERING = {'name', '-name', 'price_per_day', '-price_per_day', 'year', '-year'}
+
+
+def json_response(data, status=200):
+    return HttpResponse(renderers.dumps(data), status=status, content_type='application/json')
+
+
+def get_limit(request):
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        limit = DEFAULT_LIMIT
+    return min(max(limit, 1), MAX_LIMIT)
+
+
+async def authenticate(request):
+    try:
+        result = await sync_to_async(CachedJWTAuthentication().authenticate)(request)
+    except AuthenticationFailed:
+        return None
+    return result[0] if result else None
+
+
+# =========================================================
+# Автомобили (list)
+# =========================================================
+@require_safe
+async def car_list(request):
+    filterset = CarAvailabilityFilter(request.GET, queryset=Car.objects.all())
+    if not filterset.is_valid():
+        return json_response(filterset.errors, status=400)
+
+    ordering = request.GET.get('ordering', 'name')
+    if ordering not in CAR_ORDERING:
+        ordering = 'name'
+
+    qs = filterset.qs.order_by(ordering, 'id')[:get_limit(request)]
+    cars = [car async for car in qs]
+
+    data = FastCarSerializer(cars, many=True, context={'request': request}).data
+    return json_response({'results': data})
+
+
+# =========================================================
+# Автомобиль (detail) + ближайшие занятые окна
+# =========================================================
+# Занятые окна (busy) видят только авторизованные пользователи.
+@require_safe
+async def car_detail(request, pk):
+    # Машина и пользователь друг от друга не зависят — ждём их вместе.
+    # Синхронные части обоих (ORM, CachedJWTAuthentication) идут через
+    # sync_to_async с thread_sensitive=True, то есть в одном потоке по
+    # очереди: одновременно держать два соединения с БД из разных
+    # потоков Django не даёт. gather ставит обе задачи в очередь к этому
+    # потоку сразу, без возврата в event loop между ними; занятые окна
+    # ждут обоих.
+    car, user = await asyncio.gather(
+        Car.objects.filter(pk=pk).afirst(),
+        authenticate(request),
+    )
+    if car is None:
+        return json_response({'detail': 'Не найдено.'}, status=404)
+
+    data = FastCarSerializer(car, context={'request': request}).data
+    if user is not None:
+        upcoming = (
+            Booking.objects.blocking()
+            .filter(car_id=pk, end_time__gt=timezone.now())
+            .order_by('start_time')
+            .values('start_time', 'end_time')
+        )
+        data['busy'] = [row async for row in upcoming[:100]]
+    return json_response(data)
+
+
+# =========================================================
+# Бронирования пользователя (list)
+# =========================================================
+@require_safe
+async def booking_list(request):
+    user = await authenticate(request)
+    if user is None:
+        return json_response(
+            {'detail': 'Учетные данные не были предоставлены.'}, status=401
+        )
+
+    qs = Booking.objects.filter(is_active=True)
+    if not user.is_staff:
+        qs = qs.filter(user=user)
+    qs = BookingSerializer.setup_eager_loading(qs).order_by('-created_at', '-id')
+
+    bookings = [booking async for booking in qs[:get_limit(request)]]
+    data = FastBookingSerializer(bookings, many=True, context={'request': request}).data
+    return json_response({'results': data})
+
+
+# =========================================================
+# Поток событий броней (server-sent events)
+# =========================================================
+# Курсор — ?since=<event_id> или заголовок Last-Event-ID, который
+# браузерный EventSource сам отправляет при переподключении.
+SSE_POLL_INTERVAL = 1
+SSE_HEARTBEAT_INTERVAL = 15
+
+
+@require_safe
+async def booking_event_stream(request):
+    user = await authenticate(request)
+    if user is None:
+        return json_response(
+            {'detail': 'Учетные данные не были предоставлены.'}, status=401
+        )
+
+    try:
+        since = int(request.headers.get('Last-Event-ID') or request.GET.get('since', 0))
+    except ValueError:
+        return json_response({'detail': 'since должен быть числом'}, status=400)
+
+    async def stream():
+        last_id = since
+        idle = 0
+        while True:
+            events = [event async for event in feed(user, last_id)[:MAX_LIMIT]]
+            for event in events:
+                data = json.dumps(
+                    BookingEventSerializer(event).data,
+                    cls=JSONEncoder, ensure_ascii=False
+                )
+                yield f'id: {event.id}\nevent: {event.event_type}\ndata: {data}\n\n'
+                last_id = event.id
+            if len(events) == MAX_LIMIT:
+                continue
+
+            idle = 0 if events else idle + SSE_POLL_INTERVAL
+            if idle >= SSE_HEARTBEAT_INTERVAL:
+                # комментарий держит соединение открытым через прокси
+                yield ': ping\n\n'
+                idle = 0
+            await asyncio.sleep(SSE_POLL_INTERVAL)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,114 @@
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+
+from . import calendar, events, stats
+from .cache import bump_catalogue_version
+from .models import Booking, Car
+from .pricing import price_many
+from .quotes import bump_car_generation
+from .serilaizer import OVERLAP_ERROR, BookingBulkItemSerializer, is_overlap_violation
+
+BATCH_OVERLAP_ERROR = 'Пересекается с другой бронью в этом пакете'
+CAR_ERROR = 'Машина не найдена или недоступна для брони'
+
+
+# =========================================================
+# Пакетное создание броней
+# =========================================================
+# Возвращает (bookings, errors). errors — список по элементам входа
+# (пустой dict у корректных); если есть хоть одна ошибка, ничего не
+# создаётся.
+def create_bookings(user, items):
+    errors = [{} for _ in items]
+    valid = {}
+
+    for index, item in enumerate(items):
+        serializer = BookingBulkItemSerializer(data=item)
+        if serializer.is_valid():
+            valid[index] = serializer.validated_data
+        else:
+            errors[index] = serializer.errors
+
+    # один запрос за машинами
+    car_ids = {data['car_id'] for data in valid.values()}
+    cars = Car.objects.filter(is_available=True).in_bulk(car_ids)
+    for index, data in list(valid.items()):
+        if data['car_id'] not in cars:
+            errors[index] = {'car_id': [CAR_ERROR]}
+            del valid[index]
+
+    # один запрос за всеми живыми бронями, пересекающими окно пакета
+    if valid:
+        existing = Booking.objects.blocking().filter(
+            car_id__in={data['car_id'] for data in valid.values()},
+            end_time__gt=min(data['start_time'] for data in valid.values()),
+            start_time__lt=max(data['end_time'] for data in valid.values()),
+        ).values_list('car_id', 'start_time', 'end_time')
+
+        for index, message in find_conflicts(valid, existing).items():
+            errors[index] = {'non_field_errors': [message]}
+
+    if any(errors):
+        return [], errors
+
+    bookings = []
+    for index in sorted(valid):
+        data = valid[index]
+        booking = Booking(
+            user=user,
+            car=cars[data['car_id']],
+            start_time=data['start_time'],
+            end_time=data['end_time'],
+            with_driver=data['with_driver'],
+        )
+        bookings.append(booking)
+
+    # цены всего пакета — одним вызовом движка, без второго UPDATE
+    prices = price_many((b.car, b.start_time, b.end_time, b.with_driver) for b in bookings)
+    for booking, price in zip(bookings, prices):
+        booking.total_price = price
+
+    try:
+        with transaction.atomic():
+            Booking.objects.bulk_create(bookings)
+            stats.record_created(bookings)
+            calendar.refresh_for((b.car_id, b.start_time, b.end_time) for b in bookings)
+            events.record_created(bookings)
+    except IntegrityError as exc:
+        # гонка с параллельной бронью (exclusion constraint на PostgreSQL)
+        if not is_overlap_violation(exc):
+            raise
+        return [], [{'non_field_errors': [OVERLAP_ERROR]} for _ in items]
+
+    bump_catalogue_version()
+    bump_car_generation(*(b.car_id for b in bookings))
+
+    return bookings, errors
+
+
+def find_conflicts(valid, existing):
+    # интервалы по машинам: (start, end, индекс элемента или None для БД)
+    by_car = defaultdict(list)
+    for car_id, start, end in existing:
+        by_car[car_id].append((start, end, None))
+    for index, data in valid.items():
+        by_car[data['car_id']].append((data['start_time'], data['end_time'], index))
+
+    conflicts = {}
+    for intervals in by_car.values():
+        intervals.sort(key=lambda interval: interval[0])
+        for i, (start, end, index) in enumerate(intervals):
+            # все следующие интервалы, начавшиеся до конца текущего,
+            # с ним пересекаются
+            j = i + 1
+            while j < len(intervals) and intervals[j][0] < end:
+                other = intervals[j][2]
+                for a, b in ((index, other), (other, index)):
+                    if a is None:
+                        continue
+                    message = OVERLAP_ERROR if b is None else BATCH_OVERLAP_ERROR
+                    if conflicts.get(a) != OVERLAP_ERROR:
+                        conflicts[a] = message
+                j += 1
+    return conflicts
@@ -0,0 +1,119 @@
+import hashlib
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from server import db_router
+
+VERSION_KEY = 'cars:catalogue:version'
+CHANGED_KEY = 'cars:catalogue:changed'
+
+
+def get_cache():
+    return caches[getattr(settings, 'CAR_CATALOGUE_CACHE', 'default')]
+
+
+# =========================================================
+# Версия каталога
+# =========================================================
+# Версия — счётчик, который растёт атомарно (cache.incr). Она входит в
+# ключ каждого закэшированного ответа, поэтому сброс кэша — это
+# просто новая версия, старые ключи доживают свой timeout. Счётчик
+# стартует со времени в миллисекундах, чтобы после очистки кэша не
+# повторить версии из старых ETag. Время изменения хранится отдельно.
+def catalogue_version():
+    # (версия, время последнего изменения в секундах)
+    cache = get_cache()
+    values = cache.get_many([VERSION_KEY, CHANGED_KEY])
+    version = values.get(VERSION_KEY)
+    changed = values.get(CHANGED_KEY)
+    if version is None:
+        now = time.time()
+        cache.add(VERSION_KEY, int(now * 1000), None)
+        cache.add(CHANGED_KEY, now, None)
+        # DummyCache ничего не хранит — тогда версия просто текущая
+        version = cache.get(VERSION_KEY) or int(now * 1000)
+        changed = cache.get(CHANGED_KEY) or now
+    return version, changed or version / 1000
+
+
+def bump_catalogue_version():
+    cache = get_cache()
+    now = time.time()
+    # add + incr: два параллельных сброса дают две разные версии,
+    # а не одну перезаписанную
+    cache.add(VERSION_KEY, int(now * 1000), None)
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        # ключ вытеснен между add и incr (или DummyCache)
+        cache.set(VERSION_KEY, int(now * 1000), None)
+    cache.set(CHANGED_KEY, now, None)
+
+
+# =========================================================
+# Кэш ответов + ETag / Last-Modified
+# =========================================================
+class CachedResponseMixin:
+    def get(self, request, *args, **kwargs):
+        if 'stream' in request.query_params:
+            return super().get(request, *args, **kwargs)
+
+        version, changed = catalogue_version()
+        digest = hashlib.md5(self.cache_key_material(request).encode()).hexdigest()
+        etag = quote_etag(f'{version}-{digest[:16]}')
+        # вверх до секунды: заголовок не раньше самого изменения
+        last_modified = math.ceil(changed)
+
+        if self.not_modified(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            cache = get_cache()
+            key = f'cars:response:{version}:{digest}'
+            data = cache.get(key)
+            if data is None:
+                response = self.fill(request, changed, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                cache.set(key, response.data, getattr(settings, 'CAR_CATALOGUE_CACHE_TIMEOUT', 300))
+            else:
+                response = Response(data)
+
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        response['Cache-Control'] = 'max-age=0, must-revalidate'
+        return response
+
+    def fill(self, request, changed, *args, **kwargs):
+        # Ответ ляжет в кэш под новой версией на весь timeout. Пока
+        # изменение моложе окна REPLICA_STICKY_SECONDS, реплика могла его
+        # ещё не получить — такой ответ собираем с primary.
+        if time.time() - changed < db_router.get_sticky_seconds():
+            with db_router.primary_reads():
+                return super().get(request, *args, **kwargs)
+        return super().get(request, *args, **kwargs)
+
+    def cache_key_material(self, request):
+        # нормализованные параметры: порядок в URL не важен
+        params = sorted(
+            (key, sorted(request.query_params.getlist(key)))
+            for key in request.query_params
+        )
+        # хост входит в ключ: в ответе абсолютные URL фото
+        return f'{request.build_absolute_uri(request.path)}|{params}'
+
+    def not_modified(self, request, etag):
+        # Только If-None-Match: If-Modified-Since с точностью до секунды
+        # не отличит два изменения в одну секунду и отдал бы старый 304
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match is None:
+            return False
+        # слабое сравнение: после сжатия (server.compression) клиент
+        # присылает W/"..."
+        tags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+        return etag in tags or if_none_match.strip() == '*'
@@ -0,0 +1,196 @@
+import calendar as pycalendar
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from django.apps import apps as django_apps
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Booking, CarAvailabilityMonth
+
+HOUR = timedelta(hours=1)
+# поля брони, от которых зависит календарь
+CALENDAR_FIELDS = ('car', 'car_id', 'start_time', 'end_time', 'is_active', 'status')
+
+
+# =========================================================
+# Какие брони занимают машину в календаре
+# =========================================================
+# Отменённые и soft-deleted не занимают; завершённые остаются в
+# истории календаря, поэтому переход в completed его не меняет.
+def occupies(is_active, status):
+    return is_active and status != 'canceled'
+
+
+def occupying_bookings(model=Booking):
+    return model.objects.filter(is_active=True).exclude(status='canceled')
+
+
+# =========================================================
+# Месяцы и биты
+# =========================================================
+def month_of(moment):
+    local = timezone.localtime(moment)
+    return date(local.year, local.month, 1)
+
+
+def next_month(month):
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def month_bounds(month):
+    tz = timezone.get_current_timezone()
+    start = datetime(month.year, month.month, 1, tzinfo=tz)
+    end_month = next_month(month)
+    return start, datetime(end_month.year, end_month.month, 1, tzinfo=tz)
+
+
+def months_between(start_time, end_time):
+    month = month_of(start_time)
+    last = month_of(end_time - timedelta(microseconds=1))
+    while month <= last:
+        yield month
+        month = next_month(month)
+
+
+def hours_in(month):
+    return pycalendar.monthrange(month.year, month.month)[1] * 24
+
+
+def mark(bitmap, month, start_time, end_time):
+    # занят каждый час, который бронь хоть немного задевает
+    month_start, month_end = month_bounds(month)
+    start = max(start_time, month_start)
+    end = min(end_time, month_end)
+    if start >= end:
+        return
+    first = int((start - month_start) // HOUR)
+    last = int((end - month_start - timedelta(microseconds=1)) // HOUR)
+    for hour in range(first, last + 1):
+        bitmap[hour >> 3] |= 1 << (hour & 7)
+
+
+def empty_bitmap(month):
+    return bytearray((hours_in(month) + 7) // 8)
+
+
+# =========================================================
+# Инкрементальное обновление
+# =========================================================
+def refresh_months(car_id, months):
+    # пересчитывает только затронутые месяцы одной машины: один запрос
+    # по индексу booking_overlap_idx на весь диапазон, не на всю историю
+    months = sorted(set(months))
+    if not months:
+        return
+    first_start, _ = month_bounds(months[0])
+    _, last_end = month_bounds(months[-1])
+    rows = list(occupying_bookings().filter(
+        car_id=car_id,
+        end_time__gt=first_start,
+        start_time__lt=last_end,
+    ).values_list('start_time', 'end_time'))
+
+    busy, free = [], []
+    for month in months:
+        bitmap = empty_bitmap(month)
+        for start_time, end_time in rows:
+            mark(bitmap, month, start_time, end_time)
+        if any(bitmap):
+            busy.append(CarAvailabilityMonth(car_id=car_id, month=month, busy_hours=bytes(bitmap)))
+        else:
+            free.append(month)
+
+    if busy:
+        # upsert одной командой вместо update_or_create на каждый месяц
+        CarAvailabilityMonth.objects.bulk_create(
+            busy,
+            update_conflicts=True,
+            unique_fields=['car', 'month'],
+            update_fields=['busy_hours'],
+        )
+    if free:
+        CarAvailabilityMonth.objects.filter(car_id=car_id, month__in=free).delete()
+
+
+def refresh_for(intervals):
+    # intervals: [(car_id, start_time, end_time)]
+    months = defaultdict(set)
+    for car_id, start_time, end_time in intervals:
+        months[car_id].update(months_between(start_time, end_time))
+    # без savepoint: обычно это часть транзакции сохранения брони
+    with transaction.atomic(savepoint=False):
+        for car_id, car_months in months.items():
+            refresh_months(car_id, car_months)
+
+
+def booking_changed(old, booking):
+    # old — словарь полей брони до сохранения (или None)
+    old_interval = new_interval = None
+    if old and occupies(old['is_active'], old['status']):
+        old_interval = (old['car_id'], old['start_time'], old['end_time'])
+    if booking is not None and occupies(booking.is_active, booking.status):
+        new_interval = (booking.car_id, booking.start_time, booking.end_time)
+    if old_interval == new_interval:
+        # например pending -> confirmed: занятость не изменилась
+        return
+    refresh_for([i for i in (old_interval, new_interval) if i])
+
+
+# =========================================================
+# Полная пересборка
+# =========================================================
+def rebuild(apps=django_apps):
+    Booking = apps.get_model('cars', 'Booking')
+    CarAvailabilityMonth = apps.get_model('cars', 'CarAvailabilityMonth')
+
+    bitmaps = {}
+    rows = occupying_bookings(Booking).values_list('car_id', 'start_time', 'end_time').iterator(chunk_size=5000)
+    for car_id, start_time, end_time in rows:
+        for month in months_between(start_time, end_time):
+            bitmap = bitmaps.setdefault((car_id, month), empty_bitmap(month))
+            mark(bitmap, month, start_time, end_time)
+
+    with transaction.atomic():
+        CarAvailabilityMonth.objects.all().delete()
+        CarAvailabilityMonth.objects.bulk_create(
+            [
+                CarAvailabilityMonth(car_id=car_id, month=month, busy_hours=bytes(bitmap))
+                for (car_id, month), bitmap in bitmaps.items()
+            ],
+            batch_size=1000,
+        )
+    return len(bitmaps)
+
+
+# =========================================================
+# Чтение календаря
+# =========================================================
+def car_calendar(car_id, first_month, months=1, hours=False):
+    month_list = [first_month]
+    while len(month_list) < months:
+        month_list.append(next_month(month_list[-1]))
+
+    stored = {
+        row.month: bytes(row.busy_hours)
+        for row in CarAvailabilityMonth.objects.filter(car_id=car_id, month__in=month_list)
+    }
+
+    days = []
+    for month in month_list:
+        bitmap = stored.get(month) or bytes(empty_bitmap(month))
+        for day in range(hours_in(month) // 24):
+            bits = [
+                (bitmap[(day * 24 + hour) >> 3] >> ((day * 24 + hour) & 7)) & 1
+                for hour in range(24)
+            ]
+            busy = sum(bits)
+            item = {
+                'date': date(month.year, month.month, day + 1).isoformat(),
+                'status': 'free' if busy == 0 else 'busy' if busy == 24 else 'partial',
+                'busy_hours': busy,
+            }
+            if hours:
+                item['hours'] = ''.join(str(bit) for bit in bits)
+            days.append(item)
+    return days
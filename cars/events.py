@@ -0,0 +1,102 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import BookingEvent
+
+# поля брони, которые попадают в событие
+EVENT_FIELDS = ('car_id', 'user_id', 'start_time', 'end_time', 'total_price', 'is_active', 'status')
+
+
+def state_of(booking):
+    return {field: getattr(booking, field) for field in EVENT_FIELDS}
+
+
+def make_event(booking_id, event_type, state, previous_status=''):
+    return BookingEvent(
+        booking_id=booking_id,
+        car_id=state['car_id'],
+        user_id=state['user_id'],
+        event_type=event_type,
+        status=state['status'],
+        previous_status=previous_status or '',
+        total_price=state['total_price'] or 0,
+        start_time=state['start_time'],
+        end_time=state['end_time'],
+    )
+
+
+def get_feed_lag():
+    # События моложе лага лента не отдаёт: на PostgreSQL id из
+    # последовательности выдаётся до commit, и событие с меньшим id
+    # может закоммититься после того, как клиент прочитал дальше, —
+    # курсор since прошёл бы мимо него навсегда. Лаг должен быть
+    # больше самой долгой транзакции, пишущей события.
+    return timedelta(seconds=getattr(settings, 'BOOKING_EVENTS_LAG', 5))
+
+
+def feed(user, since=0, lag=None):
+    # лента событий после курсора since; не-админ видит только свои
+    horizon = timezone.now() - (get_feed_lag() if lag is None else lag)
+    events = BookingEvent.objects.filter(id__gt=since, created_at__lte=horizon).order_by('id')
+    if not user.is_staff:
+        events = events.filter(user=user)
+    return events
+
+
+# =========================================================
+# Что изменилось: старое состояние брони -> новое
+# =========================================================
+def diff(booking_id, old, new):
+    if old is None:
+        return [make_event(booking_id, 'created', new)]
+
+    if old['is_active'] and not new['is_active']:
+        # soft delete — одно событие, отдельный status_changed не нужен
+        return [make_event(booking_id, 'deleted', new, old['status'])]
+
+    events = []
+    if old['status'] != new['status']:
+        events.append(make_event(booking_id, 'status_changed', new, old['status']))
+    if old['total_price'] != new['total_price']:
+        events.append(make_event(booking_id, 'price_changed', new))
+    if (old['car_id'], old['start_time'], old['end_time']) != (new['car_id'], new['start_time'], new['end_time']):
+        events.append(make_event(booking_id, 'rescheduled', new))
+    return events
+
+
+def booking_saved(old, booking):
+    events = diff(booking.pk, old, state_of(booking))
+    if events:
+        BookingEvent.objects.bulk_create(events)
+
+
+def booking_deleted(booking):
+    # жёсткое удаление (админка, каскад от машины или пользователя)
+    state = state_of(booking)
+    make_event(booking.pk, 'deleted', state, state['status']).save()
+
+
+def record_created(bookings):
+    # для bulk_create в обход save()
+    BookingEvent.objects.bulk_create(
+        [make_event(b.pk, 'created', state_of(b)) for b in bookings],
+        batch_size=1000,
+    )
+
+
+def record_price_changes(bookings):
+    # для bulk_update пересчёта цен
+    BookingEvent.objects.bulk_create(
+        [make_event(b.pk, 'price_changed', state_of(b)) for b in bookings],
+        batch_size=1000,
+    )
+
+
+def record_transitions(rows, status):
+    # для массовых UPDATE планировщика; rows — values() с EVENT_FIELDS и pk
+    BookingEvent.objects.bulk_create(
+        [make_event(row['pk'], 'status_changed', {**row, 'status': status}, row['status']) for row in rows],
+        batch_size=1000,
+    )
@@ -0,0 +1,217 @@
+import decimal
+from operator import attrgetter
+
+from django.core.exceptions import FieldDoesNotExist
+from django.utils.functional import cached_property
+from rest_framework import fields as drf_fields
+from rest_framework import serializers
+from rest_framework.fields import SkipField
+from rest_framework.relations import PKOnlyObject
+from rest_framework.settings import api_settings
+
+from .images import url_builder, variant_urls
+from .serilaizer import BookingSerializer, CarSerializer
+
+SKIP = object()
+
+# поля, чей to_representation для значений из БД ничего не меняет
+IDENTITY_FIELDS = {
+    drf_fields.IntegerField, drf_fields.BooleanField, drf_fields.CharField,
+    drf_fields.ChoiceField, drf_fields.FloatField, drf_fields.ReadOnlyField,
+}
+
+
+# =========================================================
+# Быстрые read-only сериализаторы
+# =========================================================
+# Вывод тот же, что у обычного сериализатора (serializer_class), байт в
+# байт: поля, их порядок и форматы берутся из него же. Но вместо
+# get_attribute/to_representation на каждое поле каждой строки план
+# собирается один раз на запрос: для простых полей — attrgetter и
+# готовый конвертер (Decimal, datetime, get_FOO_display), для остальных —
+# обычный путь DRF. Метод get_<поле> в подклассе заменяет поле целиком.
+#
+# Это BaseSerializer, поэтому many=True, пагинация, потоковая выдача и
+# кэш ответов работают как с обычным сериализатором. Для записи и схемы
+# API вьюхи продолжают использовать serializer_class (FastReadMixin).
+class FastSerializer(serializers.BaseSerializer):
+    serializer_class = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._plan = None
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        setup = getattr(cls.serializer_class, 'setup_eager_loading', None)
+        return setup(queryset) if setup else queryset
+
+    def to_representation(self, instance):
+        plan = self._plan
+        if plan is None:
+            plan = self._plan = self.compile()
+        ret = {}
+        for name, getter, convert, field in plan:
+            try:
+                value = getter(instance)
+            except AttributeError:
+                # промежуточный объект None и т.п. — как решит DRF
+                value = self.slow_value(field, instance)
+                if value is SKIP:
+                    continue
+                ret[name] = value
+                continue
+            if value is SKIP:
+                continue
+            if value is None or convert is None:
+                ret[name] = value
+            else:
+                ret[name] = convert(value)
+        return ret
+
+    # -----------------------------------------------------
+    # План полей
+    # -----------------------------------------------------
+    def compile(self):
+        serializer = self.serializer_class(context=self.context)
+        plan = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            override = None
+            if not hasattr(serializers.BaseSerializer, f'get_{name}'):
+                override = getattr(self, f'get_{name}', None)
+            if override is not None:
+                plan.append((name, override, None, field))
+            elif isinstance(field, serializers.SerializerMethodField):
+                plan.append((name, getattr(serializer, field.method_name), None, field))
+            else:
+                plan.append((name, *self.compile_field(serializer, field), field))
+        return plan
+
+    def compile_field(self, serializer, field):
+        attrs = field.source_attrs
+        model = getattr(serializer.Meta, 'model', None)
+        fast = type(field) in FAST_CONVERTERS or type(field) in IDENTITY_FIELDS
+
+        # source='get_FOO_display' — словарь вместо метода модели
+        if fast and len(attrs) == 1 and attrs[0].startswith('get_') and attrs[0].endswith('_display'):
+            attname = attrs[0][len('get_'):-len('_display')]
+            if is_model_path(model, [attname]) and type(field) is drf_fields.CharField:
+                choices = dict(model._meta.get_field(attname).flatchoices)
+                return attrgetter(attname), (lambda value: str(choices.get(value, value)))
+
+        # attrgetter только по полям модели: у DRF get_attribute ещё и
+        # вызывает методы, и ловит ObjectDoesNotExist
+        if not fast or not is_model_path(model, attrs):
+            return (lambda obj: self.slow_value(field, obj)), None
+
+        make_converter = FAST_CONVERTERS.get(type(field))
+        return attrgetter('.'.join(attrs)), make_converter(field) if make_converter else None
+
+    def slow_value(self, field, instance):
+        # тот же путь, что в Serializer.to_representation
+        try:
+            attribute = field.get_attribute(instance)
+        except SkipField:
+            return SKIP
+        check_for_none = attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+        if check_for_none is None:
+            return None
+        return field.to_representation(attribute)
+
+
+def is_model_path(model, attrs):
+    # car.name: прямые поля и FK вперёд, без свойств и методов
+    for i, attr in enumerate(attrs):
+        if model is None:
+            return False
+        try:
+            model_field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            return False
+        last = i == len(attrs) - 1
+        if not model_field.concrete:
+            return False
+        if model_field.is_relation and attr == model_field.name:
+            # сам связанный объект — не значение (car_id — значение)
+            if last:
+                return False
+            model = model_field.related_model
+        elif not last:
+            return False
+    return True
+
+
+def decimal_converter(field):
+    coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+    if field.localize or field.normalize_output or field.decimal_places is None:
+        return field.to_representation
+
+    exponent = decimal.Decimal('.1') ** field.decimal_places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    rounding = field.rounding
+
+    def convert(value):
+        if not isinstance(value, decimal.Decimal):
+            value = decimal.Decimal(str(value).strip())
+        quantized = value.quantize(exponent, rounding=rounding, context=context)
+        return f'{quantized:f}' if coerce_to_string else quantized
+    return convert
+
+
+def datetime_converter(field):
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if output_format is None or output_format.lower() != drf_fields.ISO_8601:
+        return field.to_representation
+    tz = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if tz is None:
+        return field.to_representation
+
+    def convert(value):
+        if isinstance(value, str) or value.tzinfo is None:
+            return field.to_representation(value)
+        value = value.astimezone(tz).isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return convert
+
+
+FAST_CONVERTERS = {
+    drf_fields.DecimalField: decimal_converter,
+    drf_fields.DateTimeField: datetime_converter,
+}
+
+
+# =========================================================
+# Машины компании и брони
+# =========================================================
+class FastCarSerializer(FastSerializer):
+    serializer_class = CarSerializer
+
+    @cached_property
+    def media_url(self):
+        return url_builder(self.context.get('request'))
+
+    @cached_property
+    def photo_url(self):
+        storage = self.serializer_class.Meta.model._meta.get_field('photo').storage
+        return url_builder(self.context.get('request'), storage)
+
+    def get_photo(self, obj):
+        name = obj.photo.name
+        if not name:
+            return None
+        return self.photo_url(name)
+
+    def get_photo_srcset(self, obj):
+        return variant_urls(obj, url=self.media_url)
+
+
+class FastBookingSerializer(FastSerializer):
+    serializer_class = BookingSerializer
+
+    def get_user(self, obj):
+        # StringRelatedField
+        return str(obj.user)
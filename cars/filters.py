@@ -1,6 +1,11 @@
 # filters.py
 import django_filters
-from .models import Car
+from django import forms
+from django.db.models import Exists, OuterRef
+from django_filters.fields import IsoDateTimeField
+from django_filters.widgets import SuffixedMultiWidget
+
+from .models import Booking, Car
 
 class CarPriceFilter(django_filters.FilterSet):
     min_price = django_filters.NumberFilter(field_name="price_per_day", lookup_expr='gte')
@@ -9,3 +14,58 @@ class CarPriceFilter(django_filters.FilterSet):
     class Meta:
         model = Car
         fields = ['car_type', 'is_available', 'min_price', 'max_price']
+
+
+# =========================================================
+# Окно доступности: ?start=...&end=...
+# =========================================================
+class AvailabilityWindowWidget(SuffixedMultiWidget):
+    suffixes = ['start', 'end']
+
+    def __init__(self, attrs=None):
+        super().__init__((forms.TextInput, forms.TextInput), attrs)
+
+    def suffixed(self, name, suffix):
+        # параметры запроса — просто start и end, без имени фильтра
+        return suffix
+
+
+class AvailabilityWindowField(forms.MultiValueField):
+    widget = AvailabilityWindowWidget
+    default_error_messages = {
+        'incomplete': 'Параметры start и end передаются вместе',
+    }
+
+    def __init__(self, *args, **kwargs):
+        fields = (IsoDateTimeField(), IsoDateTimeField())
+        super().__init__(fields, *args, **kwargs)
+
+    def compress(self, data_list):
+        if not data_list:
+            return None
+        start, end = data_list
+        if start is None or end is None:
+            raise forms.ValidationError(self.error_messages['incomplete'], code='incomplete')
+        if start >= end:
+            raise forms.ValidationError('Дата окончания должна быть позже даты начала')
+        return start, end
+
+
+class AvailabilityWindowFilter(django_filters.Filter):
+    # только машины без активных броней в окне [start, end)
+    field_class = AvailabilityWindowField
+
+    def filter(self, qs, value):
+        if not value:
+            return qs
+        start, end = value
+        # анти-join: NOT EXISTS по индексу booking_overlap_idx
+        busy = Booking.objects.overlapping(OuterRef('pk'), start, end)
+        return qs.filter(~Exists(busy))
+
+
+class CarAvailabilityFilter(CarPriceFilter):
+    window = AvailabilityWindowFilter()
+
+    class Meta(CarPriceFilter.Meta):
+        fields = CarPriceFilter.Meta.fields + ['window']
@@ -0,0 +1,184 @@
+import logging
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps, features
+
+logger = logging.getLogger(__name__)
+
+# ширина производных фото (высота — по пропорциям)
+VARIANT_WIDTHS = {
+    'thumb': 320,
+    'medium': 800,
+    'large': 1600,
+}
+QUALITY = {'webp': 80, 'avif': 60}
+# после неудачной обработки фото повтор не раньше чем через
+# RETRY_DELAY * 2**(попытки - 1) секунд, но не реже раза в RETRY_MAX_DELAY
+RETRY_DELAY = 60
+RETRY_MAX_DELAY = 24 * 3600
+
+_executor = None
+
+
+def variant_formats():
+    # AVIF только если Pillow собран с libavif
+    return [fmt for fmt in ('webp', 'avif') if features.check(fmt)]
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'CAR_PHOTO_WORKERS', 2),
+            thread_name_prefix='car-photo',
+        )
+    return _executor
+
+
+# =========================================================
+# Генерация производных одного фото
+# =========================================================
+def render_variants(name):
+    # name — путь оригинала в storage; возвращает {size: {fmt: path}}
+    with default_storage.open(name) as source:
+        image = ImageOps.exif_transpose(Image.open(source))
+        image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+
+    base = os.path.splitext(name)[0]
+    sizes = {}
+    for size, width in VARIANT_WIDTHS.items():
+        resized = image.copy()
+        # thumbnail не увеличивает маленькие картинки
+        resized.thumbnail((width, width * 4), Image.Resampling.LANCZOS)
+
+        for fmt in variant_formats():
+            buffer = BytesIO()
+            resized.save(buffer, fmt.upper(), quality=QUALITY[fmt])
+            path = f'variants/{base}_{size}.{fmt}'
+            if default_storage.exists(path):
+                default_storage.delete(path)
+            sizes.setdefault(size, {})[fmt] = default_storage.save(path, ContentFile(buffer.getvalue()))
+    return sizes
+
+
+def build_variants(car_id):
+    from .cache import bump_catalogue_version
+    from .models import Car
+
+    close_old_connections()
+    car = None
+    try:
+        car = Car.objects.filter(pk=car_id).first()
+        if car is None or not car.photo:
+            return False
+        name = car.photo.name
+        variants = {'source': name, 'sizes': render_variants(name)}
+        # update(): без post_save и повторной постановки в очередь;
+        # если фото успели заменить, результат устарел
+        updated = Car.objects.filter(pk=car_id, photo=name).update(photo_variants=variants)
+        if updated:
+            bump_catalogue_version()
+        return bool(updated)
+    except Exception:
+        logger.exception('Не удалось обработать фото машины %s', car_id)
+        if car is not None and car.photo:
+            record_failure(car)
+        return False
+    finally:
+        close_old_connections()
+
+
+def record_failure(car):
+    # Неудача запоминается вместе с именем оригинала: пока не прошла
+    # пауза, needs_variants() ложно и сохранения машины не ставят ту же
+    # задачу снова. Прежние производные остаются.
+    from .models import Car
+
+    variants = dict(car.photo_variants or {})
+    failed = variants.get('failed') or {}
+    attempts = failed.get('attempts', 0) + 1 if failed.get('source') == car.photo.name else 1
+    delay = min(RETRY_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY)
+    variants['failed'] = {
+        'source': car.photo.name,
+        'attempts': attempts,
+        'retry_at': time.time() + delay,
+    }
+    Car.objects.filter(pk=car.pk, photo=car.photo.name).update(photo_variants=variants)
+
+
+def needs_variants(car):
+    if not car.photo:
+        return False
+    variants = car.photo_variants or {}
+    if variants.get('source') == car.photo.name:
+        return False
+    failed = variants.get('failed') or {}
+    return failed.get('source') != car.photo.name or time.time() >= failed['retry_at']
+
+
+def schedule_variants(car):
+    # обработка идёт в пуле потоков после коммита, не в потоке запроса
+    car_id = car.pk
+    transaction.on_commit(lambda: get_executor().submit(build_variants, car_id))
+
+
+# =========================================================
+# srcset для API
+# =========================================================
+def variant_urls(car, request=None, url=None):
+    # url — готовый url_builder(request), если он уже есть у вызывающего
+    url = url or url_builder(request)
+    sizes = (car.photo_variants or {}).get('sizes', {})
+    result = {}
+    for size, formats in sizes.items():
+        result[size] = {}
+        for fmt, path in formats.items():
+            result[size][fmt] = url(path)
+    return result
+
+
+# =========================================================
+# URL файла без urljoin/build_absolute_uri на каждый вызов
+# =========================================================
+# Для FileSystemStorage с MEDIA_URL вида '/media/' абсолютный URL —
+# это просто схема и хост запроса + MEDIA_URL + путь, если путь не
+# требует экранирования и нормализации. Остальное — обычным путём.
+SAFE_PATH = re.compile(r"[A-Za-z0-9_.~/-]+")
+
+
+def url_builder(request=None, storage=None):
+    storage = storage or default_storage
+
+    def slow(name):
+        url = storage.url(name)
+        return request.build_absolute_uri(url) if request else url
+
+    # base_url первым: он же инициализирует ленивый default_storage
+    base_url = getattr(storage, 'base_url', None)
+    wrapped = getattr(storage, '_wrapped', storage)
+    if (
+        type(wrapped) is not FileSystemStorage
+        or not base_url or not base_url.startswith('/') or base_url.startswith('//')
+        or not base_url.endswith('/')
+    ):
+        return slow
+    prefix = (request.build_absolute_uri('/')[:-1] if request else '') + base_url
+
+    def fast(name):
+        if (
+            not SAFE_PATH.fullmatch(name) or name.startswith('/')
+            or '.' in name.split('/') or '..' in name.split('/')
+        ):
+            return slow(name)
+        return prefix + name
+    return fast
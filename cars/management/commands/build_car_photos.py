@@ -0,0 +1,30 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from cars.images import build_variants, needs_variants
+from cars.models import Car
+
+
+class Command(BaseCommand):
+    help = 'Генерирует миниатюры и WebP/AVIF для уже загруженных фото машин'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Пересобрать и те фото, у которых производные уже есть'
+        )
+
+    def handle(self, *args, **options):
+        cars = [
+            car.pk for car in Car.objects.exclude(photo='').only('pk', 'photo', 'photo_variants')
+            if options['force'] or needs_variants(car)
+        ]
+        self.stdout.write(f'Фото к обработке: {len(cars)}')
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            done = sum(executor.map(build_variants, cars))
+
+        self.stdout.write(f'Готово: {done}, с ошибками: {len(cars) - done}')
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from cars.stats import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Полностью пересчитывает статистику броней по машинам и дням'
+
+    def handle(self, *args, **options):
+        cars, days = rebuild()
+        self.stdout.write(f'Пересчитано: машин {cars}, строк по дням {days}')
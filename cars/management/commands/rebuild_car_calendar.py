@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from cars.calendar import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает календарь занятости машин по таблице броней'
+
+    def handle(self, *args, **options):
+        months = rebuild()
+        self.stdout.write(f'Пересобрано месяцев: {months}')
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from cars.search import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает поисковый индекс машин компании и пользователей'
+
+    def handle(self, *args, **options):
+        documents = rebuild()
+        self.stdout.write(f'Проиндексировано машин: {documents}')
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from cars import events, stats
+from cars.models import Booking
+from cars.pricing import price_many
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает цены будущих броней по текущим правилам (CAR_PRICING)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        bookings = Booking.objects.filter(
+            is_active=True,
+            status__in=['pending', 'confirmed'],
+            start_time__gt=timezone.now(),
+        ).select_related('car').order_by('pk')
+
+        checked = changed = 0
+        last_pk = 0
+        while True:
+            batch = list(bookings.filter(pk__gt=last_pk)[:options['batch_size']])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            checked += len(batch)
+
+            prices = price_many((b.car, b.start_time, b.end_time, b.with_driver) for b in batch)
+            pairs = []
+            repriced = []
+            for booking, price in zip(batch, prices):
+                if booking.total_price == price:
+                    continue
+                old = stats.booking_contribution(booking)
+                booking.total_price = price
+                booking.updated_at = timezone.now()
+                pairs.append((old, stats.booking_contribution(booking)))
+                repriced.append(booking)
+            changed += len(repriced)
+
+            if repriced and not options['dry_run']:
+                # bulk_update идёт в обход сигналов — статистику и события пишем сами
+                with transaction.atomic():
+                    Booking.objects.bulk_update(repriced, ['total_price', 'updated_at'])
+                    stats.record_changes(pairs)
+                    events.record_price_changes(repriced)
+
+        verb = 'Изменилось бы' if options['dry_run'] else 'Изменено'
+        self.stdout.write(f'Проверено броней: {checked}. {verb} цен: {changed}')
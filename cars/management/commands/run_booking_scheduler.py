@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from cars.scheduler import BookingScheduler
+
+
+class Command(BaseCommand):
+    help = 'Переводит брони в active/completed по времени (фоновый процесс)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Выполнить один проход и выйти (для cron)'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=int,
+            default=30,
+            help='Максимальная пауза между проходами, сек.'
+        )
+
+    def handle(self, *args, **options):
+        scheduler = BookingScheduler(poll_interval=options['poll_interval'])
+
+        if options['once']:
+            activated, completed = scheduler.run_once()
+            self.stdout.write(
+                f'Активировано: {activated}, завершено: {completed}'
+            )
+            return
+
+        self.stdout.write('Планировщик броней запущен')
+        try:
+            scheduler.run_forever()
+        except KeyboardInterrupt:
+            self.stdout.write('Планировщик остановлен')
@@ -0,0 +1,44 @@
+# Generated by Django 6.0 on 2026-10-18 10:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+# На PostgreSQL дополнительно запрещаем пересечения на уровне БД.
+# SQLite exclusion constraints не поддерживает, там остаётся индекс.
+EXCLUSION_SQL = """
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+ALTER TABLE cars_booking ADD CONSTRAINT booking_no_overlap
+    EXCLUDE USING gist (car_id WITH =, tstzrange(start_time, end_time) WITH &&)
+    WHERE (is_active AND status IN ('pending', 'confirmed', 'active'));
+"""
+
+DROP_EXCLUSION_SQL = """
+ALTER TABLE cars_booking DROP CONSTRAINT IF EXISTS booking_no_overlap;
+"""
+
+
+def add_exclusion_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(EXCLUSION_SQL)
+
+
+def drop_exclusion_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_EXCLUSION_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0003_booking_is_active'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['car', 'end_time', 'start_time'], name='booking_overlap_idx'),
+        ),
+        migrations.RunPython(add_exclusion_constraint, drop_exclusion_constraint),
+    ]
@@ -0,0 +1,90 @@
+# Generated by Django 6.0 on 2026-10-18 11:02
+
+import datetime
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Sum
+from django.db.models.functions import TruncDate
+
+
+# Копия cars.stats.rebuild на момент миграции: живой модуль может
+# разойтись с этой схемой. Таблицы только что созданы и пусты.
+def backfill_stats(apps, schema_editor):
+    Booking = apps.get_model('cars', 'Booking')
+    CarBookingStats = apps.get_model('cars', 'CarBookingStats')
+    CarDailyBookingStats = apps.get_model('cars', 'CarDailyBookingStats')
+    db = schema_editor.connection.alias
+
+    duration = ExpressionWrapper(F('end_time') - F('start_time'), output_field=DurationField())
+    daily = (
+        Booking.objects.using(db).filter(is_active=True)
+        .annotate(day=TruncDate('start_time'))
+        .values('car_id', 'day')
+        .annotate(
+            bookings_count=Count('id'),
+            total_revenue=Sum('total_price'),
+            total_rental_duration=Sum(duration),
+        )
+        .order_by()
+    )
+
+    totals = {}
+    daily_rows = []
+    for row in daily:
+        daily_rows.append(CarDailyBookingStats(
+            car_id=row['car_id'],
+            day=row['day'],
+            bookings_count=row['bookings_count'],
+            total_revenue=row['total_revenue'] or 0,
+            total_rental_duration=row['total_rental_duration'] or datetime.timedelta(0),
+        ))
+        total = totals.setdefault(row['car_id'], CarBookingStats(
+            car_id=row['car_id'],
+            bookings_count=0,
+            total_revenue=Decimal(0),
+            total_rental_duration=datetime.timedelta(0),
+        ))
+        total.bookings_count += row['bookings_count']
+        total.total_revenue += row['total_revenue'] or 0
+        total.total_rental_duration += row['total_rental_duration'] or datetime.timedelta(0)
+
+    CarDailyBookingStats.objects.using(db).bulk_create(daily_rows, batch_size=1000)
+    CarBookingStats.objects.using(db).bulk_create(totals.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0006_cursor_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CarBookingStats',
+            fields=[
+                ('car', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='booking_stats', serialize=False, to='cars.car')),
+                ('bookings_count', models.PositiveIntegerField(default=0)),
+                ('total_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_rental_duration', models.DurationField(default=datetime.timedelta(0))),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CarDailyBookingStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('bookings_count', models.PositiveIntegerField(default=0)),
+                ('total_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_rental_duration', models.DurationField(default=datetime.timedelta(0))),
+                ('car', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_booking_stats', to='cars.car')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day', 'car'], name='car_daily_stats_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('car', 'day'), name='car_daily_stats_unique')],
+            },
+        ),
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 11:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0007_car_booking_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='car',
+            name='photo_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,90 @@
+# Generated by Django 6.0 on 2026-10-18 11:12
+
+import calendar
+from datetime import date, datetime, timedelta
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+HOUR = timedelta(hours=1)
+
+
+# Копия cars.calendar.rebuild на момент миграции: живой модуль может
+# разойтись с этой схемой. Битовая карта месяца — по биту на час.
+def month_of(moment):
+    local = timezone.localtime(moment)
+    return date(local.year, local.month, 1)
+
+
+def next_month(month):
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def empty_bitmap(month):
+    return bytearray((calendar.monthrange(month.year, month.month)[1] * 24 + 7) // 8)
+
+
+def mark(bitmap, month, start_time, end_time):
+    tz = timezone.get_current_timezone()
+    month_start = datetime(month.year, month.month, 1, tzinfo=tz)
+    end_month = next_month(month)
+    month_end = datetime(end_month.year, end_month.month, 1, tzinfo=tz)
+    start = max(start_time, month_start)
+    end = min(end_time, month_end)
+    if start >= end:
+        return
+    first = int((start - month_start) // HOUR)
+    last = int((end - month_start - timedelta(microseconds=1)) // HOUR)
+    for hour in range(first, last + 1):
+        bitmap[hour >> 3] |= 1 << (hour & 7)
+
+
+def backfill_calendar(apps, schema_editor):
+    Booking = apps.get_model('cars', 'Booking')
+    CarAvailabilityMonth = apps.get_model('cars', 'CarAvailabilityMonth')
+    db = schema_editor.connection.alias
+
+    bitmaps = {}
+    rows = (
+        Booking.objects.using(db).filter(is_active=True).exclude(status='canceled')
+        .values_list('car_id', 'start_time', 'end_time').iterator(chunk_size=5000)
+    )
+    for car_id, start_time, end_time in rows:
+        month = month_of(start_time)
+        last = month_of(end_time - timedelta(microseconds=1))
+        while month <= last:
+            bitmap = bitmaps.setdefault((car_id, month), empty_bitmap(month))
+            mark(bitmap, month, start_time, end_time)
+            month = next_month(month)
+
+    CarAvailabilityMonth.objects.using(db).bulk_create(
+        [
+            CarAvailabilityMonth(car_id=car_id, month=month, busy_hours=bytes(bitmap))
+            for (car_id, month), bitmap in bitmaps.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0008_car_photo_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CarAvailabilityMonth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('busy_hours', models.BinaryField(max_length=93)),
+                ('car', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='availability_months', to='cars.car')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('car', 'month'), name='car_availability_month_unique')],
+            },
+        ),
+        migrations.RunPython(backfill_calendar, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,126 @@
+# Generated by Django 6.0 on 2026-10-18 11:19
+
+from django.db import migrations, models
+
+# DDL и бэкфилл — копия cars.search на момент миграции: живой модуль
+# может разойтись с этой схемой.
+
+# SQLite: FTS5-таблица с внешним содержимым и триггеры синхронизации
+SQLITE_SQL = [
+    """
+    CREATE VIRTUAL TABLE cars_searchdocument_fts USING fts5(
+        name, body, kind UNINDEXED,
+        content='cars_searchdocument', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER cars_searchdocument_ai AFTER INSERT ON cars_searchdocument BEGIN
+        INSERT INTO cars_searchdocument_fts(rowid, name, body, kind) VALUES (new.id, new.name, new.body, new.kind);
+    END
+    """,
+    """
+    CREATE TRIGGER cars_searchdocument_ad AFTER DELETE ON cars_searchdocument BEGIN
+        INSERT INTO cars_searchdocument_fts(cars_searchdocument_fts, rowid, name, body, kind) VALUES ('delete', old.id, old.name, old.body, old.kind);
+    END
+    """,
+    """
+    CREATE TRIGGER cars_searchdocument_au AFTER UPDATE ON cars_searchdocument BEGIN
+        INSERT INTO cars_searchdocument_fts(cars_searchdocument_fts, rowid, name, body, kind) VALUES ('delete', old.id, old.name, old.body, old.kind);
+        INSERT INTO cars_searchdocument_fts(rowid, name, body, kind) VALUES (new.id, new.name, new.body, new.kind);
+    END
+    """,
+]
+
+SQLITE_DROP_SQL = [
+    'DROP TRIGGER IF EXISTS cars_searchdocument_ai',
+    'DROP TRIGGER IF EXISTS cars_searchdocument_ad',
+    'DROP TRIGGER IF EXISTS cars_searchdocument_au',
+    'DROP TABLE IF EXISTS cars_searchdocument_fts',
+]
+
+# PostgreSQL: GIN по tsvector и по триграммам названия
+POSTGRES_SQL = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    "CREATE INDEX cars_searchdocument_tsv_idx ON cars_searchdocument "
+    "USING gin (to_tsvector('simple', name || ' ' || body))",
+    'CREATE INDEX cars_searchdocument_trgm_idx ON cars_searchdocument USING gin (name gin_trgm_ops)',
+]
+
+POSTGRES_DROP_SQL = [
+    'DROP INDEX IF EXISTS cars_searchdocument_tsv_idx',
+    'DROP INDEX IF EXISTS cars_searchdocument_trgm_idx',
+]
+
+
+def install_full_text_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for sql in {'sqlite': SQLITE_SQL, 'postgresql': POSTGRES_SQL}.get(vendor, []):
+        schema_editor.execute(sql)
+
+
+def uninstall_full_text_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for sql in {'sqlite': SQLITE_DROP_SQL, 'postgresql': POSTGRES_DROP_SQL}.get(vendor, []):
+        schema_editor.execute(sql)
+
+
+def choice_label(instance, field):
+    value = getattr(instance, field)
+    return dict(instance._meta.get_field(field).choices).get(value, value)
+
+
+def backfill_search_index(apps, schema_editor):
+    Document = apps.get_model('cars', 'SearchDocument')
+    db = schema_editor.connection.alias
+
+    def car_document(car):
+        return Document(
+            kind='car', object_id=car.pk, name=car.name,
+            body=f'{choice_label(car, "car_type")} {car.car_type} {car.year}',
+        )
+
+    def user_car_document(car):
+        return Document(
+            kind='user_car', object_id=car.pk, name=car.car_name,
+            body=f'{car.location} {choice_label(car, "car_type")} {car.car_type} {car.year}',
+        )
+
+    sources = [
+        (apps.get_model('cars', 'Car'), car_document),
+        (apps.get_model('user_cars', 'Car'), user_car_document),
+    ]
+    for model, make_document in sources:
+        batch = []
+        for instance in model.objects.using(db).order_by('pk').iterator(chunk_size=2000):
+            batch.append(make_document(instance))
+            if len(batch) == 2000:
+                Document.objects.using(db).bulk_create(batch)
+                batch = []
+        Document.objects.using(db).bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0010_booking_events'),
+        ('user_cars', '0005_car_amount'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('car', 'Машина компании'), ('user_car', 'Машина пользователя')], max_length=20)),
+                ('object_id', models.PositiveIntegerField()),
+                ('name', models.CharField(max_length=255)),
+                ('body', models.TextField(blank=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='search_document_unique')],
+            },
+        ),
+        migrations.RunPython(install_full_text_index, uninstall_full_text_index),
+        migrations.RunPython(backfill_search_index, migrations.RunPython.noop),
+    ]
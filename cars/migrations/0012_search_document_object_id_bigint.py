@@ -0,0 +1,44 @@
+# Generated by Django 6.0 on 2026-10-18 13:05
+
+from django.db import migrations, models
+
+
+# SQLite и так хранит INTEGER в 64 битах, а сменить тип колонки он
+# может только пересозданием таблицы — вместе с ней пропали бы триггеры
+# FTS5 (0011_search_index). Поэтому колонку меняем только на других СУБД.
+def alter_object_id(field_class):
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor == 'sqlite':
+            return
+        Document = apps.get_model('cars', 'SearchDocument')
+        old_field = Document._meta.get_field('object_id')
+        new_field = field_class()
+        new_field.set_attributes_from_name('object_id')
+        new_field.model = Document
+        schema_editor.alter_field(Document, old_field, new_field)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0011_search_index'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='searchdocument',
+                    name='object_id',
+                    field=models.PositiveBigIntegerField(),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(
+                    alter_object_id(models.PositiveBigIntegerField),
+                    alter_object_id(models.PositiveIntegerField),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 6.0 on 2026-10-18 16:40
+
+from django.db import migrations
+
+# DDL — копия cars.search на момент миграции: живой модуль может
+# разойтись с этой схемой.
+
+# SQLite: вторая FTS5-таблица над cars_searchdocument с токенизатором
+# trigram (SQLite 3.34+) — индекс подстрок названия для ?search=amry.
+# Триггеры — как у cars_searchdocument_fts из 0011_search_index.
+SQLITE_SQL = [
+    """
+    CREATE VIRTUAL TABLE cars_searchdocument_trigram USING fts5(
+        name,
+        content='cars_searchdocument', content_rowid='id',
+        tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER cars_searchdocument_trigram_ai AFTER INSERT ON cars_searchdocument BEGIN
+        INSERT INTO cars_searchdocument_trigram(rowid, name) VALUES (new.id, new.name);
+    END
+    """,
+    """
+    CREATE TRIGGER cars_searchdocument_trigram_ad AFTER DELETE ON cars_searchdocument BEGIN
+        INSERT INTO cars_searchdocument_trigram(cars_searchdocument_trigram, rowid, name) VALUES ('delete', old.id, old.name);
+    END
+    """,
+    """
+    CREATE TRIGGER cars_searchdocument_trigram_au AFTER UPDATE ON cars_searchdocument BEGIN
+        INSERT INTO cars_searchdocument_trigram(cars_searchdocument_trigram, rowid, name) VALUES ('delete', old.id, old.name);
+        INSERT INTO cars_searchdocument_trigram(rowid, name) VALUES (new.id, new.name);
+    END
+    """,
+    # бэкфилл: документы уже лежат в cars_searchdocument
+    "INSERT INTO cars_searchdocument_trigram(cars_searchdocument_trigram) VALUES ('rebuild')",
+]
+
+SQLITE_DROP_SQL = [
+    'DROP TRIGGER IF EXISTS cars_searchdocument_trigram_ai',
+    'DROP TRIGGER IF EXISTS cars_searchdocument_trigram_ad',
+    'DROP TRIGGER IF EXISTS cars_searchdocument_trigram_au',
+    'DROP TABLE IF EXISTS cars_searchdocument_trigram',
+]
+
+
+# PostgreSQL: подстроки обслуживает cars_searchdocument_trgm_idx из 0011
+def install_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for sql in SQLITE_SQL:
+            schema_editor.execute(sql)
+
+
+def uninstall_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for sql in SQLITE_DROP_SQL:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0012_search_document_object_id_bigint'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_trigram_index, uninstall_trigram_index),
+    ]
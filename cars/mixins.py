@@ -0,0 +1,62 @@
+from server import db_router
+
+
+# =========================================================
+# План запросов для списков
+# =========================================================
+# Сериализатор сам знает, какие связи он читает, и объявляет это в
+# setup_eager_loading(queryset). Вьюха применяет его к своему
+# queryset, поэтому число запросов не зависит от размера страницы.
+# Хук стоит в filter_queryset: его вызывают и list, и get_object,
+# а get_queryset вьюхи часто переопределяют.
+class EagerLoadingMixin:
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        serializer_class = self.get_serializer_class()
+        setup = getattr(serializer_class, 'setup_eager_loading', None)
+        if setup is not None:
+            queryset = setup(queryset)
+        return queryset
+
+
+# =========================================================
+# Быстрый сериализатор для чтения
+# =========================================================
+# GET отдаётся через fast_serializer_class (cars.fast_serializers) —
+# вывод тот же, что у serializer_class, но без поштучной работы DRF
+# на каждое поле. Запись и схема API (drf_yasg) — serializer_class.
+class FastReadMixin:
+    fast_serializer_class = None
+
+    def get_serializer_class(self):
+        if (
+            self.fast_serializer_class is not None
+            and self.request is not None
+            and self.request.method == 'GET'
+            and not getattr(self, 'swagger_fake_view', False)
+        ):
+            return self.fast_serializer_class
+        return super().get_serializer_class()
+
+
+# =========================================================
+# Чтение с реплики (server.db_router)
+# =========================================================
+# GET списков и деталей читает cars / user_cars с реплики, если
+# пользователь недавно ничего не записывал. Включается после
+# аутентификации (нужен request.user) и выключается в
+# finalize_response — то есть сериализация тоже идёт с реплики, а
+# потоковая выдача (?stream=) читает уже с primary.
+class ReplicaReadMixin:
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if db_router.should_use_replica(request):
+            self.replica_reads = db_router.replica_reads()
+            self.replica_reads.__enter__()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        replica_reads = getattr(self, 'replica_reads', None)
+        if replica_reads is not None:
+            self.replica_reads = None
+            replica_reads.__exit__(None, None, None)
+        return super().finalize_response(request, response, *args, **kwargs)
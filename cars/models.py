@@ -14,6 +14,8 @@ class Car(models.Model):
 
     name = models.CharField(max_length=250, verbose_name='Модель автомобиля')
     photo = models.ImageField(upload_to='cars/%Y/%m/%d/', verbose_name='Главное фото')
+    # производные фото (cars.images): {'source': ..., 'sizes': {size: {fmt: path}}}
+    photo_variants = models.JSONField(default=dict, blank=True, editable=False)
     year = models.PositiveSmallIntegerField(verbose_name='Год выпуска')
     car_type = models.CharField(max_length=20, choices=CAR_TYPE_CHOICES, verbose_name='Класс автомобиля')
     price_per_day = models.DecimalField(max_digits=10, decimal_places=2, verbose_name='Цена за сутки')
@@ -27,6 +29,10 @@ class Car(models.Model):
         ordering = ['name']
         verbose_name = 'Автомобиль'
         verbose_name_plural = 'Автомобили'
+        indexes = [
+            # cursor-пагинация каталога (name, id)
+            models.Index(fields=['name', 'id'], name='car_name_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.year}) — {self.get_car_type_display()}"
@@ -37,7 +43,28 @@ class Car(models.Model):
 from django.db import models
 from users.models   import User
 from django.utils import timezone
-from decimal import Decimal, ROUND_HALF_UP
+from datetime import timedelta
+from .pricing import price_many
+
+
+# Статусы, при которых бронь занимает автомобиль
+ACTIVE_BOOKING_STATUSES = ('pending', 'confirmed', 'active')
+
+
+class BookingQuerySet(models.QuerySet):
+    def blocking(self):
+        # брони, которые реально занимают машину (soft delete + статус)
+        return self.filter(is_active=True, status__in=ACTIVE_BOOKING_STATUSES)
+
+    def overlapping(self, car, start_time, end_time):
+        # пересечение интервалов [start_time, end_time),
+        # обслуживается индексом booking_overlap_idx
+        return self.blocking().filter(
+            car=car,
+            end_time__gt=start_time,
+            start_time__lt=end_time
+        )
+
 
 class Booking(models.Model):
     STATUS_CHOICES = (
@@ -59,32 +86,172 @@ class Booking(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
 
+    objects = BookingQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # (car, end_time): условие end_time > начала окна отсекает
+            # всю прошедшую историю машины, поэтому проверка пересечений
+            # не растёт вместе с таблицей. Индекс намеренно не частичный:
+            # SQLite не применяет partial index к запросам с параметрами.
+            models.Index(
+                fields=['car', 'end_time', 'start_time'],
+                name='booking_overlap_idx',
+            ),
+            # cursor-пагинация истории (created_at, id)
+            models.Index(
+                fields=['created_at', 'id'],
+                name='booking_created_id_idx',
+            ),
+            models.Index(
+                fields=['user', 'created_at', 'id'],
+                name='booking_user_created_id_idx',
+            ),
+            # выборки планировщика статусов (cars.scheduler)
+            models.Index(
+                fields=['status', 'start_time'],
+                name='booking_status_start_idx',
+            ),
+            models.Index(
+                fields=['status', 'end_time'],
+                name='booking_status_end_idx',
+            ),
+        ]
+
     # ----------------------------
     # Расчёт цены
     # ----------------------------
+    # Правила — в cars.pricing; для многих броней сразу — price_many
     def calculate_price(self, save=False):
-        days = max((self.end_time - self.start_time).days, 1)
-        price = self.car.price_per_day * days
-        if self.with_driver:
-            price *= Decimal('1.2')
-        price = price.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        price = price_many([(self.car, self.start_time, self.end_time, self.with_driver)])[0]
         if save:
             self.total_price = price
             self.save(update_fields=['total_price'])
         return price
 
-    # ----------------------------
-    # Обновление статуса
-    # ----------------------------
-    def update_status(self):
-        now = timezone.now()
-        if self.status in ['canceled', 'completed']:
-            return
-        if self.start_time <= now <= self.end_time:
-            self.status = 'active'
-        elif now > self.end_time:
-            self.status = 'completed'
-            if not self.car.is_available:
-                self.car.is_available = True
-                self.car.save(update_fields=['is_available'])
-        self.save(update_fields=['status'])
+
+# =========================================================
+# Материализованная статистика броней
+# =========================================================
+# Обновляется инкрементально сигналами (cars.signals) и при массовых
+# операциях, полностью пересчитывается командой rebuild_booking_stats.
+# В статистику входят брони с is_active=True, как и раньше в
+# CarBookingStatsAPIView; бронь относится ко дню своего начала.
+class CarBookingStats(models.Model):
+    car = models.OneToOneField(Car, on_delete=models.CASCADE, primary_key=True, related_name='booking_stats')
+    bookings_count = models.PositiveIntegerField(default=0)
+    total_revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_rental_duration = models.DurationField(default=timedelta(0))
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.car_id}: {self.bookings_count}"
+
+
+class CarDailyBookingStats(models.Model):
+    car = models.ForeignKey(Car, on_delete=models.CASCADE, related_name='daily_booking_stats')
+    day = models.DateField()
+    bookings_count = models.PositiveIntegerField(default=0)
+    total_revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_rental_duration = models.DurationField(default=timedelta(0))
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['car', 'day'], name='car_daily_stats_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['day', 'car'], name='car_daily_stats_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.car_id} {self.day}: {self.bookings_count}"
+
+
+# =========================================================
+# Календарь занятости машины
+# =========================================================
+# Один бит на каждый час месяца (до 31 * 24 = 744 бит = 93 байта).
+# Строка есть только у месяцев, где машина хоть раз занята.
+# Обновляется инкрементально (cars.calendar), пересобирается
+# командой rebuild_car_calendar.
+class CarAvailabilityMonth(models.Model):
+    car = models.ForeignKey(Car, on_delete=models.CASCADE, related_name='availability_months')
+    month = models.DateField()  # первое число месяца
+    busy_hours = models.BinaryField(max_length=93)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['car', 'month'], name='car_availability_month_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.car_id} {self.month:%Y-%m}"
+
+
+# =========================================================
+# Журнал событий броней (append-only)
+# =========================================================
+# id — монотонный курсор для ленты bookings/events/?since=<id>.
+# Ссылки без FK-ограничений: события переживают удаление брони.
+class BookingEvent(models.Model):
+    EVENT_CHOICES = (
+        ('created', 'Created'),
+        ('status_changed', 'Status changed'),
+        ('price_changed', 'Price changed'),
+        ('rescheduled', 'Rescheduled'),
+        ('deleted', 'Deleted'),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    booking = models.ForeignKey(
+        Booking, on_delete=models.DO_NOTHING, db_constraint=False, related_name='events'
+    )
+    car = models.ForeignKey(
+        Car, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+'
+    )
+    user = models.ForeignKey(
+        User, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+'
+    )
+    event_type = models.CharField(max_length=20, choices=EVENT_CHOICES)
+    status = models.CharField(max_length=20)
+    previous_status = models.CharField(max_length=20, blank=True)
+    total_price = models.DecimalField(max_digits=10, decimal_places=2)
+    start_time = models.DateTimeField()
+    end_time = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # лента событий одного пользователя
+            models.Index(fields=['user', 'id'], name='booking_event_user_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.id} {self.event_type} booking={self.booking_id}"
+
+
+# =========================================================
+# Поисковый индекс по обоим каталогам машин
+# =========================================================
+# Одна строка на машину (cars.Car или user_cars.Car). Полнотекстовый
+# индекс поверх этой таблицы создаёт миграция: FTS5 на SQLite,
+# tsvector + pg_trgm на PostgreSQL (см. cars.search).
+class SearchDocument(models.Model):
+    KIND_CHOICES = (
+        ('car', 'Машина компании'),
+        ('user_car', 'Машина пользователя'),
+    )
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    # id машин — BigAutoField
+    object_id = models.PositiveBigIntegerField()
+    name = models.CharField(max_length=255)
+    body = models.TextField(blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='search_document_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}:{self.object_id} {self.name}"
@@ -0,0 +1,159 @@
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+
+
+# =========================================================
+# Keyset (cursor) пагинация
+# =========================================================
+# Курсор не использует OFFSET, поэтому глубина страницы не влияет
+# на стоимость запроса. Порядок всегда добивается id для уникальности.
+#
+# Стандартный CursorPagination держит позицию только по первому полю
+# порядка, а одинаковые значения пропускает через OFFSET. При
+# ?ordering=price_per_day (OrderingFilter отдаёт порядок без id) это
+# медленный OFFSET по неуникальному ключу. Здесь позиция — значения
+# всех полей порядка, а условие — составной keyset:
+#   (a > pa) OR (a = pa AND id > pid)
+class KeysetCursorPagination(CursorPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        fields = [order.lstrip('-') for order in ordering]
+        if 'id' not in fields and 'pk' not in fields:
+            ordering += ('-id' if ordering[0].startswith('-') else 'id',)
+        return ordering
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for order in ordering:
+            field_name = order.lstrip('-')
+            if isinstance(instance, dict):
+                attr = instance[field_name]
+            else:
+                attr = getattr(instance, field_name)
+            values.append(str(attr))
+        return json.dumps(values, ensure_ascii=False)
+
+    def decode_position(self, position, queryset):
+        # Курсор приходит от клиента: каждое значение приводится к типу
+        # своего поля порядка, иначе подделанный курсор дошёл бы до ORM
+        # и дал 500 вместо 404
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            values = [
+                ordering_field(queryset, order.lstrip('-')).to_python(value)
+                for order, value in zip(self.ordering, values)
+            ]
+        except (ValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        # позиции выдаются только строками (_get_position_from_instance)
+        if any(value is None for value in values):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def keyset_filter(self, position, reverse, queryset):
+        # строки строго после позиции в порядке обхода
+        values = self.decode_position(position, queryset)
+        conditions = []
+        for i, order in enumerate(self.ordering):
+            equal = {
+                prev.lstrip('-'): value
+                for prev, value in zip(self.ordering[:i], values)
+            }
+            lookup = 'lt' if reverse != order.startswith('-') else 'gt'
+            equal[f"{order.lstrip('-')}__{lookup}"] = values[i]
+            conditions.append(Q(**equal))
+        return reduce(or_, conditions)
+
+    # Копия CursorPagination.paginate_queryset: отличается только
+    # фильтр по позиции курсора
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, reverse, current_position) = (0, False, None)
+        else:
+            (offset, reverse, current_position) = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            queryset = queryset.filter(self.keyset_filter(current_position, self.cursor.reverse, queryset))
+
+        # позиции уникальны, поэтому в выданных курсорах offset всегда 0
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = list(results[:self.page_size])
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            self.page = list(reversed(self.page))
+
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+
+def ordering_field(queryset, name):
+    # поле модели или аннотация queryset'а
+    if name == 'pk':
+        return queryset.model._meta.pk
+    try:
+        return queryset.model._meta.get_field(name)
+    except FieldDoesNotExist:
+        annotation = queryset.query.annotations.get(name)
+        if annotation is None:
+            raise ValueError(name)
+        return annotation.output_field
+
+
+class BookingCursorPagination(KeysetCursorPagination):
+    ordering = ('-created_at', '-id')
+
+
+class CarCursorPagination(KeysetCursorPagination):
+    ordering = ('name', 'id')
@@ -0,0 +1,145 @@
+import hashlib
+import json
+import math
+from datetime import timedelta
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils import timezone
+
+# множители дня хранятся целыми в десятитысячных: 1.15 -> 11500
+SCALE = 10000
+CENT = Decimal('0.01')
+
+
+def rental_days(start_time, end_time):
+    # неполные сутки считаются целыми, минимум одни сутки
+    return max(math.ceil((end_time - start_time).total_seconds() / 86400), 1)
+
+
+def to_units(value):
+    return int((Decimal(str(value)) * SCALE).to_integral_value(ROUND_HALF_UP))
+
+
+# =========================================================
+# Правила цены
+# =========================================================
+# settings.CAR_PRICING:
+#   driver_multiplier      — наценка за водителя
+#   weekend_multiplier     — сутки, начинающиеся в субботу/воскресенье
+#   seasons                — [{'start': 'MM-DD', 'end': 'MM-DD', 'multiplier': ...}],
+#                            границы включительно, сезон может переходить через год
+#   long_rental_discounts  — [[от скольки суток, скидка]], берётся наибольший порог
+class PricingEngine:
+    def __init__(self, rules):
+        self.driver = Decimal(str(rules.get('driver_multiplier', '1.2')))
+        self.weekend = to_units(rules.get('weekend_multiplier', 1))
+        self.seasons = [
+            (
+                tuple(int(p) for p in season['start'].split('-')),
+                tuple(int(p) for p in season['end'].split('-')),
+                to_units(season['multiplier']),
+            )
+            for season in rules.get('seasons', [])
+        ]
+        self.discounts = sorted(
+            (int(days), Decimal(1) - Decimal(str(discount)))
+            for days, discount in rules.get('long_rental_discounts', [])
+        )
+        self.version = hashlib.md5(
+            json.dumps(rules, sort_keys=True, default=str).encode()
+        ).hexdigest()[:12]
+
+    def day_factor(self, day):
+        factor = self.weekend if day.weekday() >= 5 else SCALE
+        key = (day.month, day.day)
+        for start, end, multiplier in self.seasons:
+            inside = start <= key <= end if start <= end else key >= start or key <= end
+            if inside:
+                factor = factor * multiplier // SCALE
+        return factor
+
+    def discount(self, days):
+        keep = Decimal(1)
+        for threshold, value in self.discounts:
+            if days >= threshold:
+                keep = value
+        return keep
+
+    def finish(self, price_per_day, units, days, with_driver):
+        price = Decimal(price_per_day) * units / SCALE
+        if with_driver:
+            price *= self.driver
+        price *= self.discount(days)
+        return price.quantize(CENT, rounding=ROUND_HALF_UP)
+
+    # -----------------------------------------------------
+    # Пакетный расчёт
+    # -----------------------------------------------------
+    def price_many(self, items):
+        # items: [(car, start_time, end_time, with_driver)]
+        # Множители дней считаются один раз на весь диапазон пакета,
+        # сумма по брони — разность префиксных сумм, без цикла по дням.
+        items = list(items)
+        if not items:
+            return []
+
+        # часовой пояс берём один раз: timezone.localdate() на каждую
+        # бронь заметно дороже самого расчёта
+        tz = timezone.get_current_timezone()
+        spans = [
+            (start_time.astimezone(tz).date(), rental_days(start_time, end_time))
+            for car, start_time, end_time, with_driver in items
+        ]
+
+        first = min(day for day, _ in spans)
+        last = max(day + timedelta(days=days) for day, days in spans)
+        prefix = [0]
+        day = first
+        while day < last:
+            prefix.append(prefix[-1] + self.day_factor(day))
+            day += timedelta(days=1)
+
+        prices = []
+        for (car, _, _, with_driver), (start_day, days) in zip(items, spans):
+            offset = (start_day - first).days
+            units = prefix[offset + days] - prefix[offset]
+            prices.append(self.finish(car.price_per_day, units, days, with_driver))
+        return prices
+
+    def price_one(self, car, start_time, end_time, with_driver):
+        # эталон без префиксных сумм — для проверок и бенчмарка
+        start_day = timezone.localdate(start_time)
+        days = rental_days(start_time, end_time)
+        units = sum(self.day_factor(start_day + timedelta(days=i)) for i in range(days))
+        return self.finish(car.price_per_day, units, days, with_driver)
+
+
+# =========================================================
+# Движок с правилами из настроек (загружается один раз)
+# =========================================================
+_engine = None
+
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        _engine = PricingEngine(getattr(settings, 'CAR_PRICING', {}))
+    return _engine
+
+
+def pricing_version():
+    return get_engine().version
+
+
+def price_many(items):
+    return get_engine().price_many(items)
+
+
+@receiver(setting_changed)
+def reset_engine(setting, **kwargs):
+    global _engine
+    if setting == 'CAR_PRICING':
+        _engine = None
@@ -0,0 +1,126 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils import timezone
+
+from server import caches as server_caches
+from .cache import get_cache
+from .models import Booking, Car
+from .pricing import get_engine, rental_days
+
+
+# =========================================================
+# Поколение машины
+# =========================================================
+# Любое изменение броней машины (или самой машины) — новое поколение.
+# Оно входит в ключ котировки, а старые записи просто вытесняются из
+# LRU. Поколение хранится только в общем кэше (CAR_CATALOGUE_CACHE,
+# CACHE_URL): с кэшем в памяти процесса бронь сбрасывала бы котировки
+# одного воркера, а остальные до CAR_QUOTE_CACHE_TTL отдавали бы
+# старую доступность. Тогда котировки не запоминаются (None).
+def generation_key(car_id):
+    return f'cars:quote:{car_id}:generation'
+
+
+def get_generation_cache():
+    cache = get_cache()
+    return cache if server_caches.is_shared(cache) else None
+
+
+def car_generation(car_id):
+    cache = get_generation_cache()
+    if cache is None:
+        return None
+    key = generation_key(car_id)
+    generation = cache.get(key)
+    if generation is None:
+        generation = time.time_ns()
+        cache.add(key, generation, None)
+        generation = cache.get(key) or generation
+    return generation
+
+
+def bump_car_generation(*car_ids):
+    cache = get_generation_cache()
+    if cache is None:
+        return
+    for car_id in set(car_ids):
+        if car_id is not None:
+            cache.set(generation_key(car_id), time.time_ns(), None)
+
+
+# =========================================================
+# LRU с TTL в памяти процесса
+# =========================================================
+class QuoteCache:
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.items.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires <= time.monotonic():
+                del self.items[key]
+                return None
+            self.items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.items[key] = (time.monotonic() + self.ttl, value)
+            self.items.move_to_end(key)
+            while len(self.items) > self.max_size:
+                self.items.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+
+quote_cache = QuoteCache(
+    max_size=getattr(settings, 'CAR_QUOTE_CACHE_SIZE', 10_000),
+    ttl=getattr(settings, 'CAR_QUOTE_CACHE_TTL', 60),
+)
+
+
+# =========================================================
+# Котировка: цена и доступность окна без записи брони
+# =========================================================
+def quote(car_id, start_time, end_time, with_driver):
+    # при попадании в кэш — ни одного запроса к БД; None — машины нет
+    engine = get_engine()
+    generation = car_generation(car_id)
+    key = (
+        car_id, start_time, end_time, with_driver,
+        engine.version, generation,
+    )
+    result = quote_cache.get(key) if generation is not None else None
+    if result is None:
+        car = Car.objects.filter(pk=car_id).first()
+        if car is None:
+            return None
+        conflict = Booking.objects.overlapping(car, start_time, end_time).exists()
+        result = {
+            'car': car.pk,
+            'start_time': start_time,
+            'end_time': end_time,
+            'with_driver': with_driver,
+            'rental_days': rental_days(start_time, end_time),
+            # Decimal строкой, как в BookingSerializer
+            'price_per_day': str(car.price_per_day),
+            'total_price': str(engine.price_many([(car, start_time, end_time, with_driver)])[0]),
+            'available': car.is_available and not conflict,
+            'pricing_version': engine.version,
+        }
+        if generation is not None:
+            quote_cache.set(key, result)
+    # окно могло уйти в прошлое, пока котировка лежала в кэше
+    return {**result, 'available': result['available'] and start_time > timezone.now()}
@@ -0,0 +1,135 @@
+import heapq
+import logging
+import time
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import events
+from .cache import bump_catalogue_version
+from .models import ACTIVE_BOOKING_STATUSES, Booking, Car
+from .quotes import bump_car_generation
+
+logger = logging.getLogger(__name__)
+
+TRANSITION_BATCH = 1000
+
+
+# =========================================================
+# Переходы статусов броней
+# =========================================================
+def transition(bookings, status):
+    # массовый UPDATE идёт в обход сигналов — события пишем сами
+    rows = list(bookings.values('pk', *events.EVENT_FIELDS))
+    updated = 0
+    for i in range(0, len(rows), TRANSITION_BATCH):
+        batch = rows[i:i + TRANSITION_BATCH]
+        updated += bookings.filter(pk__in=[row['pk'] for row in batch]).update(status=status)
+    if rows:
+        events.record_transitions(rows, status)
+    return updated
+
+
+def advance_bookings(now=None):
+    # pending/confirmed -> active, когда наступило время начала;
+    # pending/confirmed/active -> completed, когда аренда закончилась.
+    # Машины, у которых закончилась аренда, снова становятся доступными.
+    now = now or timezone.now()
+
+    with transaction.atomic():
+        starting = Booking.objects.filter(
+            is_active=True,
+            status__in=['pending', 'confirmed'],
+            start_time__lte=now,
+            end_time__gte=now
+        )
+        activated = transition(starting, 'active')
+
+        finished = Booking.objects.filter(
+            is_active=True,
+            status__in=ACTIVE_BOOKING_STATUSES,
+            end_time__lt=now
+        )
+        car_ids = set(finished.values_list('car_id', flat=True))
+        completed = transition(finished, 'completed')
+
+        if car_ids:
+            # машина свободна, только если у неё нет другой текущей брони
+            busy = Booking.objects.blocking().filter(
+                car_id__in=car_ids,
+                start_time__lte=now,
+                end_time__gte=now
+            ).values('car_id')
+
+            Car.objects.filter(
+                pk__in=car_ids,
+                is_available=False
+            ).exclude(pk__in=busy).update(is_available=True)
+
+    if activated or completed:
+        bump_catalogue_version()
+        # машины снова свободны — их котировки устарели
+        bump_car_generation(*car_ids)
+
+    return activated, completed
+
+
+# =========================================================
+# Планировщик: очередь ближайших переходов
+# =========================================================
+class BookingScheduler:
+    def __init__(self, horizon=timedelta(hours=1), poll_interval=30):
+        # horizon — на сколько вперёд загружаем переходы в очередь,
+        # poll_interval — максимальный сон (подхватываем новые брони)
+        self.horizon = horizon
+        self.poll_interval = poll_interval
+        self.queue = []
+
+    def load(self, now):
+        until = now + self.horizon
+        self.queue = []
+
+        starts = Booking.objects.filter(
+            is_active=True,
+            status__in=['pending', 'confirmed'],
+            start_time__gt=now,
+            start_time__lte=until
+        ).values_list('start_time', 'pk')
+
+        ends = Booking.objects.blocking().filter(
+            end_time__gte=now,
+            end_time__lte=until
+        ).values_list('end_time', 'pk')
+
+        for when, pk in starts:
+            self.queue.append((when, pk))
+        for when, pk in ends:
+            # completed ставится строго после end_time
+            self.queue.append((when + timedelta(microseconds=1), pk))
+
+        heapq.heapify(self.queue)
+
+    def run_once(self, now=None):
+        now = now or timezone.now()
+        activated, completed = advance_bookings(now)
+        if activated or completed:
+            logger.info('bookings: %s activated, %s completed', activated, completed)
+        self.load(now)
+        return activated, completed
+
+    def seconds_until_next(self, now=None):
+        now = now or timezone.now()
+        if not self.queue:
+            return self.poll_interval
+        # очередь — min-heap по времени перехода
+        wait = (self.queue[0][0] - now).total_seconds()
+        return min(max(wait, 0), self.poll_interval)
+
+    def run_forever(self):
+        self.run_once()
+        while True:
+            wait = self.seconds_until_next()
+            if wait:
+                time.sleep(wait)
+            self.run_once()
@@ -0,0 +1,237 @@
+import re
+
+from django.apps import apps as django_apps
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import BaseFilterBackend
+
+from .models import SearchDocument
+
+DOCUMENT_TABLE = 'cars_searchdocument'
+FTS_TABLE = 'cars_searchdocument_fts'
+TRIGRAM_TABLE = 'cars_searchdocument_trigram'
+# сколько слов запроса учитываем
+MAX_TOKENS = 8
+# сколько совпадений ранжируем в search() на SQLite
+SEARCH_CANDIDATES = 2000
+# вес названия относительно остального текста при ранжировании
+NAME_WEIGHT = 10.0
+
+
+# =========================================================
+# Полнотекстовый индекс (миграции 0011_search_index, 0013_search_trigram_index)
+# =========================================================
+# SQLite: FTS5-таблица FTS_TABLE с внешним содержимым, триггеры держат
+# её в синхроне с cars_searchdocument; prefix='2 3' — отдельный индекс
+# префиксов для автодополнения. TRIGRAM_TABLE — такая же таблица по
+# названию с токенизатором trigram: подстроки для списков.
+# PostgreSQL: GIN по TSVECTOR (слова и префиксы) и по триграммам
+# названия (опечатки, ILIKE по подстроке).
+TSVECTOR = "to_tsvector('simple', name || ' ' || body)"
+# trigram не находит подстроки короче трёх символов
+MIN_SUBSTRING = 3
+
+
+# =========================================================
+# Документы: что из машины попадает в индекс
+# =========================================================
+def choice_label(instance, field):
+    value = getattr(instance, field)
+    return dict(instance._meta.get_field(field).choices).get(value, value)
+
+
+def car_document(car):
+    return {
+        'kind': 'car',
+        'object_id': car.pk,
+        'name': car.name,
+        'body': f'{choice_label(car, "car_type")} {car.car_type} {car.year}',
+    }
+
+
+def user_car_document(car):
+    return {
+        'kind': 'user_car',
+        'object_id': car.pk,
+        'name': car.car_name,
+        'body': f'{car.location} {choice_label(car, "car_type")} {car.car_type} {car.year}',
+    }
+
+
+def index(document):
+    SearchDocument.objects.update_or_create(
+        kind=document['kind'], object_id=document['object_id'],
+        defaults={'name': document['name'], 'body': document['body']},
+    )
+
+
+def unindex(kind, object_id):
+    SearchDocument.objects.filter(kind=kind, object_id=object_id).delete()
+
+
+def rebuild(apps=django_apps):
+    Document = apps.get_model('cars', 'SearchDocument')
+    sources = [
+        (apps.get_model('cars', 'Car'), car_document),
+        (apps.get_model('user_cars', 'Car'), user_car_document),
+    ]
+
+    Document.objects.all().delete()
+    count = 0
+    for model, make_document in sources:
+        batch = []
+        for instance in model.objects.order_by('pk').iterator(chunk_size=2000):
+            batch.append(Document(**make_document(instance)))
+            if len(batch) == 2000:
+                Document.objects.bulk_create(batch)
+                count += len(batch)
+                batch = []
+        Document.objects.bulk_create(batch)
+        count += len(batch)
+    return count
+
+
+# =========================================================
+# Запросы к индексу
+# =========================================================
+def tokens(query):
+    return re.findall(r'\w+', (query or '').lower())[:MAX_TOKENS]
+
+
+def match_sql(kind, words):
+    # подзапрос: object_id документов нужного вида, где есть все слова
+    # запроса (каждое — как префикс, для автодополнения) или где все
+    # слова — подстроки названия, как в прежнем SearchFilter по name
+    vendor = connection.vendor
+    substring = all(len(word) >= MIN_SUBSTRING for word in words)
+    if vendor == 'sqlite':
+        # совпадения обоих индексов объединяем по rowid и только потом
+        # идём в документы. CROSS JOIN фиксирует порядок: иначе
+        # планировщик перебирает все документы вида kind и для каждого
+        # заглядывает в FTS.
+        rowids = f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s'
+        params = [fts5_query(words)]
+        if substring:
+            rowids += f' UNION SELECT rowid FROM {TRIGRAM_TABLE} WHERE {TRIGRAM_TABLE} MATCH %s'
+            params.append(trigram_query(words))
+        return (
+            f'SELECT d.object_id FROM ({rowids}) m '
+            f'CROSS JOIN {DOCUMENT_TABLE} d ON d.id = m.rowid WHERE d.kind = %s',
+            [*params, kind],
+        )
+    if vendor == 'postgresql':
+        # name ILIKE (не icontains: тот сравнивает UPPER(name)) берёт
+        # триграммный индекс по name
+        condition = f"{TSVECTOR} @@ to_tsquery('simple', %s) OR name %% %s"
+        params = [tsquery(words), ' '.join(words)]
+        if substring:
+            condition += ' OR (' + ' AND '.join('name ILIKE %s' for _ in words) + ')'
+            params += [f'%{like_escape(word)}%' for word in words]
+        return (
+            f'SELECT object_id FROM {DOCUMENT_TABLE} WHERE kind = %s AND ({condition})',
+            [kind, *params],
+        )
+    return None
+
+
+def fts5_query(words):
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def trigram_query(words):
+    # фраза в trigram-таблице совпадает с подстрокой названия
+    return ' '.join(f'"{word}"' for word in words)
+
+
+def like_escape(word):
+    # слова — \w+: из спецсимволов LIKE в них бывает только _
+    return word.replace('_', '\\_')
+
+
+def tsquery(words):
+    return ' & '.join(f'{word}:*' for word in words)
+
+
+def filter_queryset(queryset, kind, query):
+    words = tokens(query)
+    if not words:
+        return queryset
+    match = match_sql(kind, words)
+    if match is None:
+        # icontains по name и body покрывает и подстроки названия
+        matched = like_documents(words).filter(kind=kind).values('object_id')
+        return queryset.filter(pk__in=matched)
+    return queryset.filter(pk__in=RawSQL(*match))
+
+
+def like_documents(words):
+    # без полнотекстового индекса (другие СУБД) — простой icontains
+    documents = SearchDocument.objects.all()
+    for word in words:
+        documents = documents.filter(Q(name__icontains=word) | Q(body__icontains=word))
+    return documents
+
+
+def search(query, kind=None, limit=20):
+    # ранжированный поиск по обоим каталогам: [{kind, id, name, body, score}]
+    words = tokens(query)
+    if not words:
+        return []
+
+    vendor = connection.vendor
+    kind_sql = ' AND d.kind = %s' if kind else ''
+    kind_params = [kind] if kind else []
+
+    if vendor == 'sqlite':
+        # bm25 считается только для первых SEARCH_CANDIDATES совпадений:
+        # на коротких префиксах («to») совпадает почти весь каталог, а
+        # ранжировать его целиком ради 20 подсказок слишком дорого
+        kind_sql = f' AND {FTS_TABLE}.kind = %s' if kind else ''
+        sql = (
+            f'SELECT d.kind, d.object_id, d.name, d.body, -c.score FROM ('
+            f'SELECT rowid, rank AS score FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rank MATCH %s{kind_sql} LIMIT %s'
+            f') c CROSS JOIN {DOCUMENT_TABLE} d ON d.id = c.rowid '
+            f'ORDER BY c.score LIMIT %s'
+        )
+        params = [fts5_query(words), f'bm25({NAME_WEIGHT}, 1.0)', *kind_params, SEARCH_CANDIDATES, limit]
+    elif vendor == 'postgresql':
+        text = ' '.join(words)
+        sql = (
+            f"SELECT d.kind, d.object_id, d.name, d.body, "
+            f"ts_rank({TSVECTOR}, q) + similarity(d.name, %s) AS score "
+            f"FROM {DOCUMENT_TABLE} d, to_tsquery('simple', %s) q "
+            f"WHERE ({TSVECTOR} @@ q OR d.name %% %s){kind_sql} "
+            f"ORDER BY score DESC, d.name LIMIT %s"
+        )
+        params = [text, tsquery(words), text, *kind_params, limit]
+    else:
+        documents = like_documents(words)
+        if kind:
+            documents = documents.filter(kind=kind)
+        rows = documents.order_by('name').values_list('kind', 'object_id', 'name', 'body')[:limit]
+        return [
+            {'kind': k, 'id': object_id, 'name': name, 'body': body, 'score': None}
+            for k, object_id, name, body in rows
+        ]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    return [
+        {'kind': k, 'id': object_id, 'name': name, 'body': body, 'score': round(score, 4)}
+        for k, object_id, name, body, score in rows
+    ]
+
+
+# =========================================================
+# Фильтр для списков (вместо DRF SearchFilter)
+# =========================================================
+class FullTextSearchFilter(BaseFilterBackend):
+    # ?search=... через индекс; вид документа — view.search_kind
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param)
+        return filter_queryset(queryset, view.search_kind, query)
@@ -1,8 +1,32 @@
-import math
 from rest_framework import serializers
+from rest_framework.settings import api_settings
+from django.db import IntegrityError, transaction
 from django.utils import timezone
 
-from .models import Car, Booking
+from .images import variant_urls
+from .models import Car, Booking, BookingEvent
+from .pricing import rental_days
+
+OVERLAP_ERROR = 'Автомобиль уже забронирован на этот период'
+# exclusion constraint на PostgreSQL (миграция 0004)
+OVERLAP_CONSTRAINT = 'booking_no_overlap'
+
+
+def is_overlap_violation(exc):
+    # Только нарушение booking_no_overlap — это пересечение броней;
+    # остальные IntegrityError (FK, NOT NULL, ...) пробрасываются как есть
+    diag = getattr(exc.__cause__, 'diag', None)
+    name = getattr(diag, 'constraint_name', None)
+    if name is not None:
+        return name == OVERLAP_CONSTRAINT
+    return OVERLAP_CONSTRAINT in str(exc)
+
+
+def overlap_error():
+    # та же форма, что у ошибки из validate()
+    return serializers.ValidationError({
+        api_settings.NON_FIELD_ERRORS_KEY: [OVERLAP_ERROR]
+    })
 
 
 # =========================================================
@@ -13,16 +37,21 @@ class CarSerializer(serializers.ModelSerializer):
         source='get_car_type_display',
         read_only=True
     )
+    # {'thumb': {'webp': url, 'avif': url}, 'medium': ..., 'large': ...}
+    photo_srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = Car
         fields = [
-            'id', 'name', 'photo', 'year',
+            'id', 'name', 'photo', 'photo_srcset', 'year',
             'car_type', 'car_type_display',
             'price_per_day', 'seats',
             'luggage', 'is_available'
         ]
 
+    def get_photo_srcset(self, obj):
+        return variant_urls(obj, self.context.get('request'))
+
 
 # =========================================================
 # Booking Serializer
@@ -67,6 +96,12 @@ class BookingSerializer(serializers.ModelSerializer):
             'total_price'
         ]
 
+    # user (StringRelatedField), car.name и car.price_per_day
+    # читаются для каждой строки — подтягиваем их одним JOIN
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('user', 'car')
+
     # =====================================================
     # Calculated fields
     # =====================================================
@@ -74,8 +109,8 @@ class BookingSerializer(serializers.ModelSerializer):
         if not obj.start_time or not obj.end_time:
             return 0
 
-        delta = obj.end_time - obj.start_time
-        return max(math.ceil(delta.total_seconds() / 86400), 1)
+        # тот же подсчёт суток, что и в цене
+        return rental_days(obj.start_time, obj.end_time)
 
     def get_price_per_day(self, obj):
         return obj.car.price_per_day if obj.car else 0
@@ -84,8 +119,9 @@ class BookingSerializer(serializers.ModelSerializer):
     # Validation
     # =====================================================
     def validate(self, data):
-        start_time = data.get('start_time')
-        end_time = data.get('end_time')
+        # PATCH может прислать только одну границу — вторая из брони
+        start_time = data.get('start_time', getattr(self.instance, 'start_time', None))
+        end_time = data.get('end_time', getattr(self.instance, 'end_time', None))
         car = data.get('car_id')
 
         if start_time and end_time:
@@ -101,22 +137,19 @@ class BookingSerializer(serializers.ModelSerializer):
                 )
 
             # проверка пересечений (ТОЛЬКО АКТИВНЫЕ БРОНИ)
+            if not car and self.instance:
+                car = self.instance.car
+
             if car:
-                overlapping = Booking.objects.filter(
-                    car=car,
-                    is_active=True,  # 🔥 soft delete
-                    status__in=['pending', 'confirmed', 'active'],
-                    end_time__gt=start_time,
-                    start_time__lt=end_time
+                overlapping = Booking.objects.overlapping(
+                    car, start_time, end_time
                 )
 
                 if self.instance:
                     overlapping = overlapping.exclude(pk=self.instance.pk)
 
                 if overlapping.exists():
-                    raise serializers.ValidationError(
-                        'Автомобиль уже забронирован на этот период'
-                    )
+                    raise serializers.ValidationError(OVERLAP_ERROR)
 
         return data
 
@@ -127,14 +160,18 @@ class BookingSerializer(serializers.ModelSerializer):
         car = validated_data.pop('car_id')
         user = self.context['request'].user
 
-        booking = Booking.objects.create(
-            user=user,
-            car=car,
-            **validated_data
-        )
-
-        # вычисляем и сохраняем цену
-        booking.calculate_price(save=True)
+        # на PostgreSQL гонку двух одновременных броней ловит
+        # exclusion constraint booking_no_overlap
+        try:
+            with transaction.atomic():
+                booking = Booking(user=user, car=car, **validated_data)
+                # цена считается до INSERT: одна запись и одно событие created
+                booking.total_price = booking.calculate_price()
+                booking.save()
+        except IntegrityError as exc:
+            if not is_overlap_violation(exc):
+                raise
+            raise overlap_error()
 
         return booking
 
@@ -150,6 +187,70 @@ class BookingSerializer(serializers.ModelSerializer):
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
 
-        instance.calculate_price()
-        instance.save()
+        instance.total_price = instance.calculate_price()
+        try:
+            with transaction.atomic():
+                instance.save()
+        except IntegrityError as exc:
+            if not is_overlap_violation(exc):
+                raise
+            raise overlap_error()
         return instance
+
+
+# =========================================================
+# Параметры котировки (cars/<pk>/quote/)
+# =========================================================
+class QuoteRequestSerializer(serializers.Serializer):
+    start_time = serializers.DateTimeField()
+    end_time = serializers.DateTimeField()
+    with_driver = serializers.BooleanField(default=False)
+
+    def validate(self, data):
+        if data['start_time'] >= data['end_time']:
+            raise serializers.ValidationError(
+                'Дата окончания должна быть позже даты начала'
+            )
+        if data['start_time'] < timezone.now():
+            raise serializers.ValidationError(
+                'Нельзя бронировать в прошлом'
+            )
+        return data
+
+
+# =========================================================
+# Событие брони (лента bookings/events/)
+# =========================================================
+class BookingEventSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = BookingEvent
+        fields = [
+            'id', 'booking', 'car', 'user',
+            'event_type', 'status', 'previous_status',
+            'total_price', 'start_time', 'end_time',
+            'created_at'
+        ]
+        read_only_fields = fields
+
+
+# =========================================================
+# Элемент пакетного создания броней
+# =========================================================
+# Проверяет только сам элемент; машины и пересечения проверяются
+# для всего пакета сразу в cars.bulk.create_bookings
+class BookingBulkItemSerializer(serializers.Serializer):
+    car_id = serializers.IntegerField()
+    start_time = serializers.DateTimeField()
+    end_time = serializers.DateTimeField()
+    with_driver = serializers.BooleanField(default=False)
+
+    def validate(self, data):
+        if data['start_time'] >= data['end_time']:
+            raise serializers.ValidationError(
+                'Дата окончания должна быть позже даты начала'
+            )
+        if data['start_time'] < timezone.now():
+            raise serializers.ValidationError(
+                'Нельзя создавать бронирование в прошлом'
+            )
+        return data
@@ -0,0 +1,130 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import calendar, events, search, stats
+from .cache import bump_catalogue_version
+from .images import needs_variants, schedule_variants
+from .quotes import bump_car_generation
+from .models import Booking, Car
+
+
+# =========================================================
+# Статистика, календарь и журнал событий: старое состояние -> новое
+# =========================================================
+def _touches(update_fields, fields):
+    return update_fields is None or any(f in fields for f in update_fields)
+
+
+@receiver(pre_save, sender=Booking)
+def remember_booking_state(sender, instance, update_fields=None, **kwargs):
+    instance._stats_old = None
+    instance._old_state = None
+    if instance.pk is None:
+        return
+    if not _touches(update_fields, stats.STATS_FIELDS + calendar.CALENDAR_FIELDS + events.EVENT_FIELDS):
+        return
+    old = Booking.objects.filter(pk=instance.pk).values(*events.EVENT_FIELDS).first()
+    if old:
+        instance._stats_old = stats.contribution(
+            old['car_id'], old['start_time'], old['end_time'],
+            old['total_price'], old['is_active']
+        )
+        instance._old_state = old
+
+
+@receiver(post_save, sender=Booking)
+def update_booking_stats(sender, instance, update_fields=None, **kwargs):
+    if not _touches(update_fields, stats.STATS_FIELDS):
+        return
+    old = getattr(instance, '_stats_old', None)
+    new = stats.booking_contribution(instance)
+    if old != new:
+        stats.record_change(old, new)
+
+
+@receiver(post_save, sender=Booking)
+def update_booking_calendar(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or not _touches(update_fields, calendar.CALENDAR_FIELDS):
+        return
+    calendar.booking_changed(getattr(instance, '_old_state', None), instance)
+
+
+@receiver(post_save, sender=Booking)
+def record_booking_events(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw or not _touches(update_fields, events.EVENT_FIELDS):
+        return
+    events.booking_saved(None if created else getattr(instance, '_old_state', None), instance)
+
+
+@receiver(post_delete, sender=Booking)
+def remove_booking_stats(sender, instance, **kwargs):
+    stats.record_change(stats.booking_contribution(instance), None)
+
+
+@receiver(post_delete, sender=Booking)
+def remove_booking_calendar(sender, instance, **kwargs):
+    calendar.booking_changed(
+        {
+            'car_id': instance.car_id,
+            'start_time': instance.start_time,
+            'end_time': instance.end_time,
+            'is_active': instance.is_active,
+            'status': instance.status,
+        },
+        None,
+    )
+
+
+@receiver(post_delete, sender=Booking)
+def record_booking_deleted(sender, instance, **kwargs):
+    events.booking_deleted(instance)
+
+
+# =========================================================
+# Кэш каталога: любое изменение машины или брони — новая версия
+# =========================================================
+@receiver(post_save, sender=Car)
+@receiver(post_delete, sender=Car)
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def invalidate_catalogue_cache(sender, **kwargs):
+    bump_catalogue_version()
+
+
+# =========================================================
+# Производные фото: генерируются в фоне после загрузки
+# =========================================================
+@receiver(post_save, sender=Car)
+def queue_car_photo_variants(sender, instance, raw=False, **kwargs):
+    if not raw and needs_variants(instance):
+        schedule_variants(instance)
+
+
+# =========================================================
+# Котировки: брони или сама машина изменились — новое поколение
+# =========================================================
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def invalidate_booking_quotes(sender, instance, **kwargs):
+    old = getattr(instance, '_old_state', None)
+    bump_car_generation(instance.car_id, old['car_id'] if old else None)
+
+
+@receiver(post_save, sender=Car)
+@receiver(post_delete, sender=Car)
+def invalidate_car_quotes(sender, instance, **kwargs):
+    bump_car_generation(instance.pk)
+
+
+# =========================================================
+# Поисковый индекс
+# =========================================================
+@receiver(post_save, sender=Car)
+def index_car(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index(search.car_document(instance))
+
+
+@receiver(post_delete, sender=Car)
+def unindex_car(sender, instance, **kwargs):
+    search.unindex('car', instance.pk)
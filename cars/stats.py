@@ -0,0 +1,217 @@
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.apps import apps as django_apps
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+# поля брони, от которых зависит статистика
+STATS_FIELDS = ('car', 'car_id', 'start_time', 'end_time', 'total_price', 'is_active')
+# счётчики, которые складываются при обновлении
+SUM_FIELDS = ('bookings_count', 'total_revenue', 'total_rental_duration')
+
+
+# =========================================================
+# Вклад одной брони в статистику
+# =========================================================
+def contribution(car_id, start_time, end_time, total_price, is_active):
+    if not is_active:
+        return None
+    return (
+        car_id,
+        timezone.localdate(start_time),
+        1,
+        Decimal(total_price or 0),
+        end_time - start_time,
+    )
+
+
+def booking_contribution(booking):
+    return contribution(
+        booking.car_id, booking.start_time, booking.end_time,
+        booking.total_price, booking.is_active
+    )
+
+
+# =========================================================
+# Инкрементальное обновление
+# =========================================================
+def apply_deltas(deltas):
+    # deltas: {(car_id, day): [count, revenue, duration]}
+    from .models import CarBookingStats, CarDailyBookingStats
+
+    totals = defaultdict(lambda: [0, Decimal(0), timedelta(0)])
+    for (car_id, day), (count, revenue, duration) in deltas.items():
+        total = totals[car_id]
+        total[0] += count
+        total[1] += revenue
+        total[2] += duration
+
+    # без savepoint: обычно это часть транзакции сохранения брони
+    with transaction.atomic(savepoint=False):
+        _apply(CarBookingStats, [
+            ({'car_id': car_id}, values) for car_id, values in totals.items()
+        ])
+        _apply(CarDailyBookingStats, [
+            ({'car_id': car_id, 'day': day}, values) for (car_id, day), values in deltas.items()
+        ])
+
+
+def _apply(model, items):
+    # items: [(lookup, (count, revenue, duration))]
+    items = [(lookup, values) for lookup, values in items if any(values)]
+    connection = connections[router.db_for_write(model)]
+    if connection.features.supports_update_conflicts_with_target:
+        # новые брони (count > 0) — одним INSERT ... ON CONFLICT на таблицу
+        added = [(lookup, values) for lookup, values in items if values[0] > 0]
+        _upsert(connection, model, added)
+        items = [(lookup, values) for lookup, values in items if values[0] <= 0]
+    for lookup, values in items:
+        _add(model, lookup, *values)
+
+
+def _upsert(connection, model, items):
+    # INSERT ... ON CONFLICT (ключ) DO UPDATE SET поле = поле + excluded.поле
+    if not items:
+        return
+    qn = connection.ops.quote_name
+    keys = list(items[0][0])
+    names = keys + list(SUM_FIELDS)
+    # auto_now в raw SQL не срабатывает
+    if any(field.name == 'updated_at' for field in model._meta.concrete_fields):
+        names.append('updated_at')
+    fields = [model._meta.get_field(name) for name in names]
+    now = timezone.now()
+
+    table = qn(model._meta.db_table)
+    columns = ', '.join(qn(field.column) for field in fields)
+    conflict = ', '.join(qn(field.column) for field in fields[:len(keys)])
+    updates = ', '.join([
+        f'{qn(field.column)} = {table}.{qn(field.column)} + excluded.{qn(field.column)}'
+        for field in fields[len(keys):len(keys) + len(SUM_FIELDS)]
+    ] + [
+        f'{qn(field.column)} = excluded.{qn(field.column)}'
+        for field in fields[len(keys) + len(SUM_FIELDS):]
+    ])
+    row_sql = '(' + ', '.join(['%s'] * len(fields)) + ')'
+
+    batch_size = connection.ops.bulk_batch_size(fields, items)
+    with connection.cursor() as cursor:
+        for start in range(0, len(items), batch_size):
+            batch = items[start:start + batch_size]
+            params = []
+            for lookup, values in batch:
+                row = [*lookup.values(), *values, now][:len(fields)]
+                params.extend(field.get_db_prep_save(value, connection) for field, value in zip(fields, row))
+            cursor.execute(
+                f'INSERT INTO {table} ({columns}) VALUES {", ".join([row_sql] * len(batch))} '
+                f'ON CONFLICT ({conflict}) DO UPDATE SET {updates}',
+                params,
+            )
+
+
+def _add(model, lookup, count, revenue, duration):
+    if not count and not revenue and not duration:
+        return
+    changes = {
+        'bookings_count': F('bookings_count') + count,
+        'total_revenue': F('total_revenue') + revenue,
+        'total_rental_duration': F('total_rental_duration') + duration,
+    }
+    if model.objects.filter(**lookup).update(**changes) or count <= 0:
+        # при удалении (count < 0) строку не создаём заново —
+        # машина могла быть удалена вместе со своей статистикой
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(
+                **lookup,
+                bookings_count=count,
+                total_revenue=revenue,
+                total_rental_duration=duration,
+            )
+    except IntegrityError:
+        # строку успели создать параллельно
+        model.objects.filter(**lookup).update(**changes)
+
+
+def _merge(items):
+    # items: [(contribution или None, знак)]
+    deltas = defaultdict(lambda: [0, Decimal(0), timedelta(0)])
+    for item, sign in items:
+        if item is None:
+            continue
+        car_id, day, count, revenue, duration = item
+        delta = deltas[(car_id, day)]
+        delta[0] += sign * count
+        delta[1] += sign * revenue
+        delta[2] += sign * duration
+    return deltas
+
+
+def record_change(old, new):
+    # old/new — результат contribution() до и после изменения брони
+    apply_deltas(_merge([(old, -1), (new, 1)]))
+
+
+def record_changes(pairs):
+    # [(old, new)] — для bulk_update в обход save()
+    apply_deltas(_merge(item for old, new in pairs for item in ((old, -1), (new, 1))))
+
+
+def record_created(bookings):
+    # для bulk_create и других путей в обход save()
+    apply_deltas(_merge((booking_contribution(b), 1) for b in bookings))
+
+
+# =========================================================
+# Полный пересчёт (бэкфилл)
+# =========================================================
+def rebuild(apps=django_apps):
+    Booking = apps.get_model('cars', 'Booking')
+    CarBookingStats = apps.get_model('cars', 'CarBookingStats')
+    CarDailyBookingStats = apps.get_model('cars', 'CarDailyBookingStats')
+
+    duration = ExpressionWrapper(F('end_time') - F('start_time'), output_field=DurationField())
+    daily = (
+        Booking.objects.filter(is_active=True)
+        .annotate(day=TruncDate('start_time'))
+        .values('car_id', 'day')
+        .annotate(
+            bookings_count=Count('id'),
+            total_revenue=Sum('total_price'),
+            total_rental_duration=Sum(duration),
+        )
+        .order_by()
+    )
+
+    totals = {}
+    daily_rows = []
+    for row in daily:
+        daily_rows.append(CarDailyBookingStats(
+            car_id=row['car_id'],
+            day=row['day'],
+            bookings_count=row['bookings_count'],
+            total_revenue=row['total_revenue'] or 0,
+            total_rental_duration=row['total_rental_duration'] or timedelta(0),
+        ))
+        total = totals.setdefault(row['car_id'], CarBookingStats(
+            car_id=row['car_id'],
+            bookings_count=0,
+            total_revenue=Decimal(0),
+            total_rental_duration=timedelta(0),
+        ))
+        total.bookings_count += row['bookings_count']
+        total.total_revenue += row['total_revenue'] or 0
+        total.total_rental_duration += row['total_rental_duration'] or timedelta(0)
+
+    with transaction.atomic():
+        CarDailyBookingStats.objects.all().delete()
+        CarBookingStats.objects.all().delete()
+        CarDailyBookingStats.objects.bulk_create(daily_rows, batch_size=1000)
+        CarBookingStats.objects.bulk_create(totals.values(), batch_size=1000)
+
+    return len(totals), len(daily_rows)
@@ -0,0 +1,56 @@
+from django.http import StreamingHttpResponse
+
+from server import renderers
+
+
+# =========================================================
+# Потоковая выгрузка списков (?stream=json | ?stream=ndjson)
+# =========================================================
+# Queryset читается через .iterator() кусками по stream_chunk_size,
+# поэтому память не зависит от размера таблицы.
+class StreamingListMixin:
+    stream_chunk_size = 500
+
+    def list(self, request, *args, **kwargs):
+        stream = request.query_params.get('stream')
+        if stream not in ('json', 'ndjson'):
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+
+        if stream == 'ndjson':
+            content = self.stream_ndjson(queryset)
+            content_type = 'application/x-ndjson'
+        else:
+            content = self.stream_json(queryset)
+            content_type = 'application/json'
+
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    def stream_chunks(self, queryset):
+        chunk = []
+        for obj in queryset.iterator(chunk_size=self.stream_chunk_size):
+            chunk.append(obj)
+            if len(chunk) == self.stream_chunk_size:
+                yield self.get_serializer(chunk, many=True).data
+                chunk = []
+        if chunk:
+            yield self.get_serializer(chunk, many=True).data
+
+    def dumps(self, item):
+        return renderers.dumps(item)
+
+    def stream_ndjson(self, queryset):
+        for rows in self.stream_chunks(queryset):
+            yield b''.join(self.dumps(row) + b'\n' for row in rows)
+
+    def stream_json(self, queryset):
+        yield b'['
+        first = True
+        for rows in self.stream_chunks(queryset):
+            body = b','.join(self.dumps(row) for row in rows)
+            yield body if first else b',' + body
+            first = False
+        yield b']'
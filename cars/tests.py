@@ -1,3 +1,1337 @@
-from django.test import TestCase
+import gzip
+import heapq
+import json
+import os
+import tempfile
+from base64 import b64encode
+from datetime import datetime, timedelta
+from io import BytesIO, StringIO
+from unittest import mock
+from urllib.parse import urlencode
+from zoneinfo import ZoneInfo
+from decimal import Decimal
 
-# Create your tests here.
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from PIL import Image
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from server import db_router, renderers
+from server.instrumentation import registry
+from user_cars.models import Car as UserCar
+from users.models import User
+from . import cache, calendar, events, images, pricing, quotes, scheduler, stats
+from .fast_serializers import FastBookingSerializer, FastCarSerializer
+from .filters import CarAvailabilityFilter
+from .models import Booking, BookingEvent, Car, CarAvailabilityMonth, CarBookingStats, CarDailyBookingStats
+from .serilaizer import OVERLAP_ERROR, BookingSerializer, CarSerializer
+
+
+SHARED_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        # файловый кэш общий для процессов, в отличие от LocMemCache
+        'LOCATION': os.path.join(tempfile.gettempdir(), 'carsharing-cars-cache-tests'),
+    },
+}
+
+
+# =========================================================
+# Пересечения броней
+# =========================================================
+class BookingOverlapTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='renter')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.car = Car.objects.create(
+            name='Car', photo='cars/test.png', year=2020,
+            car_type='suv', price_per_day=100
+        )
+        self.day = timezone.now().replace(microsecond=0) + timedelta(days=1)
+        # занято [день 2, день 4)
+        self.booking = self.book(2, 4)
+
+    def at(self, day):
+        return self.day + timedelta(days=day)
+
+    def book(self, start_day, end_day, **extra):
+        return Booking.objects.create(
+            user=self.user, car=self.car,
+            start_time=self.at(start_day), end_time=self.at(end_day), **extra
+        )
+
+    def post(self, start_day, end_day):
+        return self.client.post(reverse('booking-list-create'), {
+            'car_id': self.car.pk,
+            'start_time': self.at(start_day).isoformat(),
+            'end_time': self.at(end_day).isoformat(),
+        }, format='json')
+
+    def test_queryset(self):
+        overlapping = Booking.objects.overlapping
+        self.assertTrue(overlapping(self.car, self.at(3), self.at(5)).exists())
+        self.assertTrue(overlapping(self.car, self.at(1), self.at(6)).exists())
+        # интервалы полуоткрытые: касание границ — не пересечение
+        self.assertFalse(overlapping(self.car, self.at(4), self.at(5)).exists())
+        self.assertFalse(overlapping(self.car, self.at(0), self.at(2)).exists())
+
+    def test_overlap_rejected(self):
+        response = self.post(3, 5)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['non_field_errors'], [OVERLAP_ERROR])
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_touching_boundaries_allowed(self):
+        self.assertEqual(self.post(4, 5).status_code, 201)
+        self.assertEqual(self.post(1, 2).status_code, 201)
+
+    def test_canceled_and_deleted_do_not_block(self):
+        self.booking.status = 'canceled'
+        self.booking.save()
+        self.book(2, 4, is_active=False)
+        self.assertFalse(Booking.objects.blocking().exists())
+        self.assertEqual(self.post(2, 4).status_code, 201)
+
+    def test_update_ignores_itself(self):
+        url = reverse('booking-detail', args=[self.booking.pk])
+        response = self.client.patch(url, {
+            'start_time': self.at(3).isoformat(), 'end_time': self.at(5).isoformat(),
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        self.book(6, 7)
+        response = self.client.patch(url, {'end_time': self.at(7).isoformat()}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_integrity_error_is_overlap(self):
+        # гонка, которую на PostgreSQL ловит booking_no_overlap
+        error = IntegrityError('conflicting key value violates exclusion constraint "booking_no_overlap"')
+        with mock.patch.object(Booking, 'save', side_effect=error):
+            response = self.post(5, 6)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.data, {'non_field_errors': [OVERLAP_ERROR]})
+
+            response = self.client.patch(
+                reverse('booking-detail', args=[self.booking.pk]),
+                {'end_time': self.at(5).isoformat()}, format='json'
+            )
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.data, {'non_field_errors': [OVERLAP_ERROR]})
+
+    def test_other_integrity_errors_are_not_overlap(self):
+        error = IntegrityError('NOT NULL constraint failed: cars_booking.total_price')
+        with mock.patch.object(Booking, 'save', side_effect=error):
+            with self.assertRaises(IntegrityError):
+                self.post(5, 6)
+
+
+# =========================================================
+# Планировщик статусов броней
+# =========================================================
+class BookingSchedulerTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='u')
+        self.now = timezone.now().replace(microsecond=0)
+
+    def car(self, is_available=True):
+        return Car.objects.create(
+            name='Car', photo='cars/test.png', year=2020,
+            car_type='suv', price_per_day=100, is_available=is_available
+        )
+
+    def book(self, car, start_hours, end_hours, **extra):
+        return Booking.objects.create(
+            user=self.user, car=car,
+            start_time=self.now + timedelta(hours=start_hours),
+            end_time=self.now + timedelta(hours=end_hours), **extra
+        )
+
+    def status(self, booking):
+        booking.refresh_from_db()
+        return booking.status
+
+    def test_advance_bookings(self):
+        car = self.car()
+        starting = self.book(car, -1, 2)
+        finished = self.book(car, -5, -3, status='confirmed')
+        future = self.book(car, 3, 4)
+        canceled = self.book(car, -9, -8, status='canceled')
+        deleted = self.book(car, -7, -6, is_active=False)
+
+        self.assertEqual(scheduler.advance_bookings(self.now), (1, 1))
+        self.assertEqual(self.status(starting), 'active')
+        self.assertEqual(self.status(finished), 'completed')
+        self.assertEqual(self.status(future), 'pending')
+        self.assertEqual(self.status(canceled), 'canceled')
+        self.assertEqual(self.status(deleted), 'pending')
+
+    def test_car_is_released_only_when_free(self):
+        free = self.car(is_available=False)
+        self.book(free, -5, -3)
+        busy = self.car(is_available=False)
+        self.book(busy, -5, -3)
+        self.book(busy, -2, 2, status='active')
+
+        scheduler.advance_bookings(self.now)
+        free.refresh_from_db()
+        busy.refresh_from_db()
+        self.assertTrue(free.is_available)
+        self.assertFalse(busy.is_available)
+
+    def test_queue_is_ordered_by_transition_time(self):
+        car = self.car()
+        late = self.book(car, 2, 3)
+        soon = self.book(car, 1, 4)
+        self.book(car, -1, 7)          # конец за горизонтом
+        self.book(car, 10, 11)         # начало за горизонтом
+        self.book(car, 1, 2, status='canceled')
+
+        queue = scheduler.BookingScheduler(horizon=timedelta(hours=6))
+        queue.load(self.now)
+        order = [heapq.heappop(queue.queue) for _ in range(len(queue.queue))]
+        self.assertEqual(order, [
+            (soon.start_time, soon.pk),
+            (late.start_time, late.pk),
+            # completed — строго после end_time
+            (late.end_time + timedelta(microseconds=1), late.pk),
+            (soon.end_time + timedelta(microseconds=1), soon.pk),
+        ])
+
+    def test_sleeps_until_next_transition(self):
+        queue = scheduler.BookingScheduler(horizon=timedelta(hours=6), poll_interval=30)
+        queue.load(self.now)
+        self.assertEqual(queue.seconds_until_next(self.now), 30)
+
+        self.book(self.car(), 0.005, 1)
+        queue.load(self.now)
+        self.assertEqual(queue.seconds_until_next(self.now), 18)
+        self.assertEqual(queue.seconds_until_next(self.now + timedelta(minutes=1)), 0)
+
+    def test_command_once(self):
+        booking = self.book(self.car(), -1, 2)
+        out = StringIO()
+        call_command('run_booking_scheduler', '--once', stdout=out)
+        self.assertIn('Активировано: 1, завершено: 0', out.getvalue())
+        self.assertEqual(self.status(booking), 'active')
+
+
+# =========================================================
+# Окно доступности в каталоге (?start=&end=)
+# =========================================================
+class CarAvailabilityWindowTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='u')
+        self.day = timezone.now().replace(microsecond=0) + timedelta(days=1)
+        self.busy = Car.objects.create(
+            name='Busy', photo='cars/test.png', year=2020, car_type='suv', price_per_day=100
+        )
+        self.free = Car.objects.create(
+            name='Free', photo='cars/test.png', year=2020, car_type='suv', price_per_day=100
+        )
+        # занято [день 2, день 4)
+        self.booking = Booking.objects.create(
+            user=self.user, car=self.busy,
+            start_time=self.at(2), end_time=self.at(4),
+        )
+
+    def at(self, day):
+        return self.day + timedelta(days=day)
+
+    def names(self, start_day=None, end_day=None):
+        params = {}
+        if start_day is not None:
+            params['start'] = self.at(start_day).isoformat()
+        if end_day is not None:
+            params['end'] = self.at(end_day).isoformat()
+        response = self.client.get(reverse('car-list'), params)
+        if response.status_code != 200:
+            return response.status_code
+        return sorted(car['name'] for car in response.data['results'])
+
+    def test_overlapping_window_hides_car(self):
+        self.assertEqual(self.names(3, 5), ['Free'])
+        self.assertEqual(self.names(1, 6), ['Free'])
+        self.assertEqual(self.names(), ['Busy', 'Free'])
+
+    def test_touching_boundaries(self):
+        self.assertEqual(self.names(4, 5), ['Busy', 'Free'])
+        self.assertEqual(self.names(1, 2), ['Busy', 'Free'])
+
+    def test_canceled_and_deleted_do_not_block(self):
+        self.booking.status = 'canceled'
+        self.booking.save()
+        Booking.objects.create(
+            user=self.user, car=self.busy,
+            start_time=self.at(2), end_time=self.at(4), is_active=False,
+        )
+        self.assertEqual(self.names(3, 5), ['Busy', 'Free'])
+
+    def test_bounds_are_validated(self):
+        self.assertEqual(self.names(start_day=3), 400)
+        self.assertEqual(self.names(end_day=3), 400)
+        self.assertEqual(self.names(3, 3), 400)
+        response = self.client.get(reverse('car-list'), {'start': self.at(3).isoformat()})
+        self.assertEqual(response.data, {'window': ['Параметры start и end передаются вместе']})
+
+
+# =========================================================
+# Cursor-пагинация и потоковая выгрузка списков
+# =========================================================
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        # одинаковые цены — ключ порядка не уникален без id
+        for i, price in enumerate([100, 100, 300, 100, 200, 200, 100]):
+            Car.objects.create(
+                name=f'Car {i}', photo='cars/test.png', year=2020,
+                car_type='suv', price_per_day=price
+            )
+
+    def walk(self, params):
+        pages = []
+        response = self.client.get(reverse('car-list'), {'page_size': 2, **params})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            pages.append([car['id'] for car in response.data['results']])
+            if not response.data['next']:
+                return pages
+            response = self.client.get(response.data['next'])
+
+    def test_ordering_by_non_unique_field(self):
+        expected = list(Car.objects.order_by('price_per_day', 'id').values_list('id', flat=True))
+        pages = self.walk({'ordering': 'price_per_day'})
+        self.assertEqual(sum(pages, []), expected)
+        self.assertTrue(all(len(page) == 2 for page in pages[:-1]))
+
+        expected = list(Car.objects.order_by('-price_per_day', '-id').values_list('id', flat=True))
+        self.assertEqual(sum(self.walk({'ordering': '-price_per_day'}), []), expected)
+
+    def test_previous_link(self):
+        response = self.client.get(reverse('car-list'), {'page_size': 3, 'ordering': 'price_per_day'})
+        first = [car['id'] for car in response.data['results']]
+        response = self.client.get(response.data['next'])
+        response = self.client.get(response.data['previous'])
+        self.assertEqual([car['id'] for car in response.data['results']], first)
+
+    def test_cursor_query_uses_keyset(self):
+        response = self.client.get(reverse('car-list'), {'page_size': 2, 'ordering': 'price_per_day'})
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(response.data['next'])
+        sql = queries.captured_queries[-1]['sql']
+        self.assertIn('"cars_car"."id" >', sql)
+        self.assertNotIn('OFFSET', sql)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('car-list'), {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_tampered_cursor(self):
+        # значения позиции не того типа — 404, а не ValidationError ORM
+        for position in (['abc', '1'], ['100', 'x'], [['100'], '1'], [None, '1']):
+            # так же, как CursorPagination.encode_cursor
+            cursor = b64encode(urlencode({'p': json.dumps(position)}).encode()).decode()
+            response = self.client.get(reverse('car-list'), {'ordering': 'price_per_day', 'cursor': cursor})
+            self.assertEqual(response.status_code, 404, position)
+
+    def test_stream_json_and_ndjson(self):
+        expected = list(Car.objects.order_by('name', 'id').values_list('id', flat=True))
+
+        response = self.client.get(reverse('car-list'), {'stream': 'json'})
+        self.assertEqual(response['Content-Type'], 'application/json')
+        rows = json.loads(b''.join(response.streaming_content))
+        self.assertEqual([row['id'] for row in rows], expected)
+
+        response = self.client.get(reverse('car-list'), {'stream': 'ndjson'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines], expected)
+
+    def test_stream_empty(self):
+        Car.objects.all().delete()
+        response = self.client.get(reverse('car-list'), {'stream': 'json'})
+        self.assertEqual(json.loads(b''.join(response.streaming_content)), [])
+
+
+# =========================================================
+# Кэш каталога, ETag и 304 (cars.cache)
+# =========================================================
+class CatalogueCacheTests(TestCase):
+    def setUp(self):
+        cache.get_cache().clear()
+        self.client = APIClient()
+        self.car = Car.objects.create(
+            name='Car', photo='cars/test.png', year=2020,
+            car_type='suv', price_per_day=100
+        )
+
+    def get(self, **headers):
+        return self.client.get(reverse('car-list'), **headers)
+
+    def test_hit_and_miss(self):
+        with self.assertNumQueries(1):
+            first = self.get()
+        with self.assertNumQueries(0):
+            second = self.get()
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+        # другие параметры — другой ключ
+        with self.assertNumQueries(1):
+            self.client.get(reverse('car-list'), {'car_type': 'suv'})
+
+    def test_change_invalidates(self):
+        first = self.get()
+        self.car.name = 'Renamed'
+        self.car.save()
+        second = self.get()
+        self.assertEqual(second.data['results'][0]['name'], 'Renamed')
+        self.assertNotEqual(second['ETag'], first['ETag'])
+
+    def test_if_none_match(self):
+        etag = self.get()['ETag']
+        with self.assertNumQueries(0):
+            response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        self.car.save()
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_changes_within_one_second(self):
+        # два изменения в одну секунду: Last-Modified совпадает,
+        # но If-Modified-Since не даёт устаревший 304
+        with mock.patch('cars.cache.time.time', return_value=1_700_000_000.2):
+            first = self.get()
+            self.car.save()
+            response = self.get(
+                HTTP_IF_MODIFIED_SINCE=first['Last-Modified'],
+                HTTP_IF_NONE_MATCH=first['ETag'],
+            )
+            self.assertEqual(response.status_code, 200)
+            response = self.get(HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Last-Modified'], 'Tue, 14 Nov 2023 22:13:21 GMT')
+
+    def test_bump_is_atomic_increment(self):
+        version, _ = cache.catalogue_version()
+        with mock.patch('cars.cache.time.time', return_value=0):
+            cache.bump_catalogue_version()
+            cache.bump_catalogue_version()
+        self.assertEqual(cache.catalogue_version()[0], version + 2)
+
+
+# =========================================================
+# Число SQL-запросов на списках не зависит от размера страницы
+# =========================================================
+class ListQueryCountTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create(username='staff', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def create_bookings(self, count):
+        now = timezone.now()
+        for i in range(count):
+            user = User.objects.create(username=f'user{Booking.objects.count()}')
+            car = Car.objects.create(
+                name=f'Car {i}', photo='cars/test.png', year=2020,
+                car_type='suv', price_per_day=100
+            )
+            Booking.objects.create(
+                user=user, car=car,
+                start_time=now + timedelta(days=i + 1),
+                end_time=now + timedelta(days=i + 2),
+            )
+
+    def assert_constant_queries(self, url, expected):
+        self.create_bookings(2)
+        with self.assertNumQueries(expected):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        self.create_bookings(10)
+        with self.assertNumQueries(expected):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_booking_list(self):
+        self.assert_constant_queries(reverse('booking-list-create'), 1)
+
+    def test_booking_history(self):
+        self.assert_constant_queries(reverse('booking-history'), 1)
+
+    def test_booking_history_stream(self):
+        url = reverse('booking-history') + '?stream=ndjson'
+        self.create_bookings(12)
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+            b''.join(response.streaming_content)
+
+    def test_car_list(self):
+        self.assert_constant_queries(reverse('car-list'), 1)
+
+
+# =========================================================
+# Материализованная статистика совпадает с полным пересчётом
+# =========================================================
+class BookingStatsTests(TestCase):
+    def snapshot(self):
+        return list(
+            CarBookingStats.objects.filter(bookings_count__gt=0)
+            .order_by('car_id')
+            .values_list('car_id', 'bookings_count', 'total_revenue', 'total_rental_duration')
+        )
+
+    def daily(self):
+        return list(
+            CarDailyBookingStats.objects.filter(bookings_count__gt=0)
+            .order_by('car_id', 'day')
+            .values_list('car_id', 'day', 'bookings_count', 'total_revenue', 'total_rental_duration')
+        )
+
+    def test_incremental_matches_rebuild(self):
+        user = User.objects.create(username='u')
+        car = Car.objects.create(
+            name='Car', photo='cars/test.png', year=2020,
+            car_type='suv', price_per_day=100
+        )
+        now = timezone.now()
+        first = Booking.objects.create(
+            user=user, car=car, total_price=100,
+            start_time=now + timedelta(days=1), end_time=now + timedelta(days=2),
+        )
+        second = Booking.objects.create(
+            user=user, car=car, total_price=300,
+            start_time=now + timedelta(days=5), end_time=now + timedelta(days=8),
+        )
+        second.end_time += timedelta(days=1)
+        second.total_price = 400
+        second.save()
+        # перенос на другой день: минус в старом дне, плюс в новом
+        third = Booking.objects.create(
+            user=user, car=car, total_price=50,
+            start_time=now + timedelta(days=10), end_time=now + timedelta(days=11),
+        )
+        third.start_time += timedelta(days=1)
+        third.end_time += timedelta(days=1)
+        third.save()
+        first.is_active = False
+        first.status = 'canceled'
+        first.save(update_fields=['is_active', 'status'])
+
+        incremental, daily = self.snapshot(), self.daily()
+        stats.rebuild()
+        self.assertEqual(incremental, self.snapshot())
+        self.assertEqual(daily, self.daily())
+        self.assertEqual(incremental[0][1:3], (2, 450))
+
+    def test_booking_create_query_count(self):
+        # SELECT машины, проверка пересечений, BEGIN, INSERT брони,
+        # upsert двух таблиц статистики, брони и upsert месяца
+        # календаря, INSERT события, COMMIT
+        user = User.objects.create(username='u')
+        car = Car.objects.create(
+            name='Car', photo='cars/test.png', year=2020,
+            car_type='suv', price_per_day=100
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+        start = timezone.now().replace(microsecond=0) + timedelta(days=1)
+        for day in (0, 3):
+            with self.assertNumQueries(10):
+                response = client.post(reverse('booking-list-create'), {
+                    'car_id': car.pk,
+                    'start_time': (start + timedelta(days=day)).isoformat(),
+                    'end_time': (start + timedelta(days=day + 1)).isoformat(),
+                }, format='json')
+            self.assertEqual(response.status_code, 201)
+
+
+# =========================================================
+# Пакетное создание броней
+# =========================================================
+class BookingBulkCreateTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='partner')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.car = Car.objects.create(
+            name='Car', photo='cars/test.png', year=2020,
+            car_type='suv', price_per_day=100
+        )
+        self.other = Car.objects.create(
+            name='Other', photo='cars/test.png', year=2020,
+            car_type='suv', price_per_day=50
+        )
+        self.day = timezone.now().replace(microsecond=0) + timedelta(days=1)
+
+    def item(self, car, start_day, days, **extra):
+        start = self.day + timedelta(days=start_day)
+        return {
+            'car_id': car.pk,
+            'start_time': start.isoformat(),
+            'end_time': (start + timedelta(days=days)).isoformat(),
+            **extra,
+        }
+
+    def test_creates_batch_with_prices(self):
+        items = [
+            self.item(self.car, 0, 2),
+            self.item(self.car, 2, 1, with_driver=True),
+            self.item(self.other, 0, 3),
+        ]
+        response = self.client.post(reverse('booking-bulk-create'), items, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            [b['total_price'] for b in response.data],
+            ['200.00', '120.00', '150.00']
+        )
+        self.assertEqual(Booking.objects.count(), 3)
+        self.assertEqual(CarBookingStats.objects.get(car=self.car).bookings_count, 2)
+
+    def test_reports_errors_per_item(self):
+        Booking.objects.create(
+            user=self.user, car=self.other,
+            start_time=self.day, end_time=self.day + timedelta(days=1),
+        )
+        items = [
+            self.item(self.car, 0, 2),
+            self.item(self.car, 1, 2),
+            self.item(self.other, 0, 1),
+            {'car_id': 999, 'start_time': self.day.isoformat(), 'end_time': self.day.isoformat()},
+        ]
+        response = self.client.post(reverse('booking-bulk-create'), items, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(response.data), 4)
+        self.assertIn('non_field_errors', response.data[0])
+        self.assertIn('non_field_errors', response.data[1])
+        self.assertIn('non_field_errors', response.data[2])
+        self.assertIn('non_field_errors', response.data[3])
+        self.assertEqual(Booking.objects.count(), 1)
+
+
+# =========================================================
+# Календарь занятости
+# =========================================================
+class CarCalendarTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='u')
+        self.car = Car.objects.create(
+            name='Car', photo='cars/test.png', year=2020,
+            car_type='suv', price_per_day=100
+        )
+        tz = timezone.get_current_timezone()
+        self.month_start = datetime(2030, 1, 1, tzinfo=tz)
+
+    def at(self, day, hour=0):
+        return self.month_start + timedelta(days=day - 1, hours=hour)
+
+    def snapshot(self):
+        return list(
+            CarAvailabilityMonth.objects.order_by('car_id', 'month')
+            .values_list('car_id', 'month', 'busy_hours')
+        )
+
+    def test_incremental_matches_rebuild(self):
+        first = Booking.objects.create(
+            user=self.user, car=self.car,
+            start_time=self.at(2, 10), end_time=self.at(3, 12),
+        )
+        Booking.objects.create(
+            user=self.user, car=self.car,
+            start_time=self.at(30, 0), end_time=self.at(33, 0),
+        )
+        first.end_time = self.at(4, 0)
+        first.save()
+        first.is_active = False
+        first.status = 'canceled'
+        first.save(update_fields=['is_active', 'status'])
+
+        incremental = self.snapshot()
+        calendar.rebuild()
+        self.assertEqual(
+            [(car, month, bytes(bits)) for car, month, bits in incremental],
+            [(car, month, bytes(bits)) for car, month, bits in self.snapshot()],
+        )
+        self.assertEqual([row[1].month for row in incremental], [1, 2])
+
+    def test_endpoint_reports_day_status(self):
+        Booking.objects.create(
+            user=self.user, car=self.car,
+            start_time=self.at(5, 10), end_time=self.at(6, 12) + timedelta(minutes=30),
+        )
+        response = APIClient().get(
+            reverse('car-calendar', args=[self.car.pk]),
+            {'month': '2030-01', 'granularity': 'hour'}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        days = response.data['days']
+        self.assertEqual(len(days), 31)
+        self.assertEqual(days[3]['status'], 'free')
+        self.assertEqual(days[4]['status'], 'partial')
+        self.assertEqual(days[4]['hours'], '0' * 10 + '1' * 14)
+        self.assertEqual(days[5]['busy_hours'], 13)
+
+
+# =========================================================
+# Журнал событий броней
+# =========================================================
+@override_settings(BOOKING_EVENTS_LAG=0)
+class BookingEventTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='u')
+        self.car = Car.objects.create(
+            name='Car', photo='cars/test.png', year=2020,
+            car_type='suv', price_per_day=100
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def feed(self, since=0):
+        return self.client.get(reverse('booking-events'), {'since': since}).data
+
+    def test_lifecycle_is_recorded_in_order(self):
+        start = timezone.now() + timedelta(hours=1)
+        response = self.client.post(reverse('booking-list-create'), {
+            'car_id': self.car.pk,
+            'start_time': start.isoformat(),
+            'end_time': (start + timedelta(days=2)).isoformat(),
+        }, format='json')
+        booking_id = response.data['id']
+
+        first = self.feed()
+        self.assertEqual([e['event_type'] for e in first['results']], ['created'])
+        self.assertEqual(first['results'][0]['total_price'], '200.00')
+
+        scheduler.advance_bookings(start + timedelta(minutes=1))
+        self.client.delete(reverse('booking-detail', args=[booking_id]))
+
+        delta = self.feed(first['next_since'])
+        self.assertEqual(
+            [(e['event_type'], e['previous_status'], e['status']) for e in delta['results']],
+            [('status_changed', 'pending', 'active'), ('deleted', 'active', 'canceled')]
+        )
+        self.assertEqual(self.feed(delta['next_since'])['results'], [])
+
+    def test_other_users_events_are_hidden(self):
+        other = User.objects.create(username='other')
+        now = timezone.now()
+        Booking.objects.create(
+            user=other, car=self.car,
+            start_time=now + timedelta(days=1), end_time=now + timedelta(days=2),
+        )
+        self.assertEqual(self.feed()['results'], [])
+
+    def test_late_commit_below_cursor_is_not_skipped(self):
+        # id 3 закоммичена, id 2 выдана раньше, но коммитится позже
+        now = timezone.now()
+        start = now + timedelta(days=1)
+
+        def event(pk, created_at):
+            booking = Booking(pk=pk, user=self.user, car=self.car, start_time=start, end_time=start, total_price=0)
+            item = events.make_event(pk, 'created', events.state_of(booking))
+            item.pk = pk
+            item.save()
+            BookingEvent.objects.filter(pk=pk).update(created_at=created_at)
+
+        event(1, now - timedelta(minutes=1))
+        event(3, now)
+
+        lag = timedelta(seconds=5)
+        served = list(events.feed(self.user, 0, lag=lag))
+        self.assertEqual([e.pk for e in served], [1])
+
+        event(2, now)
+        with mock.patch('cars.events.timezone.now', return_value=now + lag):
+            served = list(events.feed(self.user, served[-1].pk, lag=lag))
+        self.assertEqual([e.pk for e in served], [2, 3])
+
+        with override_settings(BOOKING_EVENTS_LAG=5):
+            self.assertEqual(self.feed()['results'][-1]['id'], 1)
+
+
+# =========================================================
+# Движок цен
+# =========================================================
+@override_settings(CAR_PRICING={
+    'driver_multiplier': '1.2',
+    'weekend_multiplier': '1.5',
+    'seasons': [{'start': '12-30', 'end': '01-02', 'multiplier': '2'}],
+    'long_rental_discounts': [[7, '0.10']],
+})
+class PricingTests(TestCase):
+    def setUp(self):
+        self.car = Car(name='Car', price_per_day=Decimal('100'))
+        tz = timezone.get_current_timezone()
+        # 2030-01-07 — понедельник
+        self.monday = datetime(2030, 1, 7, 10, tzinfo=tz)
+
+    def price(self, start, hours, with_driver=False):
+        return pricing.price_many([(self.car, start, start + timedelta(hours=hours), with_driver)])[0]
+
+    def test_rules(self):
+        # неполные сутки считаются целыми, как в rental_days сериализатора
+        self.assertEqual(self.price(self.monday, 25), Decimal('200.00'))
+        # пятница, суббота, воскресенье
+        self.assertEqual(self.price(self.monday + timedelta(days=4), 72), Decimal('400.00'))
+        self.assertEqual(self.price(self.monday, 24, with_driver=True), Decimal('120.00'))
+        # 7 суток: 5 будних + 2 выходных, скидка 10%
+        self.assertEqual(self.price(self.monday, 24 * 7), Decimal('720.00'))
+        # сезон через Новый год: 31.12 и 01.01 (будни)
+        self.assertEqual(self.price(self.monday - timedelta(days=7), 48), Decimal('400.00'))
+
+    def test_batch_matches_reference(self):
+        engine = pricing.get_engine()
+        items = [
+            (self.car, self.monday + timedelta(hours=13 * i), self.monday + timedelta(hours=13 * i + 5 * i + 1), i % 2 == 0)
+            for i in range(200)
+        ]
+        self.assertEqual(engine.price_many(items), [engine.price_one(*item) for item in items])
+
+
+# =========================================================
+# Котировки
+# =========================================================
+@override_settings(CACHES=SHARED_CACHES, CAR_CATALOGUE_CACHE='shared')
+class CarQuoteTests(TestCase):
+    def setUp(self):
+        quotes.quote_cache.clear()
+        caches['shared'].clear()
+        self.user = User.objects.create(username='u')
+        self.car = Car.objects.create(
+            name='Car', photo='cars/test.png', year=2020,
+            car_type='suv', price_per_day=100
+        )
+        self.start = timezone.now().replace(microsecond=0) + timedelta(days=1)
+        self.params = {
+            'start_time': self.start.isoformat(),
+            'end_time': (self.start + timedelta(hours=30)).isoformat(),
+            'with_driver': 'true',
+        }
+
+    def get_quote(self):
+        return APIClient().get(reverse('car-quote', args=[self.car.pk]), self.params)
+
+    def test_quote_is_memoized_until_car_bookings_change(self):
+        first = self.get_quote()
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.data['rental_days'], 2)
+        self.assertEqual(first.data['total_price'], '240.00')
+        self.assertTrue(first.data['available'])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_quote().data, first.data)
+
+        Booking.objects.create(
+            user=self.user, car=self.car,
+            start_time=self.start, end_time=self.start + timedelta(hours=2),
+        )
+        self.assertFalse(self.get_quote().data['available'])
+        # котировка ничего не пишет
+        self.assertEqual(Booking.objects.count(), 1)
+
+    @override_settings(CAR_CATALOGUE_CACHE='default')
+    def test_no_memoization_without_shared_cache(self):
+        # сброс поколения в памяти процесса не увидят другие воркеры
+        self.get_quote()
+        with self.assertNumQueries(2):
+            self.assertTrue(self.get_quote().data['available'])
+        quotes.bump_car_generation(self.car.pk)
+        self.assertIsNone(quotes.car_generation(self.car.pk))
+
+    def test_invalid_window(self):
+        self.params['end_time'] = self.params['start_time']
+        self.assertEqual(self.get_quote().status_code, 400)
+
+
+# =========================================================
+# Поиск
+# =========================================================
+class SearchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='u')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.camry = Car.objects.create(
+            name='Toyota Camry', photo='cars/test.png', year=2020,
+            car_type='premium', price_per_day=100
+        )
+        Car.objects.create(
+            name='Tesla Model 3', photo='cars/test.png', year=2022,
+            car_type='electric', price_per_day=150
+        )
+        owner = User.objects.create(username='owner')
+        self.user_car = UserCar.objects.create(
+            user=owner, car_name='Toyota Prado', year=2019, car_type='suv',
+            price_per_day=80, location='Душанбе'
+        )
+
+    def search(self, q, **params):
+        return self.client.get(reverse('search'), {'q': q, **params}).data
+
+    def test_prefix_search_across_catalogues(self):
+        results = self.search('toyo')
+        self.assertEqual(
+            sorted((r['kind'], r['id']) for r in results),
+            [('car', self.camry.pk), ('user_car', self.user_car.pk)]
+        )
+        self.assertEqual([r['id'] for r in self.search('душ', kind='user_car')], [self.user_car.pk])
+        self.assertEqual(self.search('toyota camry')[0]['id'], self.camry.pk)
+
+    def test_index_follows_changes(self):
+        self.camry.name = 'Lexus ES'
+        self.camry.save()
+        self.assertEqual([r['name'] for r in self.search('lex')], ['Lexus ES'])
+        self.camry.delete()
+        self.assertEqual(self.search('lex'), [])
+
+    def test_list_search_filters(self):
+        response = self.client.get(reverse('car-list'), {'search': 'tes'})
+        self.assertEqual([c['name'] for c in response.data['results']], ['Tesla Model 3'])
+
+        response = self.client.get(reverse('available-cars'), {'search': 'душанбе'})
+        self.assertEqual([c['id'] for c in response.data['results']], [self.user_car.pk])
+
+    def test_list_search_matches_substring(self):
+        # как прежний SearchFilter по name: часть слова в середине
+        response = self.client.get(reverse('car-list'), {'search': 'amry'})
+        self.assertEqual([c['name'] for c in response.data['results']], ['Toyota Camry'])
+
+        response = self.client.get(reverse('available-cars'), {'search': 'rad'})
+        self.assertEqual([c['id'] for c in response.data['results']], [self.user_car.pk])
+
+        response = self.client.get(reverse('car-list'), {'search': 'odel amr'})
+        self.assertEqual(response.data['results'], [])
+
+        # индекс подстрок тоже следует за переименованием
+        self.camry.name = 'Lexus ES350'
+        self.camry.save()
+        response = self.client.get(reverse('car-list'), {'search': 's35'})
+        self.assertEqual([c['id'] for c in response.data['results']], [self.camry.pk])
+        response = self.client.get(reverse('car-list'), {'search': 'amry'})
+        self.assertEqual(response.data['results'], [])
+
+
+# =========================================================
+# Асинхронные эндпоинты (cars.async_views)
+# =========================================================
+@override_settings(BOOKING_EVENTS_LAG=0)
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='renter')
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+        self.car = Car.objects.create(
+            name='Camry', photo='cars/test.png', year=2020,
+            car_type='suv', price_per_day=100
+        )
+        Car.objects.create(
+            name='Audi', photo='cars/test.png', year=2021,
+            car_type='premium', price_per_day=300
+        )
+        start = timezone.now().replace(microsecond=0) + timedelta(days=1)
+        self.booking = Booking.objects.create(
+            user=self.user, car=self.car,
+            start_time=start, end_time=start + timedelta(days=1),
+        )
+
+    def auth(self):
+        return {'HTTP_AUTHORIZATION': f'Bearer {self.token}'}
+
+    def test_car_list(self):
+        response = self.client.get(reverse('async-car-list'))
+        self.assertEqual([car['name'] for car in response.json()['results']], ['Audi', 'Camry'])
+
+        response = self.client.get(reverse('async-car-list'), {'ordering': '-price_per_day', 'limit': 1})
+        self.assertEqual([car['name'] for car in response.json()['results']], ['Audi'])
+
+        window = {
+            'start': self.booking.start_time.isoformat(),
+            'end': self.booking.end_time.isoformat(),
+        }
+        response = self.client.get(reverse('async-car-list'), window)
+        self.assertEqual([car['name'] for car in response.json()['results']], ['Audi'])
+
+        response = self.client.get(reverse('async-car-list'), {'start': window['start']})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'window': ['Параметры start и end передаются вместе']})
+
+    def test_car_detail_hides_busy_from_anonymous(self):
+        url = reverse('async-car-detail', args=[self.car.pk])
+        data = self.client.get(url).json()
+        self.assertEqual(data['name'], 'Camry')
+        self.assertNotIn('busy', data)
+
+        data = self.client.get(url, **self.auth()).json()
+        self.assertEqual(len(data['busy']), 1)
+
+        response = self.client.get(reverse('async-car-detail', args=[0]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_booking_list(self):
+        self.assertEqual(self.client.get(reverse('async-booking-list')).status_code, 401)
+        response = self.client.get(reverse('async-booking-list'), **self.auth())
+        self.assertEqual([row['id'] for row in response.json()['results']], [self.booking.pk])
+
+    def test_only_safe_methods(self):
+        for name, args in (
+            ('async-car-list', []), ('async-car-detail', [self.car.pk]),
+            ('async-booking-list', []), ('async-booking-events', []),
+        ):
+            response = self.client.post(reverse(name, args=args), **self.auth())
+            self.assertEqual(response.status_code, 405)
+        self.assertEqual(self.client.head(reverse('async-car-list')).status_code, 200)
+
+    async def test_event_stream(self):
+        response = await self.async_client.get(
+            reverse('async-booking-events'), headers={'Authorization': f'Bearer {self.token}'}
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        chunk = await anext(stream)
+        chunk = chunk.decode() if isinstance(chunk, bytes) else chunk
+        self.assertTrue(chunk.startswith('id: '))
+        self.assertIn('event: created', chunk)
+        await stream.aclose()
+
+
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        registry.clear()
+        Car.objects.create(
+            name='Toyota Camry', photo='cars/test.png', year=2020,
+            car_type='premium', price_per_day=100
+        )
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('car-list'))
+        timing = response['Server-Timing']
+        self.assertIn('app;dur=', timing)
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+        self.assertIn('serialize;dur=', timing)
+        self.assertIn('render;dur=', timing)
+
+    def test_server_timing_serialize_for_detail(self):
+        # FastCarSerializer — BaseSerializer, а не Serializer
+        # имя car-detail есть и в user_cars — путь напрямую
+        car = Car.objects.get()
+        response = self.client.get(f'/cars/cars/{car.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('serialize;dur=', response['Server-Timing'])
+
+    def test_metrics_endpoint_is_staff_only(self):
+        self.client.get(reverse('car-list'))
+        api = APIClient()
+        api.force_authenticate(User.objects.create(username='user'))
+        self.assertEqual(api.get(reverse('metrics')).status_code, 403)
+
+        api.force_authenticate(User.objects.create(username='admin', is_staff=True))
+        body = api.get(reverse('metrics')).content.decode()
+        self.assertIn(
+            'http_request_duration_seconds_count{view="car-list",route="cars/cars/",method="GET"} 1',
+            body
+        )
+        self.assertIn('http_request_span_duration_seconds_count{view="car-list",route="cars/cars/",method="GET",span="serialize"} 1', body)
+        self.assertIn('http_response_size_bytes_bucket{view="car-list"', body)
+
+
+# =========================================================
+# Производные фото (cars.images)
+# =========================================================
+class CarPhotoVariantTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        override = override_settings(MEDIA_ROOT=media.name, MEDIA_URL='/media/')
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def upload(self, name, size):
+        buffer = BytesIO()
+        Image.new('RGB', size, 'red').save(buffer, 'PNG')
+        return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+    def car(self, photo='cars/test.png', **extra):
+        return Car.objects.create(
+            name='Car', photo=photo, year=2020,
+            car_type='suv', price_per_day=100, **extra
+        )
+
+    def test_render_variants(self):
+        name = self.upload('cars/big.png', (2000, 1000))
+        sizes = images.render_variants(name)
+        self.assertEqual(set(sizes), set(images.VARIANT_WIDTHS))
+        for size, width in images.VARIANT_WIDTHS.items():
+            self.assertIn('webp', sizes[size])
+            with default_storage.open(sizes[size]['webp']) as file:
+                self.assertEqual(Image.open(file).size, (width, width // 2))
+
+        # маленькие фото не увеличиваются
+        sizes = images.render_variants(self.upload('cars/small.png', (100, 50)))
+        with default_storage.open(sizes['large']['webp']) as file:
+            self.assertEqual(Image.open(file).size, (100, 50))
+
+    def test_build_variants(self):
+        car = self.car(photo=self.upload('cars/photo.png', (400, 200)))
+        self.assertTrue(images.needs_variants(car))
+        self.assertTrue(images.build_variants(car.pk))
+        car.refresh_from_db()
+        self.assertEqual(car.photo_variants['source'], car.photo.name)
+        self.assertFalse(images.needs_variants(car))
+        self.assertFalse(images.needs_variants(self.car(photo='')))
+
+    def test_failure_backs_off(self):
+        # файла нет — обработка падает
+        car = self.car(photo='cars/missing.png')
+        with self.assertLogs('cars.images', 'ERROR'):
+            self.assertFalse(images.build_variants(car.pk))
+        car.refresh_from_db()
+        failed = car.photo_variants['failed']
+        self.assertEqual((failed['source'], failed['attempts']), ('cars/missing.png', 1))
+        self.assertFalse(images.needs_variants(car))
+
+        # сохранение машины не ставит ту же задачу снова
+        with mock.patch('cars.signals.schedule_variants') as schedule:
+            car.save()
+        schedule.assert_not_called()
+
+        # пауза прошла — повтор, и следующая пауза длиннее
+        later = failed['retry_at'] + 1
+        with mock.patch('cars.images.time.time', return_value=later):
+            self.assertTrue(images.needs_variants(car))
+            with self.assertLogs('cars.images', 'ERROR'):
+                images.build_variants(car.pk)
+        car.refresh_from_db()
+        self.assertEqual(car.photo_variants['failed']['attempts'], 2)
+        self.assertEqual(car.photo_variants['failed']['retry_at'], later + 2 * images.RETRY_DELAY)
+
+        # новое фото — сразу в обработку
+        car.photo = 'cars/other.png'
+        self.assertTrue(images.needs_variants(car))
+
+    def test_variant_urls(self):
+        car = self.car(photo_variants={'source': 'cars/test.png', 'sizes': {
+            'thumb': {'webp': 'variants/cars/test_thumb.webp'},
+            'large': {'webp': 'variants/cars/a b.webp'},
+        }})
+        request = APIRequestFactory().get('/')
+        self.assertEqual(images.variant_urls(car, request), {
+            'thumb': {'webp': 'http://testserver/media/variants/cars/test_thumb.webp'},
+            'large': {'webp': 'http://testserver/media/variants/cars/a%20b.webp'},
+        })
+        self.assertEqual(images.variant_urls(self.car(), request), {})
+
+    def test_url_builder_matches_storage(self):
+        request = APIRequestFactory().get('/')
+        url = images.url_builder(request)
+        for name in ('cars/a.png', 'cars/a b.png', 'cars/../a.png', 'cars/./a.png', 'cars/ф.png'):
+            self.assertEqual(url(name), request.build_absolute_uri(default_storage.url(name)))
+        self.assertEqual(images.url_builder()('cars/a.png'), '/media/cars/a.png')
+
+
+# =========================================================
+# Быстрые сериализаторы: тот же JSON, что у обычных
+# =========================================================
+class FastSerializerTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='renter')
+        self.car = Car.objects.create(
+            name='Toyota Camry', photo='cars/test.png', year=2020,
+            car_type='premium', price_per_day=Decimal('99.5'),
+            photo_variants={'sizes': {'thumb': {'webp': 'cars/variants/1-thumb.webp'}}},
+        )
+        Car.objects.create(name='Без фото', photo='', year=2021, car_type='cargo', price_per_day=70)
+        start = timezone.now() + timedelta(days=1)
+        Booking.objects.create(
+            user=self.user, car=self.car, start_time=start,
+            end_time=start + timedelta(hours=30), total_price=Decimal('199.00'),
+        )
+        request = APIRequestFactory().get('/')
+        request.user = self.user
+        self.context = {'request': Request(request)}
+
+    def assertSameJSON(self, slow_class, fast_class, objects):
+        render = JSONRenderer().render
+        self.assertEqual(
+            render(fast_class(objects, many=True, context=self.context).data),
+            render(slow_class(objects, many=True, context=self.context).data),
+        )
+
+    def test_output_matches_drf(self):
+        self.assertSameJSON(CarSerializer, FastCarSerializer, list(Car.objects.all()))
+        bookings = list(BookingSerializer.setup_eager_loading(Booking.objects.all()))
+        self.assertSameJSON(BookingSerializer, FastBookingSerializer, bookings)
+
+    def test_views_use_fast_serializer_for_reads(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get(reverse('booking-history'))
+        self.assertEqual(response.data['results'][0]['price_per_day'], Decimal('99.50'))
+        self.assertEqual(response.data['results'][0]['rental_days'], 2)
+        cars = {c['name']: c for c in client.get(reverse('car-list')).data['results']}
+        self.assertIsNone(cars['Без фото']['photo'])
+        self.assertEqual(cars['Toyota Camry']['photo'], 'http://testserver/media/cars/test.png')
+
+
+# =========================================================
+# Рендеринг JSON и сжатие ответов
+# =========================================================
+class RenderingTests(TestCase):
+    def setUp(self):
+        for i in range(30):
+            Car.objects.create(
+                name=f'Toyota Camry {i}', photo='cars/test.png', year=2020,
+                car_type='premium', price_per_day=Decimal('99.50')
+            )
+
+    def test_renderer_matches_drf(self):
+        data = {
+            'price': Decimal('99.50'),
+            'utc': datetime(2026, 1, 2, 3, 4, 5, 123456, tzinfo=ZoneInfo('UTC')),
+            'london': datetime(2026, 1, 2, 3, 4, tzinfo=ZoneInfo('Europe/London')),
+            'dushanbe': datetime(2026, 1, 2, 3, 4, tzinfo=ZoneInfo('Asia/Dushanbe')),
+            'day': datetime(2026, 1, 2).date(),
+            'lazy': gettext_lazy('Не найдено.'),
+            'text': 'строка\u2028с разделителем',
+            7: [1, 2.5, None, True],
+        }
+        expected = JSONRenderer().render(data)
+        self.assertEqual(renderers.FastJSONRenderer().render(data), expected)
+        with override_settings(JSON_RENDERER_BACKEND='json'):
+            self.assertEqual(renderers.FastJSONRenderer().render(data), expected)
+
+    def test_renderer_floats_match_drf(self):
+        # orjson пишет 1e-05 как 0.00001, а 1e+16 как 1e16
+        data = {
+            'floats': [0.0, -0.0, 1e-4, 0.1, 38.5601, 123456789012345.67, 1e-05, 2e-9, 1e16, 1e300],
+            'nested': [{'lat': 1e-05, 'lon': 68.78}],
+            'decimal': Decimal('1E-7'),
+        }
+        self.assertEqual(renderers.FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(renderers.dumps({'lat': 1e-05}), b'{"lat":1e-05}')
+        self.assertEqual(renderers.dumps({'lat': 38.5601}), b'{"lat":38.5601}')
+
+        # strict-режим DRF: NaN и бесконечность — ошибка, а не null
+        for value in (float('nan'), float('inf'), float('-inf')):
+            with self.assertRaises(ValueError):
+                JSONRenderer().render({'lat': value})
+            with self.assertRaises(ValueError):
+                renderers.FastJSONRenderer().render({'results': [{'lat': value}]})
+
+    def test_renderer_form_errors(self):
+        # ErrorList — UserList поверх list: orjson сам видит пустой список
+        form = CarAvailabilityFilter({'start': '2026-01-01T00:00:00Z'}, queryset=Car.objects.all())
+        self.assertFalse(form.is_valid())
+        expected = JSONRenderer().render(form.errors)
+        self.assertEqual(expected, '{"window":["Параметры start и end передаются вместе"]}'.encode())
+        self.assertEqual(renderers.FastJSONRenderer().render(form.errors), expected)
+        self.assertEqual(renderers.dumps(form.errors), expected)
+
+    def test_gzip_above_threshold(self):
+        plain = self.client.get(reverse('car-list'))
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertIn('Accept-Encoding', plain['Vary'])
+
+        response = self.client.get(reverse('car-list'), HTTP_ACCEPT_ENCODING='gzip, br;q=0')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertEqual(int(response['Content-Length']), len(response.content))
+        # защита GZipMiddleware от BREACH: случайное имя файла в заголовке
+        self.assertTrue(response.content[3] & gzip.FNAME)
+
+    def test_small_responses_are_not_compressed(self):
+        # порог читается на каждый ответ, а не при создании middleware
+        response = self.client.get(reverse('car-list'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        with override_settings(COMPRESSION_MIN_SIZE=10 ** 6):
+            response = self.client.get(reverse('car-list'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertNotIn('Content-Encoding', response)
+        self.assertFalse(response.has_header('Vary') and 'Accept-Encoding' in response['Vary'])
+
+    def test_weak_etag_revalidates(self):
+        response = self.client.get(reverse('car-list'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertTrue(response['ETag'].startswith('W/"'))
+        response = self.client.get(
+            reverse('car-list'), HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
+
+
+# =========================================================
+# Чтение с реплик и read-your-writes (server.db_router)
+# =========================================================
+@override_settings(
+    DATABASE_REPLICAS=['replica1'], REPLICA_STICKY_SECONDS=5,
+    CACHES=SHARED_CACHES, REPLICA_STICKY_CACHE='shared',
+)
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        db_router.get_cache().clear()
+        self.router = db_router.PrimaryReplicaRouter()
+        self.user = User.objects.create(username='renter')
+        self.car = Car.objects.create(
+            name='Toyota Camry', photo='cars/test.png', year=2020,
+            car_type='premium', price_per_day=100
+        )
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def test_router(self):
+        self.assertEqual(self.router.db_for_read(Car), 'default')
+        with db_router.replica_reads():
+            self.assertEqual(self.router.db_for_read(Car), 'replica1')
+            self.assertEqual(self.router.db_for_read(UserCar), 'replica1')
+            # пользователи и токены — только primary
+            self.assertEqual(self.router.db_for_read(User), 'default')
+            self.assertEqual(self.router.db_for_write(Booking), 'default')
+            # после записи запрос дочитывает своё с primary
+            self.assertEqual(self.router.db_for_read(Car), 'default')
+        self.assertFalse(self.router.allow_migrate('replica1', 'cars'))
+
+    def test_write_pins_user_to_primary(self):
+        with mock.patch.object(db_router, 'replica_reads', return_value=mock.MagicMock()) as reads:
+            self.api.get(reverse('booking-history'))
+            self.assertEqual(reads.call_count, 1)
+
+            start = timezone.now() + timedelta(days=3)
+            response = self.api.post(reverse('booking-list-create'), {
+                'car_id': self.car.pk, 'start_time': start.isoformat(),
+                'end_time': (start + timedelta(hours=3)).isoformat(),
+            }, format='json')
+            self.assertEqual(response.status_code, 201)
+            self.assertTrue(db_router.is_pinned(self.user))
+
+            self.api.get(reverse('booking-history'))
+            self.assertEqual(reads.call_count, 1)
+
+            # у других пользователей — по-прежнему реплика
+            other = APIClient()
+            other.force_authenticate(User.objects.create(username='other'))
+            other.get(reverse('booking-history'))
+            self.assertEqual(reads.call_count, 2)
+
+    def test_replicas_require_shared_sticky_cache(self):
+        # pin() в памяти одного воркера — остальные его не увидят
+        with override_settings(REPLICA_STICKY_CACHE='default'):
+            with self.assertRaises(ImproperlyConfigured):
+                db_router.ReplicaStickinessMiddleware(lambda request: None)
+        with override_settings(REPLICA_STICKY_CACHE='default', DATABASE_REPLICAS=[]):
+            db_router.ReplicaStickinessMiddleware(lambda request: None)
@@ -1,11 +1,17 @@
 from django.urls import path
+from . import async_views
 from .views import (
     BookingListCreateAPIView,
+    BookingBulkCreateAPIView,
     BookingRetrieveUpdateDestroyAPIView,
     BookingHistoryListAPIView,
+    BookingEventListAPIView,
     CarListAPIView,
     CarRetrieveAPIView,
     CarBookingStatsAPIView,
+    CarCalendarAPIView,
+    CarQuoteAPIView,
+    SearchAPIView,
 )
 
 urlpatterns = [
@@ -13,17 +19,34 @@ urlpatterns = [
     # Бронирования
     # ==============================
     path('bookings/', BookingListCreateAPIView.as_view(), name='booking-list-create'),
+    path('bookings/bulk/', BookingBulkCreateAPIView.as_view(), name='booking-bulk-create'),
     path('bookings/<int:pk>/', BookingRetrieveUpdateDestroyAPIView.as_view(), name='booking-detail'),
     path('bookings/history/', BookingHistoryListAPIView.as_view(), name='booking-history'),
+    path('bookings/events/', BookingEventListAPIView.as_view(), name='booking-events'),
 
     # ==============================
     # Автомобили
     # ==============================
     path('cars/', CarListAPIView.as_view(), name='car-list'),
     path('cars/<int:pk>/', CarRetrieveAPIView.as_view(), name='car-detail'),
+    path('cars/<int:pk>/calendar/', CarCalendarAPIView.as_view(), name='car-calendar'),
+    path('cars/<int:pk>/quote/', CarQuoteAPIView.as_view(), name='car-quote'),
+
+    # ==============================
+    # Поиск по машинам компании и пользователей
+    # ==============================
+    path('search/', SearchAPIView.as_view(), name='search'),
 
     # ==============================
     # Статистика бронирований (только админ)
     # ==============================
     path('stats/cars/', CarBookingStatsAPIView.as_view(), name='car-booking-stats'),
+
+    # ==============================
+    # Асинхронные версии (ASGI)
+    # ==============================
+    path('async/cars/', async_views.car_list, name='async-car-list'),
+    path('async/cars/<int:pk>/', async_views.car_detail, name='async-car-detail'),
+    path('async/bookings/', async_views.booking_list, name='async-booking-list'),
+    path('async/bookings/events/', async_views.booking_event_stream, name='async-booking-events'),
 ]
@@ -3,11 +3,25 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.generics import RetrieveUpdateDestroyAPIView
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Count, Sum, F, ExpressionWrapper, DurationField
+from django.db.models import Sum, F, Q
+from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 
 from .models import Booking, Car
-from .serilaizer import BookingSerializer, CarSerializer
+from .serilaizer import BookingEventSerializer, BookingSerializer, CarSerializer, QuoteRequestSerializer
+from .filters import CarAvailabilityFilter
+from .pagination import BookingCursorPagination, CarCursorPagination
+from .streaming import StreamingListMixin
+from .mixins import EagerLoadingMixin, FastReadMixin, ReplicaReadMixin
+from .fast_serializers import FastBookingSerializer, FastCarSerializer
+from .bulk import create_bookings
+from .cache import CachedResponseMixin
+from .calendar import car_calendar, month_of
+from .events import feed
+from .quotes import quote
+from .search import FullTextSearchFilter, search
+from server.instrumentation import SerializeTimingMixin
 
 
 # =========================================================
@@ -18,26 +32,20 @@ class IsOwnerOrAdmin(permissions.BasePermission):
         return request.user.is_staff or obj.user == request.user
 
 
-# =========================================================
-# Обновление статусов (ТОЛЬКО активные брони)
-# =========================================================
-def update_expired_bookings():
-    Booking.objects.filter(
-        is_active=True,
-        status='active',
-        end_time__lt=timezone.now()
-    ).update(status='completed')
+# Статусы броней обновляет фоновый планировщик (cars.scheduler,
+# команда run_booking_scheduler), списки только читают.
 
 
 # =========================================================
 # ВСЕ бронирования (list + create)
 # =========================================================
-class BookingListCreateAPIView(generics.ListCreateAPIView):
+class BookingListCreateAPIView(ReplicaReadMixin, FastReadMixin, EagerLoadingMixin, StreamingListMixin, SerializeTimingMixin, generics.ListCreateAPIView):
     serializer_class = BookingSerializer
+    fast_serializer_class = FastBookingSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = BookingCursorPagination
 
     def get_queryset(self):
-        update_expired_bookings()
         user = self.request.user
 
         qs = Booking.objects.filter(is_active=True)
@@ -45,17 +53,46 @@ class BookingListCreateAPIView(generics.ListCreateAPIView):
         if not user.is_staff:
             qs = qs.filter(user=user)
 
-        return qs.order_by('-created_at')
+        return qs.order_by('-created_at', '-id')
 
     def perform_create(self, serializer):
         serializer.save()
 
 
+# =========================================================
+# Пакетное создание бронирований
+# =========================================================
+class BookingBulkCreateAPIView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    max_batch_size = 500
+
+    def post(self, request):
+        items = request.data
+        if not isinstance(items, list) or not items:
+            return Response(
+                {'detail': 'Ожидается непустой список бронирований'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(items) > self.max_batch_size:
+            return Response(
+                {'detail': f'Не больше {self.max_batch_size} бронирований за запрос'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        bookings, errors = create_bookings(request.user, items)
+        if not bookings:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = BookingSerializer(bookings, many=True, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
 # =========================================================
 # Одно бронирование (retrieve / update / soft delete)
 # =========================================================
-class BookingRetrieveUpdateDestroyAPIView(RetrieveUpdateDestroyAPIView):
+class BookingRetrieveUpdateDestroyAPIView(ReplicaReadMixin, FastReadMixin, EagerLoadingMixin, SerializeTimingMixin, RetrieveUpdateDestroyAPIView):
     serializer_class = BookingSerializer
+    fast_serializer_class = FastBookingSerializer
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrAdmin]
 
     def get_queryset(self):
@@ -85,12 +122,13 @@ class BookingRetrieveUpdateDestroyAPIView(RetrieveUpdateDestroyAPIView):
 # =========================================================
 # История бронирований
 # =========================================================
-class BookingHistoryListAPIView(generics.ListAPIView):
+class BookingHistoryListAPIView(ReplicaReadMixin, FastReadMixin, EagerLoadingMixin, StreamingListMixin, SerializeTimingMixin, generics.ListAPIView):
     serializer_class = BookingSerializer
+    fast_serializer_class = FastBookingSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = BookingCursorPagination
 
     def get_queryset(self):
-        update_expired_bookings()
         user = self.request.user
 
         # Игнорируем статус и soft delete
@@ -99,91 +137,246 @@ class BookingHistoryListAPIView(generics.ListAPIView):
         if not user.is_staff:
             qs = qs.filter(user=user)
 
-        return qs.order_by('-created_at')
+        return qs.order_by('-created_at', '-id')
 
 
 # =========================================================
 # Автомобили (list)
 # =========================================================
-class CarListAPIView(generics.ListAPIView):
+class CarListAPIView(ReplicaReadMixin, FastReadMixin, CachedResponseMixin, StreamingListMixin, SerializeTimingMixin, generics.ListAPIView):
     queryset = Car.objects.all()
     serializer_class = CarSerializer
+    fast_serializer_class = FastCarSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = CarCursorPagination
 
     filter_backends = [
         DjangoFilterBackend,
         filters.OrderingFilter,
-        filters.SearchFilter
+        FullTextSearchFilter
     ]
 
-    filterset_fields = {
-        'car_type': ['exact'],
-        'is_available': ['exact']
-    }
+    # car_type, is_available, min_price/max_price и окно start/end
+    filterset_class = CarAvailabilityFilter
 
     ordering_fields = ['price_per_day', 'year', 'name']
-    ordering = ['name']
-    search_fields = ['name']
+    ordering = ['name', 'id']
+    # ?search= идёт через полнотекстовый индекс (cars.search)
+    search_kind = 'car'
 
 
 # =========================================================
 # Автомобиль (detail)
 # =========================================================
-class CarRetrieveAPIView(generics.RetrieveAPIView):
+class CarRetrieveAPIView(ReplicaReadMixin, FastReadMixin, CachedResponseMixin, SerializeTimingMixin, generics.RetrieveAPIView):
     queryset = Car.objects.all()
     serializer_class = CarSerializer
+    fast_serializer_class = FastCarSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
 
 # =========================================================
 # Статистика бронирований по автомобилям
 # =========================================================
-class CarBookingStatsAPIView(APIView):
+def parse_day(value):
+    if not value:
+        return None
+    day = parse_date(value)
+    if day is None:
+        raise ValueError(value)
+    return day
+
+
+class CarBookingStatsAPIView(ReplicaReadMixin, APIView):
     permission_classes = [permissions.IsAdminUser]
 
+    # Читает материализованную статистику (cars.stats), а не агрегирует
+    # все брони. ?from=YYYY-MM-DD&to=YYYY-MM-DD — по дням начала брони.
     def get(self, request):
-        rental_duration_expr = ExpressionWrapper(
-            F('bookings__end_time') - F('bookings__start_time'),
-            output_field=DurationField()
-        )
+        try:
+            date_from = parse_day(request.query_params.get('from'))
+            date_to = parse_day(request.query_params.get('to'))
+        except ValueError:
+            return Response(
+                {'detail': 'Даты from/to должны быть в формате YYYY-MM-DD'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-        stats = Car.objects.annotate(
-            bookings_count=Count(
-                'bookings',
-                filter=F('bookings__is_active'),
-                distinct=True
-            ),
-            total_revenue=Sum(
-                'bookings__total_price',
-                filter=F('bookings__is_active')
-            ),
-            total_rental_duration=Sum(
-                rental_duration_expr,
-                filter=F('bookings__is_active')
+        if date_from is None and date_to is None:
+            stats = Car.objects.values(
+                'name',
+                bookings_count=F('booking_stats__bookings_count'),
+                total_revenue=F('booking_stats__total_revenue'),
+                total_rental_duration=F('booking_stats__total_rental_duration'),
+            )
+        else:
+            in_range = Q()
+            if date_from:
+                in_range &= Q(daily_booking_stats__day__gte=date_from)
+            if date_to:
+                in_range &= Q(daily_booking_stats__day__lte=date_to)
+
+            stats = Car.objects.annotate(
+                bookings_count=Sum('daily_booking_stats__bookings_count', filter=in_range),
+                total_revenue=Sum('daily_booking_stats__total_revenue', filter=in_range),
+                total_rental_duration=Sum('daily_booking_stats__total_rental_duration', filter=in_range),
+            ).values(
+                'name',
+                'bookings_count',
+                'total_revenue',
+                'total_rental_duration'
             )
-        ).values(
-            'name',
-            'bookings_count',
-            'total_revenue',
-            'total_rental_duration'
-        )
 
         result = []
 
         for car in stats:
+            count = car['bookings_count'] or 0
             duration = car['total_rental_duration']
             total_days = duration.total_seconds() / 86400 if duration else 0
 
-            avg_days = (
-                total_days / car['bookings_count']
-                if car['bookings_count'] else 0
-            )
+            avg_days = total_days / count if count else 0
 
             result.append({
                 'name': car['name'],
-                'bookings_count': car['bookings_count'],
+                'bookings_count': count,
                 'total_revenue': car['total_revenue'] or 0,
                 'avg_rental_days': round(avg_days, 2)
             })
 
         return Response(result)
+
+
+# =========================================================
+# Котировка: цена и доступность без создания брони
+# =========================================================
+class CarQuoteAPIView(APIView):
+    permission_classes = [permissions.AllowAny]
+
+    # ?start_time=...&end_time=...&with_driver=true
+    # Ничего не пишет; ответы кэшируются в cars.quotes.
+    def get(self, request, pk):
+        params = QuoteRequestSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+
+        result = quote(pk, **params.validated_data)
+        if result is None:
+            return Response({'detail': 'Не найдено.'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(result)
+
+
+# =========================================================
+# Поиск по обоим каталогам (машины компании и пользователей)
+# =========================================================
+SEARCH_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+
+
+class SearchAPIView(APIView):
+    permission_classes = [permissions.AllowAny]
+
+    # ?q=...&kind=car|user_car&limit=N — ранжированная выдача с
+    # префиксным совпадением, подходит для автодополнения.
+    # Машины пользователей видны только авторизованным.
+    def get(self, request):
+        kind = request.query_params.get('kind') or None
+        if kind not in (None, 'car', 'user_car'):
+            return Response(
+                {'detail': 'kind должен быть car или user_car'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not request.user.is_authenticated:
+            if kind == 'user_car':
+                return Response([])
+            kind = 'car'
+
+        try:
+            limit = int(request.query_params.get('limit', SEARCH_LIMIT))
+        except ValueError:
+            limit = SEARCH_LIMIT
+        limit = min(max(limit, 1), SEARCH_MAX_LIMIT)
+
+        return Response(search(request.query_params.get('q'), kind=kind, limit=limit))
+
+
+# =========================================================
+# Лента событий броней
+# =========================================================
+EVENTS_PAGE_SIZE = 100
+EVENTS_MAX_PAGE_SIZE = 1000
+
+
+class BookingEventListAPIView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    # ?since=<event_id>&limit=N — только события после курсора.
+    # Клиент сохраняет next_since и передаёт его в следующем запросе.
+    # Событие появляется в ленте через BOOKING_EVENTS_LAG после записи.
+    def get(self, request):
+        try:
+            since = int(request.query_params.get('since', 0))
+            limit = int(request.query_params.get('limit', EVENTS_PAGE_SIZE))
+        except ValueError:
+            return Response(
+                {'detail': 'since и limit должны быть числами'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        limit = min(max(limit, 1), EVENTS_MAX_PAGE_SIZE)
+
+        events = list(feed(request.user, since)[:limit])
+        return Response({
+            'results': BookingEventSerializer(events, many=True).data,
+            'next_since': events[-1].id if events else since,
+        })
+
+
+# =========================================================
+# Календарь занятости машины
+# =========================================================
+CALENDAR_MAX_MONTHS = 12
+
+
+def parse_month(value):
+    if not value:
+        return month_of(timezone.now())
+    day = parse_date(f'{value}-01')
+    if day is None:
+        raise ValueError(value)
+    return day
+
+
+class CarCalendarAPIView(APIView):
+    permission_classes = [permissions.AllowAny]
+
+    # ?month=YYYY-MM&months=N&granularity=day|hour
+    # Читает готовые битовые карты (cars.calendar), а не брони.
+    def get(self, request, pk):
+        car = get_object_or_404(Car.objects.only('id'), pk=pk)
+
+        try:
+            month = parse_month(request.query_params.get('month'))
+            months = int(request.query_params.get('months', 1))
+        except ValueError:
+            return Response(
+                {'detail': 'month должен быть в формате YYYY-MM, months — числом'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not 1 <= months <= CALENDAR_MAX_MONTHS:
+            return Response(
+                {'detail': f'months должен быть от 1 до {CALENDAR_MAX_MONTHS}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        granularity = request.query_params.get('granularity', 'day')
+        if granularity not in ('day', 'hour'):
+            return Response(
+                {'detail': 'granularity должен быть day или hour'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response({
+            'car': car.id,
+            'month': f'{month:%Y-%m}',
+            'months': months,
+            'granularity': granularity,
+            'days': car_calendar(car.id, month, months, hours=granularity == 'hour'),
+        })
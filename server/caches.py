@@ -0,0 +1,11 @@
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+# =========================================================
+# Общий ли кэш для всех воркеров
+# =========================================================
+# LocMemCache живёт в памяти одного процесса, DummyCache ничего не
+# хранит: метку, записанную одним воркером, другие не увидят.
+def is_shared(cache):
+    return not isinstance(cache, (LocMemCache, DummyCache))
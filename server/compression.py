@@ -0,0 +1,164 @@
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+from .instrumentation import span
+
+try:
+    import brotli
+except ImportError:  # brotli — необязательная зависимость, без неё только gzip
+    brotli = None
+
+# что имеет смысл сжимать; картинки и архивы уже сжаты, а
+# text/event-stream сжатие задержало бы в буфере
+COMPRESSIBLE_TYPES = (
+    'application/json', 'application/x-ndjson', 'application/javascript',
+    'application/xml', 'image/svg+xml', 'text/html', 'text/css', 'text/plain',
+    'text/javascript', 'text/xml', 'text/csv',
+)
+
+
+# =========================================================
+# Выбор кодировки по Accept-Encoding
+# =========================================================
+def parse_accept_encoding(header):
+    # {'gzip': 1.0, 'br': 0.5, '*': 0.0}
+    weights = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[coding] = q
+    return weights
+
+
+def negotiate(header):
+    # 'br', 'gzip' или None; при равном q — br, он плотнее
+    if not header:
+        return None
+    weights = parse_accept_encoding(header)
+    available = ('br', 'gzip') if brotli is not None else ('gzip',)
+    best, best_q = None, 0.0
+    for coding in available:
+        q = weights.get(coding, weights.get('*', 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def is_compressible(content_type):
+    media_type = content_type.split(';', 1)[0].strip().lower()
+    return media_type in COMPRESSIBLE_TYPES or media_type.endswith('+json')
+
+
+# =========================================================
+# Компрессоры
+# =========================================================
+# Настройки читаются на каждый ответ: override_settings и изменения
+# на лету видны без перезапуска.
+def get_min_size():
+    return getattr(settings, 'COMPRESSION_MIN_SIZE', 1024)
+
+
+def get_brotli_quality():
+    return getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 4)
+
+
+def compress(coding, content):
+    if coding == 'br':
+        return brotli.compress(content, quality=get_brotli_quality())
+    # так же, как GZipMiddleware: со случайным заполнением против BREACH
+    return compress_string(content, max_random_bytes=CompressionMiddleware.max_random_bytes)
+
+
+class BrotliStreamCompressor:
+    # сжатие потока кусками; каждый кусок сбрасывается сразу, чтобы
+    # клиент получал данные по мере выгрузки (cars.streaming)
+    def __init__(self):
+        self.compressor = brotli.Compressor(quality=get_brotli_quality())
+
+    def feed(self, chunk):
+        if isinstance(chunk, str):
+            chunk = chunk.encode()
+        return self.compressor.process(chunk) + self.compressor.flush()
+
+    def compress(self, chunks):
+        for chunk in chunks:
+            data = self.feed(chunk)
+            if data:
+                yield data
+        yield self.compressor.finish()
+
+    async def acompress(self, chunks):
+        async for chunk in chunks:
+            data = self.feed(chunk)
+            if data:
+                yield data
+        yield self.compressor.finish()
+
+
+# =========================================================
+# Middleware
+# =========================================================
+# Ставится сразу после InstrumentationMiddleware: сжимает уже готовое
+# тело, а время сжатия попадает в span 'compress' (Server-Timing).
+# Ответы меньше COMPRESSION_MIN_SIZE байт не сжимаются: выигрыш в
+# байтах меньше, чем стоимость заголовков и CPU.
+#
+# gzip — целиком GZipMiddleware Django, вместе с защитой от BREACH
+# (случайное имя файла в заголовке gzip). Сверху — выбор кодировки по
+# q из Accept-Encoding и brotli, если пакет установлен. У brotli такого
+# заголовка нет, поэтому и заполнения нет.
+class CompressionMiddleware(GZipMiddleware):
+    def process_response(self, request, response):
+        if (
+            response.status_code < 200 or response.status_code in (204, 304)
+            or response.has_header('Content-Encoding')
+            or not is_compressible(response.get('Content-Type', ''))
+        ):
+            return response
+        if not response.streaming and len(response.content) < get_min_size():
+            return response
+
+        coding = negotiate(request.headers.get('Accept-Encoding', ''))
+        if coding == 'gzip':
+            with span('compress'):
+                return super().process_response(request, response)
+
+        # представление зависит от Accept-Encoding, даже если этот клиент
+        # сжатие не просил
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if coding is None:
+            return response
+
+        if response.streaming:
+            compressor = BrotliStreamCompressor()
+            if response.is_async:
+                response.streaming_content = compressor.acompress(response.streaming_content)
+            else:
+                response.streaming_content = compressor.compress(response.streaming_content)
+            del response['Content-Length']
+        else:
+            with span('compress'):
+                compressed = compress('br', response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        # байты другие — сильный ETag становится слабым (RFC 9110, 8.8.1)
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = 'br'
+        return response
@@ -0,0 +1,164 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+
+from server import caches as server_caches
+
+# реплика для чтения в текущем запросе (None — всё с primary)
+replica = ContextVar('db_replica', default=None)
+# была ли в текущем запросе запись через ORM
+wrote = ContextVar('db_wrote', default=None)
+
+PRIMARY = 'default'
+# только данные каталога и броней; пользователи, токены и сессии —
+# всегда с primary
+REPLICA_APPS = {'cars', 'user_cars'}
+
+
+def get_replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def get_sticky_seconds():
+    return getattr(settings, 'REPLICA_STICKY_SECONDS', 5)
+
+
+def get_cache():
+    # нужен общий кэш (CACHE_URL): иначе другой воркер не узнает о записи
+    return caches[getattr(settings, 'REPLICA_STICKY_CACHE', 'default')]
+
+
+def check_sticky_cache():
+    # Метка pin() в кэше памяти процесса видна одному воркеру: следующий
+    # запрос автора на другой воркер ушёл бы на реплику без его записи.
+    # Такую конфигурацию не запускаем, а не ломаем read-your-writes молча.
+    if get_replicas() and not server_caches.is_shared(get_cache()):
+        raise ImproperlyConfigured(
+            'DB_REPLICAS требует общий кэш для REPLICA_STICKY_CACHE '
+            '(CACHE_URL), а не кэш в памяти процесса'
+        )
+
+
+# =========================================================
+# Read-your-writes: после своей записи — чтение с primary
+# =========================================================
+# Окно REPLICA_STICKY_SECONDS должно быть больше отставания реплик:
+# пока оно не истекло, пользователь читает с primary и видит только
+# что созданную бронь.
+def sticky_key(user_id):
+    return f'db:sticky:{user_id}'
+
+
+def pin(user):
+    if user is not None and user.is_authenticated and get_sticky_seconds() > 0:
+        get_cache().set(sticky_key(user.pk), 1, get_sticky_seconds())
+
+
+def is_pinned(user):
+    if user is None or not user.is_authenticated:
+        return False
+    return get_cache().get(sticky_key(user.pk)) is not None
+
+
+def should_use_replica(request):
+    return (
+        bool(get_replicas())
+        and request.method in ('GET', 'HEAD', 'OPTIONS')
+        and not is_pinned(request.user)
+    )
+
+
+@contextmanager
+def replica_reads():
+    # чтения cars / user_cars внутри блока идут на случайную реплику
+    replicas = get_replicas()
+    token = replica.set(random.choice(replicas) if replicas else None)
+    try:
+        yield replica.get()
+    finally:
+        replica.reset(token)
+
+
+@contextmanager
+def primary_reads():
+    token = replica.set(None)
+    try:
+        yield
+    finally:
+        replica.reset(token)
+
+
+# =========================================================
+# Роутер
+# =========================================================
+# Чтение уходит на реплику только внутри replica_reads() — его
+# включает ReplicaReadMixin (cars.mixins) на GET списков и деталей.
+# Все остальные чтения, и любая запись, — на primary.
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        alias = replica.get()
+        if alias is not None and model._meta.app_label in REPLICA_APPS:
+            return alias
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        state = wrote.get()
+        if state is not None and model._meta.app_label in REPLICA_APPS:
+            state.append(model._meta.label)
+        # записали — до конца запроса читаем своё с primary
+        replica.set(None)
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # реплики — копии primary, связи между ними допустимы
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # схема приходит на реплики репликацией
+        return db == PRIMARY
+
+
+# =========================================================
+# Middleware
+# =========================================================
+# Если запрос что-то записал через ORM, пользователь «прилипает» к
+# primary на REPLICA_STICKY_SECONDS. Пользователя ставит DRF при
+# аутентификации (request.user), поэтому смотрим на него после ответа.
+class ReplicaStickinessMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        check_sticky_cache()
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = wrote.set([])
+        try:
+            response = self.get_response(request)
+            self.finish(request)
+        finally:
+            wrote.reset(token)
+        return response
+
+    async def __acall__(self, request):
+        token = wrote.set([])
+        try:
+            response = await self.get_response(request)
+            self.finish(request)
+        finally:
+            wrote.reset(token)
+        return response
+
+    def finish(self, request):
+        if wrote.get():
+            pin(getattr(request, 'user', None))
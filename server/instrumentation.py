@@ -0,0 +1,284 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+# границы корзин гистограмм (как у prometheus_client)
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+UNRESOLVED = '<unresolved>'
+
+# метрики текущего запроса; contextvar виден и в потоках sync_to_async
+current = ContextVar('request_metrics', default=None)
+
+
+# =========================================================
+# Метрики одного запроса
+# =========================================================
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        # {имя: секунды} — serialize, render и пользовательские span()
+        self.spans = {}
+        self.depth = {}
+
+    def add_span(self, name, seconds):
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+
+@contextmanager
+def span(name):
+    # Замер участка кода внутри запроса:
+    #   with instrumentation.span('pricing'): ...
+    # Попадает в Server-Timing и в гистограмму span_duration_seconds.
+    # Вложенные span с тем же именем считаются один раз.
+    metrics = current.get()
+    if metrics is None or metrics.depth.get(name):
+        yield
+        return
+    metrics.depth[name] = 1
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.depth[name] = 0
+        metrics.add_span(name, time.perf_counter() - t0)
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    t0 = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_time += time.perf_counter() - t0
+
+
+# =========================================================
+# Гистограммы в памяти процесса
+# =========================================================
+# У каждого воркера свои: Prometheus собирает их с каждого процесса
+# отдельно и суммирует сам.
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+
+class Registry:
+    METRICS = {
+        'http_request_duration_seconds': ('Время обработки запроса', SECONDS_BUCKETS),
+        'http_request_db_queries': ('SQL-запросов на запрос', QUERY_BUCKETS),
+        'http_request_db_duration_seconds': ('Время в БД на запрос', SECONDS_BUCKETS),
+        'http_request_span_duration_seconds': ('Время участков запроса (serialize, render, ...)', SECONDS_BUCKETS),
+        'http_response_size_bytes': ('Размер тела ответа', BYTES_BUCKETS),
+    }
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.histograms = {name: {} for name in self.METRICS}
+
+    def observe(self, name, labels, value):
+        with self.lock:
+            histogram = self.histograms[name].get(labels)
+            if histogram is None:
+                histogram = self.histograms[name][labels] = Histogram(self.METRICS[name][1])
+            histogram.observe(value)
+
+    def record(self, labels, metrics, duration, size):
+        self.observe('http_request_duration_seconds', labels, duration)
+        self.observe('http_request_db_queries', labels, metrics.queries)
+        self.observe('http_request_db_duration_seconds', labels, metrics.db_time)
+        for name, seconds in metrics.spans.items():
+            self.observe('http_request_span_duration_seconds', labels + (('span', name),), seconds)
+        if size is not None:
+            self.observe('http_response_size_bytes', labels, size)
+
+    def render(self):
+        # текстовый формат Prometheus 0.0.4
+        lines = []
+        with self.lock:
+            for name, (help_text, _) in self.METRICS.items():
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} histogram')
+                for labels, histogram in sorted(self.histograms[name].items()):
+                    label_text = ','.join(f'{key}="{escape(value)}"' for key, value in labels)
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{{{label_text},le="{bound:g}"}} {cumulative}')
+                    lines.append(f'{name}_bucket{{{label_text},le="+Inf"}} {histogram.count}')
+                    lines.append(f'{name}_sum{{{label_text}}} {histogram.sum:g}')
+                    lines.append(f'{name}_count{{{label_text}}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = Registry()
+
+
+# =========================================================
+# Подключение к БД (один раз на процесс)
+# =========================================================
+_installed = False
+
+
+def install_wrapper(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def install():
+    # Обёртка execute ставится на каждое новое подключение к БД, а не
+    # на время запроса: async-вьюхи ходят в БД из других потоков.
+    global _installed
+    if _installed:
+        return
+    _installed = True
+    connection_created.connect(install_wrapper, weak=False)
+    for connection in connections.all(initialized_only=True):
+        install_wrapper(connection)
+
+
+# =========================================================
+# Время сериализации (span serialize)
+# =========================================================
+# У DRF нет хука вокруг serializer.data, поэтому list и retrieve
+# повторяют ListModelMixin / RetrieveModelMixin с замером вокруг
+# .data — для любого сериализатора, в том числе BaseSerializer
+# (cars.fast_serializers). В MRO ставится последним перед generic-
+# классом DRF, чтобы остальные миксины звали его через super().
+class SerializeTimingMixin:
+    def serialize(self, serializer):
+        with span('serialize'):
+            return serializer.data
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(self.serialize(serializer))
+
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(self.serialize(serializer))
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        serializer = self.get_serializer(instance)
+        return Response(self.serialize(serializer))
+
+
+# =========================================================
+# Middleware
+# =========================================================
+# Должен стоять первым в MIDDLEWARE, чтобы видеть весь запрос.
+# Ключ метрик — имя URL (car-list, rent-car, ...) и его шаблон:
+# имена в cars и user_cars пересекаются (car-detail).
+class InstrumentationMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.server_timing = getattr(settings, 'INSTRUMENTATION_SERVER_TIMING', True)
+        install()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            current.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = current.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current.reset(token)
+        return self.finish(request, response, metrics)
+
+    def process_template_response(self, request, response):
+        # DRF Response рендерится после этого хука: время render —
+        # до post_render_callback
+        metrics = current.get()
+        if metrics is not None:
+            t0 = time.perf_counter()
+
+            def rendered(response):
+                metrics.add_span('render', time.perf_counter() - t0)
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    def finish(self, request, response, metrics):
+        duration = time.perf_counter() - metrics.started
+        # у потокового ответа тело ещё не сформировано
+        size = None if response.streaming else len(response.content)
+
+        match = request.resolver_match
+        labels = (
+            ('view', match.url_name or match.view_name if match else UNRESOLVED),
+            ('route', match.route if match else UNRESOLVED),
+            ('method', request.method),
+        )
+        registry.record(labels, metrics, duration, size)
+
+        if self.server_timing:
+            parts = [
+                f'app;dur={duration * 1000:.1f}',
+                f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.queries} queries"',
+            ]
+            parts += [f'{name};dur={seconds * 1000:.1f}' for name, seconds in metrics.spans.items()]
+            response['Server-Timing'] = ', '.join(parts)
+        return response
+
+
+# =========================================================
+# Эндпоинт для Prometheus (только staff)
+# =========================================================
+class MetricsView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,126 @@
+import json
+from collections import UserList
+
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # orjson — необязательная зависимость
+    orjson = None
+
+# DRF экранирует их, чтобы JSON оставался подмножеством JavaScript
+LINE_SEPARATORS = ((b'\xe2\x80\xa8', b'\\u2028'), (b'\xe2\x80\xa9', b'\\u2029'))
+
+_encoder = JSONEncoder()
+
+# значения, которые orjson кодирует сам, без проверки
+FLAT_TYPES = frozenset({str, int, bool, float, type(None)})
+
+
+def backend():
+    # JSON_RENDERER_BACKEND: 'auto' — orjson, если установлен; 'json' — stdlib
+    name = getattr(settings, 'JSON_RENDERER_BACKEND', 'auto')
+    if name == 'json' or orjson is None:
+        return 'json'
+    return 'orjson'
+
+
+# =========================================================
+# Кодирование
+# =========================================================
+# Вывод тот же, что у DRF JSONRenderer (компактный, UTF-8 без \u-экранов):
+# Decimal, datetime, lazy-строки и прочее — через JSONEncoder.default DRF.
+# orjson получает их через default (OPT_PASSTHROUGH_DATETIME — чтобы
+# '+00:00' превращался в 'Z' ровно как у DRF), всё остальное кодирует сам.
+# Подклассы str/int/dict/list тоже идут через default
+# (OPT_PASSTHROUGH_SUBCLASS): orjson читает их хранилище напрямую, и
+# ErrorList форм (UserList поверх list) у него выходит [].
+def dumps_orjson(data):
+    ret = orjson.dumps(
+        data, default=encode_default,
+        option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_SUBCLASS | orjson.OPT_NON_STR_KEYS,
+    )
+    for raw, escaped in LINE_SEPARATORS:
+        if raw in ret:
+            ret = ret.replace(raw, escaped)
+    return ret
+
+
+def encode_default(obj):
+    if isinstance(obj, str):
+        # str(obj) у SafeString вернул бы тот же подкласс
+        return str.__str__(obj)
+    if isinstance(obj, int):
+        return int(obj)
+    if isinstance(obj, dict):
+        return dict(obj)
+    if isinstance(obj, list):
+        return list(obj)
+    value = _encoder.default(obj)
+    # Decimal DRF отдаёт как float
+    if has_unsafe_float(value):
+        raise TypeError('float без точного представления в orjson')
+    return value
+
+
+# float DRF пишет через repr: 1e-05, 1e+16, а NaN и бесконечность в
+# strict-режиме — ValueError. orjson пишет 0.00001, 1e16 и null. Вывод
+# совпадает для нуля и 1e-4 <= |x| < 1e16, остальное кодирует stdlib.
+def is_exact_float(value):
+    return value == 0.0 or 1e-4 <= abs(value) < 1e16
+
+
+def has_unsafe_float(obj):
+    # типы значений контейнера собираются сразу (set(map(...)) — в C),
+    # поштучно проверяются только float и вложенные контейнеры
+    if isinstance(obj, float):
+        return not is_exact_float(obj)
+    if isinstance(obj, dict):
+        values = obj.values()
+    elif isinstance(obj, (list, tuple, UserList)):
+        values = obj
+    else:
+        return False
+    types = set(map(type, values))
+    if float in types:
+        for value in values:
+            if type(value) is float and not is_exact_float(value):
+                return True
+    if types <= FLAT_TYPES:
+        return False
+    return any(has_unsafe_float(value) for value in values if type(value) not in FLAT_TYPES)
+
+
+def dumps_json(data):
+    ret = json.dumps(
+        data, cls=JSONEncoder, ensure_ascii=False, allow_nan=False, separators=(',', ':')
+    )
+    return ret.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029').encode()
+
+
+def dumps(data):
+    # JSON в bytes выбранным бэкендом; orjson не умеет числа больше
+    # 64 бит, float вне точного диапазона и кое-что ещё — тогда stdlib
+    if backend() == 'orjson' and not has_unsafe_float(data):
+        try:
+            return dumps_orjson(data)
+        except TypeError:
+            pass
+    return dumps_json(data)
+
+
+# =========================================================
+# Рендерер DRF
+# =========================================================
+class FastJSONRenderer(JSONRenderer):
+    # Отступы (?format=json; indent=4, browsable API) и нестандартные
+    # настройки UNICODE_JSON/COMPACT_JSON/STRICT_JSON — обычный JSONRenderer
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent is not None or self.ensure_ascii or not self.compact or not self.strict:
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -59,7 +60,7 @@ INSTALLED_APPS = [
 # =========================================================
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -67,6 +68,11 @@ REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': (
         'django_filters.rest_framework.DjangoFilterBackend',
     ),
+    # тот же JSON, что у JSONRenderer, но через orjson (server.renderers)
+    'DEFAULT_RENDERER_CLASSES': (
+        'server.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
 }
 
 # =========================================================
@@ -95,6 +101,12 @@ SWAGGER_SETTINGS = {
 
 
 MIDDLEWARE = [
+    # первым: время, SQL и сериализация каждого запроса (server.instrumentation)
+    'server.instrumentation.InstrumentationMiddleware',
+    # gzip / brotli по Accept-Encoding (server.compression)
+    'server.compression.CompressionMiddleware',
+    # после своей записи пользователь читает с primary (server.db_router)
+    'server.db_router.ReplicaStickinessMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -126,14 +138,151 @@ WSGI_APPLICATION = 'server.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+#
+# DB_ENGINE=postgres — PostgreSQL (нужен psycopg), иначе SQLite.
+# Для PostgreSQL: DB_NAME, DB_USER, DB_PASSWORD, DB_HOST, DB_PORT,
+# DB_CONN_MAX_AGE (постоянные соединения, сек.) или DB_POOL_SIZE
+# (пул psycopg, тогда CONN_MAX_AGE должен быть 0).
+
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'carsharing'),
+            'USER': os.environ.get('DB_USER', 'postgres'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
+    }
+    if os.environ.get('DB_POOL_SIZE'):
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': 2,
+            'max_size': int(os.environ['DB_POOL_SIZE']),
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                # WAL: читатели не ждут писателя; synchronous=NORMAL
+                # безопасен в WAL и убирает fsync на каждый коммит;
+                # busy_timeout — ждать блокировку, а не падать сразу
+                'init_command': (
+                    'PRAGMA journal_mode=WAL;'
+                    'PRAGMA synchronous=NORMAL;'
+                    'PRAGMA busy_timeout=5000;'
+                    'PRAGMA temp_store=MEMORY;'
+                ),
+                # запись берёт блокировку в начале транзакции, иначе
+                # повышение блокировки внутри неё падает без ожидания
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': 5,
+            },
+        }
+    }
+
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Реплики для чтения (server.db_router)
+# DB_REPLICAS — через запятую: хосты реплик PostgreSQL (host или
+# host:port, остальное как у primary) или файлы SQLite для локальной
+# проверки. GET списков и деталей cars / user_cars читают с реплик,
+# запись и всё остальное — primary. В тестах реплики — зеркала primary.
+# Метки read-your-writes хранятся в REPLICA_STICKY_CACHE (по умолчанию
+# default), поэтому с репликами нужен общий кэш (CACHE_URL) — с кэшем
+# в памяти процесса сервер не запустится.
+
+DATABASE_REPLICAS = []
+for number, replica in enumerate(filter(None, os.environ.get('DB_REPLICAS', '').split(',')), 1):
+    alias = f'replica{number}'
+    DATABASES[alias] = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+    if DB_ENGINE == 'postgres':
+        host, _, port = replica.strip().partition(':')
+        DATABASES[alias].update(HOST=host, PORT=port or DATABASES['default']['PORT'])
+    else:
+        DATABASES[alias]['NAME'] = replica.strip()
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['server.db_router.PrimaryReplicaRouter']
+
+# окно read-your-writes, секунды: больше отставания реплик
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+
+
+# Cache
+# По умолчанию — память процесса. CACHE_URL=redis://host:6379/0 включает
+# общий Redis (нужен пакет redis).
+
+if os.environ.get('CACHE_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['CACHE_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'carsharing',
+        }
     }
+
+# кэш ответов каталога машин (cars.cache)
+CAR_CATALOGUE_CACHE = 'default'
+CAR_CATALOGUE_CACHE_TIMEOUT = 300
+
+# правила цены броней (cars.pricing); по умолчанию — цена за сутки
+# и наценка за водителя. Пример остальных правил:
+#   'weekend_multiplier': '1.10',
+#   'seasons': [{'start': '06-01', 'end': '08-31', 'multiplier': '1.15'}],
+#   'long_rental_discounts': [[7, '0.05'], [30, '0.15']],
+CAR_PRICING = {
+    'driver_multiplier': '1.2',
+    'weekend_multiplier': '1',
+    'seasons': [],
+    'long_rental_discounts': [],
 }
 
+# котировки cars/<pk>/quote/ (cars.quotes): LRU в памяти процесса;
+# запоминаются только с общим кэшем CAR_CATALOGUE_CACHE (CACHE_URL)
+CAR_QUOTE_CACHE_SIZE = 10_000
+CAR_QUOTE_CACHE_TTL = 60
+
+# снимки пользователя и баланса для users.authentication.CachedJWTAuthentication
+# (поверх кэша в памяти процесса). Работают только с общим кэшем (CACHE_URL):
+# с LocMemCache сброс снимка не виден другим воркерам, и снимки выключены.
+AUTH_USER_CACHE = 'default'
+AUTH_USER_CACHE_TTL = 30
+
+# проводки баланса моложе лага (секунды) compact_balances не сворачивает
+# (user_cars.ledger)
+BALANCE_COMPACT_LAG = 60
+
+# события броней моложе лага (секунды) лента bookings/events/ ещё не
+# отдаёт: событие с меньшим id могло ещё не закоммититься (cars.events)
+BOOKING_EVENTS_LAG = 5
+
+# заголовок Server-Timing (app, db, serialize, render) в каждом ответе;
+# гистограммы для /metrics/ собираются независимо от него
+INSTRUMENTATION_SERVER_TIMING = os.environ.get('INSTRUMENTATION_SERVER_TIMING', '1') == '1'
+
+# JSON: 'auto' — orjson, если установлен, иначе stdlib json; 'json' — всегда stdlib
+JSON_RENDERER_BACKEND = os.environ.get('JSON_RENDERER_BACKEND', 'auto')
+
+# сжатие ответов: меньше COMPRESSION_MIN_SIZE байт не сжимаются;
+# gzip — GZipMiddleware Django (уровень 6), brotli — только если
+# установлен пакет brotli
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+COMPRESSION_BROTLI_QUALITY = 4
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -176,6 +325,8 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 # ---------- MEDIA ----------
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# потоки для генерации миниатюр/WebP/AVIF фото машин (cars.images)
+CAR_PHOTO_WORKERS = 2
 
 # ---------- ABSTRACTUSER ----------
 AUTH_USER_MODEL = "users.User"
@@ -5,6 +5,7 @@ from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 from django.conf import settings
 from django.conf.urls.static import static
+from .instrumentation import MetricsView
 
 
 schema_view = get_schema_view(
@@ -22,6 +23,9 @@ urlpatterns = [
     path('users/',include('users.urls')),
     path('cars/',include('cars.urls')),
     path('user_cars/',include("user_cars.urls")),
+
+    # метрики запросов в формате Prometheus (только staff)
+    path('metrics/', MetricsView.as_view(), name='metrics'),
   
 
         # Swagger UI
@@ -4,6 +4,5 @@ from django.apps import AppConfig
 class UserCarsConfig(AppConfig):
     name = 'user_cars'
 
-
-def ready(self):
-        import user_cars.signals
\ No newline at end of file
+    def ready(self):
+        import user_cars.signals
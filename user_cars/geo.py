@@ -0,0 +1,143 @@
+import math
+
+from django.db.models import Q
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+# точность хранимого geohash: ~4.8 x 4.8 м
+PRECISION = 9
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+# сколько ячеек (диапазонов по индексу) допускаем в одном запросе
+MAX_CELLS = 16
+# с какого радиуса начинаем поиск ближайших
+START_RADIUS_KM = 1
+
+
+# =========================================================
+# Geohash
+# =========================================================
+# Соседние точки почти всегда имеют общий префикс, поэтому поиск
+# рядом — это несколько диапазонов по индексу geohash, без PostGIS.
+def encode(lat, lon, precision=PRECISION):
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    cell = []
+    bits = 0
+    value = 0
+    even = True
+    while len(cell) < precision:
+        rng, coord = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if coord >= mid:
+            value = value * 2 + 1
+            rng[0] = mid
+        else:
+            value = value * 2
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            cell.append(BASE32[value])
+            bits = 0
+            value = 0
+    return ''.join(cell)
+
+
+def cell_size(precision):
+    # (высота, ширина) ячейки в градусах
+    lon_bits = math.ceil(precision * 5 / 2)
+    lat_bits = precision * 5 // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def cells_covering(south, west, north, east, max_cells=MAX_CELLS):
+    # ячейки самой мелкой сетки, которыми прямоугольник покрывается
+    # не более чем max_cells штуками (каждая ячейка — один диапазон
+    # по индексу). Долготы могут выходить за ±180 — окно через антимеридиан.
+    for precision in range(PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        first_row, first_col = math.floor(south / height), math.floor(west / width)
+        rows = math.floor(north / height) - first_row + 1
+        cols = math.floor(east / width) - first_col + 1
+        if rows * cols <= max_cells:
+            break
+
+    cells = set()
+    for row in range(rows):
+        cell_lat = min((first_row + row + 0.5) * height, 90.0 - 1e-9)
+        for col in range(cols):
+            cell_lon = ((first_col + col + 0.5) * width + 180.0) % 360.0 - 180.0
+            cells.add(encode(cell_lat, cell_lon, precision))
+    return sorted(cells)
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    # гаверсинус
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+# =========================================================
+# Машины рядом с точкой
+# =========================================================
+def candidates_within(queryset, lat, lon, radius_km, max_candidates):
+    # 1) bounding box круга покрывается ячейками geohash — это не
+    #    больше MAX_CELLS диапазонов по индексу, без полного скана;
+    # 2) внутри ячеек — фильтр по самому bounding box;
+    # 3) точное расстояние — только для (pk, lat, lon) кандидатов,
+    #    число которых ограничено max_candidates.
+    dlat = radius_km / KM_PER_DEGREE
+    dlon = min(radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01)), 180.0)
+    south, north = max(lat - dlat, -90.0), min(lat + dlat, 90.0)
+    west, east = lon - dlon, lon + dlon
+
+    in_cells = Q()
+    for cell in cells_covering(south, west, north, east):
+        # диапазон вместо startswith: LIKE на SQLite индекс не использует
+        in_cells |= Q(geohash__gte=cell, geohash__lt=cell + '~')
+
+    candidates = queryset.filter(in_cells).filter(
+        latitude__gte=south, latitude__lte=north,
+    ).order_by()
+    if west < -180 or east > 180:
+        # окно через антимеридиан
+        candidates = candidates.filter(
+            Q(longitude__gte=(west + 540) % 360 - 180) | Q(longitude__lte=(east + 540) % 360 - 180)
+        )
+    else:
+        candidates = candidates.filter(longitude__gte=west, longitude__lte=east)
+
+    found = []
+    rows = candidates.values_list('pk', 'latitude', 'longitude')[:max_candidates]
+    for pk, car_lat, car_lon in rows:
+        distance = distance_km(lat, lon, car_lat, car_lon)
+        if distance <= radius_km:
+            found.append((distance, pk))
+    return found
+
+
+def nearby(queryset, lat, lon, radius_km, limit, max_candidates):
+    # Радиус растёт от START_RADIUS_KM в 4 раза, пока в круге не наберётся
+    # limit машин: в плотном городе хватает первого маленького круга, и
+    # число проверяемых кандидатов не зависит от размера каталога.
+    step = min(START_RADIUS_KM, radius_km)
+    while True:
+        found = candidates_within(queryset, lat, lon, step, max_candidates)
+        if len(found) >= limit or step >= radius_km:
+            break
+        step = min(step * 4, radius_km)
+
+    found.sort()
+    found = found[:limit]
+
+    # полные строки — одним запросом и только для победителей
+    cars = queryset.in_bulk([pk for _, pk in found])
+    result = []
+    for distance, pk in found:
+        car = cars[pk]
+        car.distance_km = distance
+        result.append(car)
+    return result
@@ -0,0 +1,18 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from user_cars.ledger import COMPACT_BATCH, compact
+
+
+class Command(BaseCommand):
+    help = 'Сворачивает проводки журнала баланса в снимки (запускать периодически)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lag', type=int, default=None, help='секунд; по умолчанию BALANCE_COMPACT_LAG')
+        parser.add_argument('--batch-size', type=int, default=COMPACT_BATCH)
+
+    def handle(self, *args, **options):
+        lag = None if options['lag'] is None else timedelta(seconds=options['lag'])
+        balances = compact(lag=lag, batch_size=options['batch_size'])
+        self.stdout.write(f'Обновлено снимков баланса: {balances}')
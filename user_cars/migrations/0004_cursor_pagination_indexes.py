@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-18 11:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_cars', '0003_rental'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['car_name', 'id'], name='user_car_name_id_idx'),
+        ),
+    ]
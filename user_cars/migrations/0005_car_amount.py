@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 11:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_cars', '0004_cursor_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='car',
+            name='amount',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
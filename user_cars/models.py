@@ -1,5 +1,11 @@
+from django.core.validators import MaxValueValidator, MinValueValidator
+from decimal import Decimal
+
 from django.db import models
+from django.db.models import DecimalField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from users.models import User
+from . import geo
 import datetime
 
 
@@ -17,6 +23,34 @@ class Car(models.Model):
     car_type = models.CharField(max_length=50, choices=CAR_TYPE)
     price_per_day = models.DecimalField(max_digits=10, decimal_places=2)
     location  = models.CharField(max_length=250)
+    # сколько экземпляров машины ещё можно арендовать
+    amount = models.PositiveIntegerField(default=1)
+    # координаты для поиска рядом (user_cars.geo); geohash считается в save()
+    latitude = models.FloatField(
+        null=True, blank=True,
+        validators=[MinValueValidator(-90), MaxValueValidator(90)]
+    )
+    longitude = models.FloatField(
+        null=True, blank=True,
+        validators=[MinValueValidator(-180), MaxValueValidator(180)]
+    )
+    geohash = models.CharField(max_length=12, blank=True, editable=False, db_index=True)
+
+    class Meta:
+        indexes = [
+            # cursor-пагинация списка доступных машин (car_name, id)
+            models.Index(fields=['car_name', 'id'], name='user_car_name_id_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.latitude is not None and self.longitude is not None:
+            self.geohash = geo.encode(self.latitude, self.longitude)
+        else:
+            self.geohash = ''
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'geohash'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.car_name} ({self.year}) - {self.car_type}, ${self.price_per_day}/day"
@@ -29,9 +63,78 @@ class Rental(models.Model):
     start_date = models.DateField(auto_now_add=True)
     end_date = models.DateField(null=True, blank=True)
 
+# =========================================================
+# Баланс: снимок + журнал проводок (user_cars.ledger)
+# =========================================================
+# amount — сумма всех проводок до entry_id включительно (снимок);
+# текущий баланс = amount + проводки пользователя после entry_id.
+# Аренды только добавляют проводки, снимки догоняет compact_balances.
+def pending_entries(user_ref, watermark_ref):
+    # сумма проводок после снимка, как подзапрос к queryset'у
+    return Coalesce(
+        Subquery(
+            BalanceEntry.objects.filter(
+                user_id=OuterRef(user_ref), pk__gt=OuterRef(watermark_ref)
+            ).order_by().values('user_id').annotate(total=Sum('amount')).values('total')
+        ),
+        Value(Decimal(0)),
+        output_field=DecimalField(max_digits=12, decimal_places=2),
+    )
+
+
+class BalanceQuerySet(models.QuerySet):
+    def with_pending(self):
+        return self.annotate(pending=pending_entries('user_id', 'entry_id'))
+
+
 class Balance(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="balance")
     amount = models.DecimalField(max_digits=10, decimal_places=2, default=0.0)
+    # последняя проводка, вошедшая в amount
+    entry_id = models.BigIntegerField(default=0)
+
+    objects = BalanceQuerySet.as_manager()
+
+    @property
+    def current(self):
+        # pending есть, только если баланс загружен через with_pending()
+        # (или восстановлен из снимка такого запроса, users.authentication).
+        # Иначе проводки читаются каждый раз и на экземпляре не
+        # запоминаются: после аренды (rent_car) он показал бы старую сумму.
+        pending = getattr(self, 'pending', None)
+        if pending is None:
+            pending = BalanceEntry.objects.filter(
+                user_id=self.user_id, pk__gt=self.entry_id
+            ).aggregate(total=Sum('amount'))['total'] or Decimal(0)
+        return self.amount + pending
+
+    def __str__(self):
+        return f"{self.user.username} - ${self.current}"
+
+
+class BalanceEntry(models.Model):
+    KIND_CHOICES = (
+        ('rent_debit', 'Оплата аренды'),
+        ('rent_credit', 'Доход от аренды'),
+        ('adjustment', 'Корректировка'),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='balance_entries')
+    # приход со знаком +, списание со знаком -
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    # журнал переживает удаление аренды
+    rental = models.ForeignKey(
+        Rental, on_delete=models.SET_NULL, null=True, blank=True, related_name='entries'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # проводки пользователя после снимка: user_id = ? AND id > ?
+            models.Index(fields=['user', 'id'], name='balance_entry_user_id_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.user.username} - ${self.amount}"
+        return f"{self.user_id}: {self.amount} ({self.kind})"
@@ -0,0 +1,5 @@
+from cars.pagination import KeysetCursorPagination
+
+
+class UserCarCursorPagination(KeysetCursorPagination):
+    ordering = ('car_name', 'id')
@@ -0,0 +1,82 @@
+import random
+import time
+
+from django.db import OperationalError, connection, transaction
+from django.db.models import F
+
+from users.authentication import invalidate_user_on_commit
+from . import ledger
+from .models import Balance, Car, Rental
+
+# сколько раз повторяем аренду при конфликте блокировок
+# (deadlock на PostgreSQL, "database is locked" на SQLite)
+LOCK_RETRIES = 3
+RETRY_DELAY = 0.05
+
+
+class RentalError(Exception):
+    def __init__(self, detail, status_code=400):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+
+
+# =========================================================
+# Аренда машины одной транзакцией
+# =========================================================
+def rent_car(car_pk, renter):
+    for attempt in range(LOCK_RETRIES):
+        try:
+            return _rent_car(car_pk, renter)
+        except OperationalError:
+            if attempt == LOCK_RETRIES - 1:
+                raise
+            time.sleep(RETRY_DELAY * 2 ** attempt * (1 + random.random()))
+
+
+def _rent_car(car_pk, renter):
+    with transaction.atomic():
+        cars = Car.objects.all()
+        if connection.features.has_select_for_update:
+            # PostgreSQL: аренды одной машины идут строго по очереди
+            cars = cars.select_for_update()
+        car = cars.filter(pk=car_pk).first()
+
+        if car is None:
+            raise RentalError('Машина не найдена', status_code=404)
+        if car.user_id == renter.pk:
+            raise RentalError('Нельзя арендовать свою машину')
+
+        # Условные UPDATE: проверка и изменение в одном запросе, поэтому
+        # параллельные аренды не теряют обновления (и на SQLite без
+        # select_for_update)
+        if not Car.objects.filter(pk=car.pk, amount__gt=0).update(amount=F('amount') - 1):
+            raise RentalError('Машина недоступна для аренды')
+
+        price = car.price_per_day
+        Balance.objects.get_or_create(user_id=car.user_id)
+
+        # Блокируется только строка баланса арендатора: проверка средств
+        # и списание не должны разойтись. Владельцу — просто проводка в
+        # журнал (user_cars.ledger), без UPDATE его строки, поэтому
+        # аренды популярной машины не ждут друг друга. На SQLite запись
+        # уже захвачена условным UPDATE машины выше.
+        balances = Balance.objects.with_pending()
+        if connection.features.has_select_for_update:
+            balances = balances.select_for_update()
+        balance = balances.filter(user_id=renter.pk).first()
+        if balance is None or balance.current < price:
+            raise RentalError('Недостаточно средств')
+
+        car.amount -= 1
+        rental = Rental.objects.create(car=car, renter=renter)
+        ledger.post([
+            (renter.pk, -price, 'rent_debit', rental),
+            (car.user_id, price, 'rent_credit', rental),
+        ])
+
+        # проводки идут в обход сигналов Balance — снимки пользователей сбрасываем сами
+        invalidate_user_on_commit(renter.pk)
+        invalidate_user_on_commit(car.user_id)
+
+    return rental
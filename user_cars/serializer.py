@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from .models import Car
+from cars.fast_serializers import FastSerializer
+from .models import Car, pending_entries
 import datetime
 from rest_framework.exceptions import ValidationError
 
@@ -18,7 +19,7 @@ class CarSerializer(serializers.ModelSerializer):
         if user is None or user.is_anonymous:
             return None
         balance = getattr(user, 'balance', None)
-        return balance.amount if balance else 0
+        return balance.current if balance else 0
 
     def validate_year(self, value):
         current_year = datetime.datetime.now().year
@@ -49,6 +50,13 @@ class CarSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Локация не может быть пустой.")
         return value
 
+    def validate(self, data):
+        latitude = data.get('latitude', getattr(self.instance, 'latitude', None))
+        longitude = data.get('longitude', getattr(self.instance, 'longitude', None))
+        if (latitude is None) != (longitude is None):
+            raise serializers.ValidationError("Координаты задаются парой: latitude и longitude.")
+        return data
+
     def create(self, validated_data):
         user = getattr(self.context['request'], 'user', None)
         if user is None or user.is_anonymous:
@@ -64,13 +72,56 @@ class CarRentalSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Car
-        fields = ['id', 'car_name', 'year', 'car_type', 'price_per_day', 'location', 'owner_balance', 'amount']
+        fields = [
+            'id', 'car_name', 'year', 'car_type', 'price_per_day', 'location',
+            'latitude', 'longitude', 'owner_balance', 'amount'
+        ]
+
+    # owner_balance ходит в obj.user.balance для каждой строки;
+    # проводки после снимка — подзапросом в том же SELECT
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('user__balance').annotate(
+            owner_pending=pending_entries('user_id', 'user__balance__entry_id')
+        )
 
     def get_owner_balance(self, obj):
         owner = getattr(obj, 'user', None)
         balance = getattr(owner, 'balance', None)
-        return balance.amount if balance else 0
+        if balance is None:
+            return 0
+        if hasattr(obj, 'owner_pending'):
+            return balance.amount + obj.owner_pending
+        return balance.current
 
     def get_amount(self, obj):
         # возвращаем количество доступных машин
         return getattr(obj, 'amount', 0)
+
+
+# =========================================================
+# Быстрые версии для списков (cars.fast_serializers)
+# =========================================================
+class FastCarSerializer(FastSerializer):
+    serializer_class = CarSerializer
+
+    def get_balance(self, obj):
+        # баланс текущего пользователя одинаков для всех строк
+        if '_balance' not in self.__dict__:
+            self._balance = CarSerializer(context=self.context).get_balance(obj)
+        return self._balance
+
+
+class FastCarRentalSerializer(FastSerializer):
+    serializer_class = CarRentalSerializer
+
+    def get_owner_balance(self, obj):
+        balance = getattr(obj.user, 'balance', None)
+        if balance is None:
+            return 0
+        if hasattr(obj, 'owner_pending'):
+            return balance.amount + obj.owner_pending
+        return balance.current
+
+    def get_amount(self, obj):
+        return obj.amount
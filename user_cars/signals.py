@@ -1,6 +1,8 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from .models import Car, Balance
+from cars import search
+from users.authentication import invalidate_user_on_commit
+from .models import Car, Balance, BalanceEntry
 
 @receiver(post_save, sender=Car)
 def create_balance_for_user(sender, instance, created, **kwargs):
@@ -8,3 +10,23 @@ def create_balance_for_user(sender, instance, created, **kwargs):
         # Проверяем, есть ли уже баланс у пользователя
         if not hasattr(instance.user, 'balance'):
             Balance.objects.create(user=instance.user)
+
+
+# баланс входит в снимок пользователя CachedJWTAuthentication
+@receiver(post_save, sender=Balance)
+@receiver(post_delete, sender=Balance)
+@receiver(post_save, sender=BalanceEntry)
+def invalidate_balance_snapshot(sender, instance, **kwargs):
+    invalidate_user_on_commit(instance.user_id)
+
+
+# поисковый индекс (cars.search) охватывает и машины пользователей
+@receiver(post_save, sender=Car)
+def index_user_car(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index(search.user_car_document(instance))
+
+
+@receiver(post_delete, sender=Car)
+def unindex_user_car(sender, instance, **kwargs):
+    search.unindex('user_car', instance.pk)
@@ -1,3 +1,225 @@
+from datetime import timedelta
+from decimal import Decimal
+
 from django.test import TestCase
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from users.models import User
+from . import geo, ledger
+from .models import Balance, BalanceEntry, Car, Rental
+from .serializer import CarRentalSerializer, CarSerializer, FastCarRentalSerializer, FastCarSerializer
+
+
+# =========================================================
+# Число SQL-запросов на списках не зависит от размера страницы
+# =========================================================
+class ListQueryCountTests(TestCase):
+    def setUp(self):
+        self.renter = User.objects.create(username='renter')
+        Balance.objects.create(user=self.renter, amount=100)
+        self.client = APIClient()
+        self.client.force_authenticate(self.renter)
+
+    def create_cars(self, count, owner=None):
+        for i in range(count):
+            user = owner or User.objects.create(
+                username=f'owner{Car.objects.count()}'
+            )
+            Balance.objects.get_or_create(user=user)
+            Car.objects.create(
+                user=user, car_name=f'Car {i}', year=2020, car_type='suv',
+                price_per_day=50, location='Dushanbe'
+            )
+
+    def test_available_cars(self):
+        self.create_cars(2)
+        with self.assertNumQueries(1):
+            self.client.get(reverse('available-cars'))
+
+        self.create_cars(10)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('available-cars'))
+        self.assertEqual(len(response.data['results']), 12)
+
+    def test_own_cars(self):
+        # get_balance читает request.user.balance один раз на запрос, а
+        # не для каждой строки: список, баланс и проводки после снимка.
+        # Пользователь каждый раз свежий, как после аутентификации из
+        # БД — баланс на нём ещё не загружен.
+        self.create_cars(2, owner=self.renter)
+        self.client.force_authenticate(User.objects.get(pk=self.renter.pk))
+        with self.assertNumQueries(3):
+            self.client.get(reverse('car-list-create'))
+
+        self.create_cars(10, owner=self.renter)
+        self.client.force_authenticate(User.objects.get(pk=self.renter.pk))
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('car-list-create'))
+        self.assertEqual(len(response.data), 12)
+
+
+# =========================================================
+# Аренда: деньги и остаток машин меняются атомарно
+# =========================================================
+class RentCarTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create(username='owner')
+        self.renter = User.objects.create(username='renter')
+        Balance.objects.create(user=self.owner, amount=0)
+        Balance.objects.create(user=self.renter, amount=120)
+        self.car = Car.objects.create(
+            user=self.owner, car_name='Car', year=2020, car_type='suv',
+            price_per_day=50, location='Dushanbe', amount=1
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.renter)
+
+    def rent(self):
+        return self.client.post(reverse('rent-car', args=[self.car.pk]))
+
+    def test_rent_moves_money_and_stock(self):
+        self.assertEqual(self.rent().status_code, 200)
+        self.assertEqual(ledger.balance_of(self.renter.pk), 70)
+        self.assertEqual(ledger.balance_of(self.owner.pk), 50)
+        self.car.refresh_from_db()
+        self.assertEqual(self.car.amount, 0)
+        self.assertEqual(Rental.objects.count(), 1)
+
+        # второй экземпляр машины взять уже нельзя, деньги не списываются
+        self.assertEqual(self.rent().status_code, 400)
+        self.assertEqual(ledger.balance_of(self.renter.pk), 70)
+
+    def test_current_is_not_stale_after_rent(self):
+        # без with_pending() проводки не запоминаются на экземпляре
+        balance = Balance.objects.get(user=self.renter)
+        self.assertEqual(balance.current, 120)
+        self.rent()
+        self.assertEqual(balance.current, 70)
+
+    def test_insufficient_funds_rolls_back(self):
+        Balance.objects.filter(user=self.renter).update(amount=10)
+        self.assertEqual(self.rent().status_code, 400)
+        self.car.refresh_from_db()
+        self.assertEqual(self.car.amount, 1)
+        self.assertEqual(ledger.balance_of(self.owner.pk), 0)
+        self.assertFalse(Rental.objects.exists())
+
+    def test_rent_appends_ledger_entries(self):
+        self.rent()
+        self.assertEqual(
+            list(BalanceEntry.objects.order_by('pk').values_list('user_id', 'amount', 'kind')),
+            [(self.renter.pk, -50, 'rent_debit'), (self.owner.pk, 50, 'rent_credit')]
+        )
+        # строка баланса владельца не трогается — только журнал
+        self.assertEqual(Balance.objects.get(user=self.owner).amount, 0)
+
+        # owner_balance в списке = снимок + проводки, тем же запросом
+        Car.objects.filter(pk=self.car.pk).update(amount=1)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('available-cars'))
+        self.assertEqual(response.data['results'][0]['owner_balance'], 50)
+
+
+# =========================================================
+# Журнал баланса: снимки и сворачивание
+# =========================================================
+class BalanceLedgerTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='user')
+        Balance.objects.create(user=self.user, amount=100)
+
+    def test_compact_folds_entries_into_snapshot(self):
+        ledger.post([(self.user.pk, 30, 'adjustment', None), (self.user.pk, -5, 'adjustment', None)])
+        self.assertEqual(ledger.balance_of(self.user.pk), 125)
+
+        self.assertEqual(ledger.compact(lag=timedelta(0)), 1)
+        balance = Balance.objects.get(user=self.user)
+        self.assertEqual((balance.amount, balance.entry_id), (125, BalanceEntry.objects.latest('pk').pk))
+        self.assertEqual(ledger.balance_of(self.user.pk), 125)
+        # журнал остаётся целиком, повторный запуск ничего не делает
+        self.assertEqual(BalanceEntry.objects.count(), 2)
+        self.assertEqual(ledger.compact(lag=timedelta(0)), 0)
+
+        ledger.post([(self.user.pk, -25, 'adjustment', None)])
+        self.assertEqual(Balance.objects.with_pending().get(user=self.user).current, 100)
+
+    def test_recent_entries_wait_for_lag(self):
+        ledger.post([(self.user.pk, 10, 'adjustment', None)])
+        self.assertEqual(ledger.compact(lag=timedelta(minutes=5)), 0)
+        self.assertEqual(Balance.objects.get(user=self.user).amount, 100)
+        self.assertEqual(ledger.balance_of(self.user.pk), 110)
+
+
+# =========================================================
+# Поиск машин рядом (geohash)
+# =========================================================
+class NearbyCarsTests(TestCase):
+    def setUp(self):
+        self.renter = User.objects.create(username='renter')
+        self.owner = User.objects.create(username='owner')
+        self.client = APIClient()
+        self.client.force_authenticate(self.renter)
+
+    def create_car(self, name, lat, lon):
+        return Car.objects.create(
+            user=self.owner, car_name=name, year=2020, car_type='suv',
+            price_per_day=50, location='Dushanbe', latitude=lat, longitude=lon
+        )
+
+    def test_geohash(self):
+        self.assertEqual(geo.encode(57.64911, 10.40744), 'u4pruydqq')
+        self.assertEqual(self.create_car('A', 57.64911, 10.40744).geohash, 'u4pruydqq')
+
+    def test_near_sorted_by_distance(self):
+        # центр Душанбе; машины на ~1, ~3 и ~300 км
+        far = self.create_car('Far', 40.28, 69.62)
+        second = self.create_car('Second', 38.585, 68.80)
+        first = self.create_car('First', 38.565, 68.78)
+        Car.objects.create(
+            user=self.owner, car_name='No coords', year=2020, car_type='suv',
+            price_per_day=50, location='Dushanbe'
+        )
+
+        response = self.client.get(reverse('available-cars'), {'near': '38.559,68.774', 'radius': 5})
+        self.assertEqual(response.status_code, 200)
+        results = response.data['results']
+        self.assertEqual([r['id'] for r in results], [first.pk, second.pk])
+        self.assertLess(results[0]['distance_km'], results[1]['distance_km'])
+        self.assertNotIn(far.pk, [r['id'] for r in results])
+
+    def test_near_validation(self):
+        response = self.client.get(reverse('available-cars'), {'near': 'abc'})
+        self.assertEqual(response.status_code, 400)
+
+
+# =========================================================
+# Быстрые сериализаторы: тот же JSON, что у обычных
+# =========================================================
+class FastSerializerTests(TestCase):
+    def test_output_matches_drf(self):
+        owner = User.objects.create(username='owner')
+        renter = User.objects.create(username='renter')
+        Balance.objects.create(user=owner, amount=10)
+        Balance.objects.create(user=renter, amount=100)
+        ledger.post([(owner.pk, Decimal('2.5'), 'adjustment', None)])
+        for i in range(2):
+            Car.objects.create(
+                user=owner, car_name=f'Car {i}', year=2020, car_type='suv',
+                price_per_day=Decimal('49.9'), location='Dushanbe',
+                latitude=38.5 if i else None, longitude=68.7 if i else None,
+            )
 
-# Create your tests here.
+        request = APIRequestFactory().get('/')
+        request.user = User.objects.get(pk=owner.pk)
+        context = {'request': Request(request)}
+        render = JSONRenderer().render
+        pairs = [(CarSerializer, FastCarSerializer), (CarRentalSerializer, FastCarRentalSerializer)]
+        for slow_class, fast_class in pairs:
+            cars = list(getattr(slow_class, 'setup_eager_loading', lambda qs: qs)(Car.objects.all()))
+            self.assertEqual(
+                render(fast_class(cars, many=True, context=context).data),
+                render(slow_class(cars, many=True, context=context).data),
+            )
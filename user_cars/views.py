@@ -1,16 +1,26 @@
 from rest_framework.generics import ListCreateAPIView, RetrieveAPIView, UpdateAPIView, DestroyAPIView, ListAPIView
 from rest_framework.permissions import IsAuthenticated
-from .models import Car, Rental
-from .serializer import CarSerializer, CarRentalSerializer
+from django.db import OperationalError
+from .models import Car
+from .rentals import RentalError, rent_car
+from .serializer import CarSerializer, CarRentalSerializer, FastCarRentalSerializer, FastCarSerializer
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from django_filters.rest_framework import DjangoFilterBackend
+from cars.mixins import EagerLoadingMixin, FastReadMixin, ReplicaReadMixin
+from cars.search import FullTextSearchFilter
+from cars.streaming import StreamingListMixin
+from server.instrumentation import SerializeTimingMixin
+from .pagination import UserCarCursorPagination
+from . import geo
 
 
 # --- CRUD Машин пользователя ---
 
-class CarListCreateView(ListCreateAPIView):
+class CarListCreateView(ReplicaReadMixin, FastReadMixin, SerializeTimingMixin, ListCreateAPIView):
     serializer_class = CarSerializer
+    fast_serializer_class = FastCarSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
@@ -34,8 +44,9 @@ class CarListCreateView(ListCreateAPIView):
 
 
 
-class CarDetailView(RetrieveAPIView):
+class CarDetailView(ReplicaReadMixin, FastReadMixin, SerializeTimingMixin, RetrieveAPIView):
     serializer_class = CarSerializer
+    fast_serializer_class = FastCarSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
@@ -78,13 +89,57 @@ class CarDeleteView(DestroyAPIView):
 
 
 # --- Список доступных машин для аренды ---
-class AvailableCarsListView(ListAPIView):
+NEAR_DEFAULT_RADIUS_KM = 10
+NEAR_MAX_RADIUS_KM = 200
+NEAR_DEFAULT_LIMIT = 50
+NEAR_MAX_LIMIT = 500
+# сколько кандидатов из ячеек geohash проверяем точным расстоянием
+NEAR_MAX_CANDIDATES = 5000
+
+
+class AvailableCarsListView(ReplicaReadMixin, FastReadMixin, EagerLoadingMixin, StreamingListMixin, SerializeTimingMixin, ListAPIView):
     serializer_class = CarRentalSerializer
+    fast_serializer_class = FastCarRentalSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = UserCarCursorPagination
+    # ?search= по названию и локации через индекс cars.search
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter]
+    search_kind = 'user_car'
 
     def get_queryset(self):
         user = self.request.user
-        return Car.objects.exclude(user=user)
+        return Car.objects.exclude(user=user).filter(amount__gt=0).order_by('car_name', 'id')
+
+    # ?near=lat,lon&radius=км&limit=N — ближайшие машины по расстоянию
+    # (user_cars.geo) вместо постраничного списка по названию
+    def list(self, request, *args, **kwargs):
+        if 'near' not in request.query_params:
+            return super().list(request, *args, **kwargs)
+
+        try:
+            lat, lon = (float(part) for part in request.query_params['near'].split(','))
+            radius = float(request.query_params.get('radius', NEAR_DEFAULT_RADIUS_KM))
+            limit = int(request.query_params.get('limit', NEAR_DEFAULT_LIMIT))
+        except ValueError:
+            return Response(
+                {"detail": "near=lat,lon, radius и limit должны быть числами"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180 and 0 < radius <= NEAR_MAX_RADIUS_KM):
+            return Response(
+                {"detail": f"Некорректные координаты или radius (до {NEAR_MAX_RADIUS_KM} км)"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        limit = min(max(limit, 1), NEAR_MAX_LIMIT)
+
+        cars = geo.nearby(
+            self.filter_queryset(self.get_queryset()), lat, lon, radius,
+            limit=limit, max_candidates=NEAR_MAX_CANDIDATES
+        )
+        data = self.serialize(self.get_serializer(cars, many=True))
+        for row, car in zip(data, cars):
+            row['distance_km'] = round(car.distance_km, 3)
+        return Response({'results': data})
 
 
 # --- Аренда машины ---
@@ -92,42 +147,17 @@ class RentCarView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, pk):
-        user = request.user
         try:
-            car = Car.objects.get(pk=pk)
-        except Car.DoesNotExist:
-            return Response({"detail": "Машина не найдена"}, status=status.HTTP_404_NOT_FOUND)
-
-        # Нельзя арендовать свою машину
-        if car.user == user:
-            return Response({"detail": "Нельзя арендовать свою машину"}, status=status.HTTP_400_BAD_REQUEST)
-
-        # Проверка доступности машины
-        if car.amount <= 0:
-            return Response({"detail": "Машина недоступна для аренды"}, status=status.HTTP_400_BAD_REQUEST)
-
-        # Проверка баланса арендатора
-        renter_balance = getattr(user, 'balance', None)
-        if renter_balance is None or renter_balance.amount < car.price_per_day:
-            return Response({"detail": "Недостаточно средств"}, status=status.HTTP_400_BAD_REQUEST)
-
-        # Списание денег арендатора
-        renter_balance.amount -= car.price_per_day
-        renter_balance.save()
-
-        # Начисление денег владельцу
-        owner_balance = getattr(car.user, 'balance', None)
-        if owner_balance:
-            owner_balance.amount += car.price_per_day
-            owner_balance.save()
-
-        # Уменьшение количества доступных машин
-        car.amount -= 1
-        car.save()
-
-        # Создание записи аренды
-        Rental.objects.create(car=car, renter=user)
-
+            rental = rent_car(pk, request.user)
+        except RentalError as exc:
+            return Response({"detail": exc.detail}, status=exc.status_code)
+        except OperationalError:
+            return Response(
+                {"detail": "Слишком много одновременных аренд, попробуйте ещё раз"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+
+        car = rental.car
         return Response(
             {"detail": f"Вы успешно арендовали машину {car.car_name}. "
                        f"Списано {car.price_per_day} со счета."},
@@ -0,0 +1,175 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from server import caches as server_caches
+from user_cars.models import Balance
+from .models import User
+
+# хэш пароля в кэш не попадает: для проверки отзыва токена хватает
+# его md5 (get_md5_hash_password), поле password у снимка отложено
+USER_FIELDS = [f.attname for f in User._meta.concrete_fields if f.attname != 'password']
+BALANCE_FIELDS = [f.attname for f in Balance._meta.concrete_fields]
+
+
+def get_cache():
+    # Снимки — только в общем кэше. С кэшем в памяти процесса новая
+    # версия (invalidate_user) видна одному воркеру, а остальные до
+    # AUTH_USER_CACHE_TTL принимали бы старые is_active, is_staff и
+    # пароль. Тогда снимков нет, пользователь читается из БД.
+    alias = getattr(settings, 'AUTH_USER_CACHE', 'default')
+    if alias is None:
+        return None
+    cache = caches[alias]
+    return cache if server_caches.is_shared(cache) else None
+
+
+def get_ttl():
+    return getattr(settings, 'AUTH_USER_CACHE_TTL', 30)
+
+
+# =========================================================
+# Версия пользователя
+# =========================================================
+# Версия входит в ключ снимка. Сохранение пользователя, logout и
+# изменение баланса ставят новую версию — старые снимки больше не
+# находятся ни в памяти процесса, ни в общем кэше.
+def version_key(user_id):
+    return f'users:auth:{user_id}:version'
+
+
+def user_version(user_id):
+    cache = get_cache()
+    key = version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = time.time_ns()
+        cache.add(key, version, None)
+        version = cache.get(key) or version
+    return version
+
+
+def invalidate_user(user_id):
+    cache = get_cache()
+    if cache is not None:
+        cache.set(version_key(user_id), time.time_ns(), None)
+
+
+def invalidate_user_on_commit(user_id):
+    # сразу — чтобы этот процесс не отдал старый снимок, и после
+    # commit — чтобы параллельный запрос не закэшировал состояние,
+    # которое он прочитал до commit
+    invalidate_user(user_id)
+    transaction.on_commit(lambda: invalidate_user(user_id))
+
+
+# =========================================================
+# Снимок пользователя и баланса
+# =========================================================
+def make_snapshot(user):
+    # баланс — снимок + проводки журнала (user_cars.ledger): pending из
+    # with_pending() кладём рядом с полями, чтобы balance.current не ходил
+    # в БД. Снимок живёт до новой версии пользователя, а rent_car
+    # ставит её после проводок (invalidate_user_on_commit).
+    balance = Balance.objects.with_pending().filter(user_id=user.pk).first()
+    return (
+        tuple(getattr(user, name) for name in USER_FIELDS),
+        get_md5_hash_password(user.password),
+        tuple(getattr(balance, name) for name in BALANCE_FIELDS) + (balance.pending,) if balance else None,
+    )
+
+
+def restore_snapshot(snapshot):
+    # каждый запрос получает свои экземпляры, а не общий объект
+    user_values, _, balance_values = snapshot
+    user = User.from_db(DEFAULT_DB_ALIAS, USER_FIELDS, user_values)
+    balance = None
+    if balance_values is not None:
+        balance = Balance.from_db(DEFAULT_DB_ALIAS, BALANCE_FIELDS, balance_values[:-1])
+        # как аннотация with_pending() у загруженного из БД баланса
+        balance.pending = balance_values[-1]
+        Balance.user.field.set_cached_value(balance, user)
+    User.balance.related.set_cached_value(user, balance)
+    return user
+
+
+class LocalSnapshots:
+    # кэш в памяти процесса: {user_id: (version, expires, snapshot)}
+    max_size = 10_000
+
+    def __init__(self):
+        self.items = {}
+        self.lock = threading.Lock()
+
+    def get(self, user_id, version):
+        item = self.items.get(user_id)
+        if item and item[0] == version and item[1] > time.monotonic():
+            return item[2]
+        return None
+
+    def set(self, user_id, version, snapshot, ttl):
+        with self.lock:
+            if len(self.items) >= self.max_size:
+                self.items.clear()
+            self.items[user_id] = (version, time.monotonic() + ttl, snapshot)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+
+local_snapshots = LocalSnapshots()
+
+
+# =========================================================
+# JWT без запроса пользователя на каждый вызов API
+# =========================================================
+class CachedJWTAuthentication(JWTAuthentication):
+    # Пользователь и его баланс берутся из короткоживущего снимка:
+    # сначала память процесса, затем общий кэш (AUTH_USER_CACHE),
+    # и только потом БД. Баланс уже загружен, поэтому user.balance
+    # в сериализаторах user_cars тоже не ходит в БД.
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_('Token contained no recognizable user identification')) from e
+
+        cache = get_cache()
+        if cache is None:
+            return super().get_user(validated_token)
+
+        version = user_version(user_id)
+        snapshot = local_snapshots.get(user_id, version)
+        if snapshot is None:
+            key = f'users:auth:{user_id}:{version}'
+            snapshot = cache.get(key)
+            if snapshot is None:
+                user = super().get_user(validated_token)
+                snapshot = make_snapshot(user)
+                cache.set(key, snapshot, get_ttl())
+            local_snapshots.set(user_id, version, snapshot, get_ttl())
+
+        user = restore_snapshot(snapshot)
+        self.check_user(user, snapshot[1], validated_token)
+        return user
+
+    def check_user(self, user, password_hash, validated_token):
+        # те же проверки, что в JWTAuthentication.get_user: один снимок
+        # обслуживает разные токены одного пользователя
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != password_hash:
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code='password_changed'
+                )
@@ -0,0 +1,14 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import invalidate_user_on_commit
+from .models import User
+
+
+# =========================================================
+# Снимок пользователя в CachedJWTAuthentication устаревает
+# =========================================================
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_auth_snapshot(sender, instance, **kwargs):
+    invalidate_user_on_commit(instance.pk)
@@ -1,3 +1,94 @@
-from django.test import TestCase
+import os
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from user_cars.models import Balance, Car
+from user_cars.rentals import rent_car
+from .authentication import CachedJWTAuthentication, get_cache, local_snapshots, user_version
+from .models import User
+
+SHARED_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        # файловый кэш общий для процессов, в отличие от LocMemCache
+        'LOCATION': os.path.join(tempfile.gettempdir(), 'carsharing-auth-cache-tests'),
+    },
+}
+
+
+# =========================================================
+# Кэш пользователя в JWT-аутентификации
+# =========================================================
+@override_settings(CACHES=SHARED_CACHES, AUTH_USER_CACHE='shared')
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        caches['shared'].clear()
+        local_snapshots.clear()
+        self.user = User.objects.create(username='renter')
+        Balance.objects.create(user=self.user, amount=100)
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+
+    def authenticate(self):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        user, _ = CachedJWTAuthentication().authenticate(request)
+        return user
+
+    def test_second_request_skips_database(self):
+        self.authenticate()
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+            self.assertEqual(user.pk, self.user.pk)
+            self.assertEqual(user.balance.current, 100)
+
+    def test_user_save_invalidates(self):
+        self.authenticate()
+        self.user.first_name = 'New'
+        self.user.save()
+        self.assertEqual(self.authenticate().first_name, 'New')
+
+    def test_rent_invalidates_balance(self):
+        owner = User.objects.create(username='owner')
+        Balance.objects.create(user=owner)
+        car = Car.objects.create(
+            user=owner, car_name='Car', year=2020, car_type='suv',
+            price_per_day=30, location='Dushanbe'
+        )
+        self.authenticate()
+        rent_car(car.pk, self.user)
+        self.assertEqual(self.authenticate().balance.current, 70)
+
+    def test_password_hash_is_not_cached(self):
+        self.user.set_password('secret')
+        self.user.save()
+        self.authenticate()
+        key = f'users:auth:{self.user.pk}:{user_version(self.user.pk)}'
+        snapshot = caches['shared'].get(key)
+        self.assertIsNotNone(snapshot)
+        self.assertNotIn(self.user.password, repr(snapshot))
+        # поле отложено: при обращении читается из БД
+        with self.assertNumQueries(1):
+            self.assertEqual(self.authenticate().password, self.user.password)
+
+    def test_password_change_revokes_token(self):
+        with mock.patch.object(api_settings, 'CHECK_REVOKE_TOKEN', True):
+            self.token = str(RefreshToken.for_user(self.user).access_token)
+            self.authenticate()
+            self.user.set_password('new-secret')
+            self.user.save()
+            with self.assertRaises(AuthenticationFailed):
+                self.authenticate()
+
+    def test_disabled_without_shared_cache(self):
+        with override_settings(AUTH_USER_CACHE='default'):
+            self.assertIsNone(get_cache())
+            self.authenticate()
+            with self.assertNumQueries(1):
+                self.authenticate()
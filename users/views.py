@@ -6,6 +6,7 @@ from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
 from .models import User
+from .authentication import invalidate_user
 from .serializer import RegisterSerializer
 
 
@@ -29,6 +30,7 @@ class LogoutView(APIView):
             refresh_token = serializer.validated_data["refresh"]
             token = RefreshToken(refresh_token)
             token.blacklist()
+            invalidate_user(request.user.pk)
         except Exception:
             return Response(
                 {"detail": "Неверный refresh token"},